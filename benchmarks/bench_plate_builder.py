@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2017-, LabControl development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+"""Benchmark of the creation of the wells of a plate
+
+Compares filling a plate with blank sample compositions one well at a time
+(`Well.create` + `SampleComposition.create`) with `plate_builder.create_wells`.
+Runs against the database configured in LABCONTROL_CONFIG_FP. Everything is
+rolled back, so nothing is left in the database.
+"""
+
+from time import perf_counter
+
+import click
+import numpy as np
+
+from labcontrol.db import sql_connection
+from labcontrol.db import plate_builder
+from labcontrol.db.container import Well
+from labcontrol.db.composition import SampleComposition
+from labcontrol.db.plate import Plate, PlateConfiguration
+from labcontrol.db.process import SamplePlatingProcess
+
+
+def _per_well(process, plate, plate_config, volume):
+    for i in range(plate_config.num_rows):
+        for j in range(plate_config.num_columns):
+            well = Well.create(plate, process, volume, i + 1, j + 1)
+            SampleComposition.create(process, well, volume)
+
+
+def _bulk(process, plate, plate_config, volume):
+    rows, cols = np.indices(
+        (plate_config.num_rows, plate_config.num_columns)) + 1
+    plate_builder.create_wells(
+        process, plate, SampleComposition, rows, cols, volume,
+        {'sample_composition_type_id':
+            SampleComposition._get_sample_composition_type_id('blank'),
+         'content': SampleComposition.generate_contents('blank', plate, rows,
+                                                        cols)})
+
+
+@click.command()
+@click.option('--plate-config', type=int, default=3, show_default=True,
+              help='Plate configuration id (3 -> 384-well plate)')
+@click.option('--repeat', type=int, default=3, show_default=True,
+              help='Number of runs of each benchmark')
+def bench(plate_config, repeat):
+    """Times per-well and bulk creation of the wells of a plate"""
+    TRN = sql_connection.TRN
+    plate_config = PlateConfiguration(plate_config)
+    process = SamplePlatingProcess(11)
+    benchmarks = [('per-well', _per_well), ('create_wells', _bulk)]
+    width = max(len(name) for name, _ in benchmarks)
+    for name, func in benchmarks:
+        times = []
+        for i in range(repeat):
+            with TRN:
+                plate = Plate.create('benchmark plate %d' % i, plate_config)
+                scope = TRN.start_profile(name)
+                start = perf_counter()
+                func(process, plate, plate_config, 10)
+                TRN.execute()
+                times.append(perf_counter() - start)
+                TRN.detach_profile(scope)
+                TRN.rollback()
+        click.echo('%s  %.4fs  %d queries' % (
+            name.ljust(width), min(times), scope.query_count))
+
+
+if __name__ == '__main__':
+    bench()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2017-, LabControl development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+"""Benchmark of the parsing of plate reader files
+
+Compares reading a synthetic minipico file with pandas' python engine (the
+way `QuantificationProcess._parse_pico_csv` used to) with
+`plate_reader.parse`. Doesn't need a database.
+"""
+
+from io import StringIO
+from time import perf_counter
+
+import click
+import numpy as np
+import pandas as pd
+
+from labcontrol.db import plate_reader
+from labcontrol.db import well_coordinates
+
+
+def _minipico(num_wells):
+    rows, cols = well_coordinates.plate_shape(num_wells)
+    wells = well_coordinates.plate_well_names(rows, cols).ravel()
+    concentrations = np.random.rand(wells.size) * 20
+    lines = ['Results\t\t\t\t\t', '\t\t\t\t\t',
+             'Well ID\tWell\t[Blanked-RFU]\t[Concentration]\t\t']
+    lines.extend('SPL%d\t%s\t%.3f\t%.3f\t\t' % (i + 1, w, c * 1500, c)
+                 for i, (w, c) in enumerate(zip(wells, concentrations)))
+    lines.extend(['\t\t\t\t\t', 'Curve2 Fitting Results\t\t\t\t\t',
+                  '\t\t\t\t\t',
+                  'Curve Name\tCurve Formula\tA\tB\tR2\tFit F Prob',
+                  'Curve2\tY=A*X+B\t1.53E+003\t0\t0.995\t?????'])
+    return '\r\n'.join(lines).encode(), rows, cols
+
+
+def _pandas_python_engine(contents, rows, cols):
+    # The parsing QuantificationProcess used before plate_reader
+    cleaned = contents.decode('utf-8').replace('\r\n', '\n').replace(
+        '\r', '\n').replace('<', '').replace('>', '')
+    df = pd.read_csv(StringIO(cleaned), sep='\t', skiprows=2, skipfooter=5,
+                     engine='python',
+                     converters={'[Concentration]': lambda x: str(x)})
+    concentrations = pd.to_numeric(df['[Concentration]'])
+    plate = np.empty((rows, cols), dtype=object)
+    for idx, row in df.iterrows():
+        well_row, well_col = well_coordinates.parse_well_names(row['Well'])
+        plate[well_row - 1, well_col - 1] = concentrations[idx]
+    return plate
+
+
+def _plate_reader(contents, rows, cols):
+    return plate_reader.parse(contents, rows=rows, cols=cols).concentrations
+
+
+@click.command()
+@click.option('--num-wells', type=click.Choice(['96', '384', '1536']),
+              default='1536', show_default=True,
+              help='Number of wells of the plate')
+@click.option('--repeat', type=int, default=5, show_default=True,
+              help='Number of runs of each benchmark')
+def bench(num_wells, repeat):
+    """Times the parsing of a minipico file with each parser"""
+    contents, rows, cols = _minipico(int(num_wells))
+    benchmarks = [('pandas python engine', _pandas_python_engine),
+                  ('plate_reader', _plate_reader)]
+    width = max(len(name) for name, _ in benchmarks)
+    for name, func in benchmarks:
+        times = []
+        for _ in range(repeat):
+            start = perf_counter()
+            func(contents, rows, cols)
+            times.append(perf_counter() - start)
+        click.echo('%s  %.2f ms' % (name.ljust(width), min(times) * 1000))
+
+
+if __name__ == '__main__':
+    bench()
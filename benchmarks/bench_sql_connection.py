@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+# ----------------------------------------------------------------------------
+# Copyright (c) 2017-, LabControl development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+"""Micro-benchmarks of the Transaction fetch paths
+
+Runs against the database configured in LABCONTROL_CONFIG_FP. All the data
+is created in temporary tables, so nothing is left in the database.
+"""
+
+from time import perf_counter
+
+import click
+
+from labcontrol.db.sql_connection import Transaction
+
+
+def _best_of(repeat, func):
+    """Returns the best wall time of `repeat` runs of `func`, in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        func()
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+@click.command()
+@click.option('--rows', type=int, default=100000, show_default=True,
+              help='Number of rows of the fetched table')
+@click.option('--scalars', type=int, default=2000, show_default=True,
+              help='Number of single-value queries')
+@click.option('--repeat', type=int, default=5, show_default=True,
+              help='Number of runs of each benchmark')
+def bench(rows, scalars, repeat):
+    """Times the row types of the Transaction fetch methods"""
+    trn = Transaction()
+    with trn:
+        trn.add("""CREATE TEMP TABLE bench_rows AS
+                   SELECT i AS id, 'sample.' || i AS name, i * 0.5 AS value
+                   FROM generate_series(1, %s) AS i""", [rows])
+        trn.add("ALTER TABLE bench_rows ADD PRIMARY KEY (id)")
+        trn.add("ANALYZE bench_rows")
+        trn.execute()
+        sql_rows = "SELECT id, name, value FROM bench_rows"
+        sql_ids = "SELECT id FROM bench_rows"
+        sql_scalar = "SELECT name FROM bench_rows WHERE id = %s"
+
+        def fetchindex(row_type):
+            def run():
+                trn.add(sql_rows)
+                trn.execute_fetchindex(row_type=row_type)
+            return run
+
+        def fetchflatten():
+            trn.add(sql_ids)
+            trn.execute_fetchflatten()
+
+        def fetchflatten_dict():
+            trn.add(sql_ids)
+            [v for r in trn.execute_fetchindex() for v in r]
+
+        def fetchlast():
+            for i in range(1, scalars + 1):
+                trn.add(sql_scalar, [i])
+                trn.execute_fetchlast()
+
+        def fetchlast_dict():
+            for i in range(1, scalars + 1):
+                trn.add(sql_scalar, [i])
+                trn.execute_fetchindex()[0][0]
+
+        benchmarks = [
+            ('fetchindex %d rows (dict)' % rows, fetchindex('dict')),
+            ('fetchindex %d rows (namedtuple)' % rows,
+             fetchindex('namedtuple')),
+            ('fetchindex %d rows (tuple)' % rows, fetchindex('tuple')),
+            ('fetchflatten %d rows (dict)' % rows, fetchflatten_dict),
+            ('fetchflatten %d rows (tuple)' % rows, fetchflatten),
+            ('fetchlast x%d (dict)' % scalars, fetchlast_dict),
+            ('fetchlast x%d (tuple)' % scalars, fetchlast)]
+
+        width = max(len(name) for name, _ in benchmarks)
+        for name, func in benchmarks:
+            click.echo('%s  %.4fs' % (name.ljust(width),
+                                      _best_of(repeat, func)))
+        trn.rollback()
+    trn.close()
+
+
+if __name__ == '__main__':
+    bench()
@@ -10,6 +10,74 @@ from . import exceptions
 from . import sql_connection
 
 
+def factory_many(ids, table, id_column, type_table, type_id_column, classes):
+    """Initializes the correct subclasses for a list of ids of a hierarchy
+
+    Parameters
+    ----------
+    ids : iterable of int
+        The ids of the objects, as found in `id_column`
+    table : str
+        The table shared by all the objects of the hierarchy, e.g.
+        'labcontrol.composition'
+    id_column : str
+        The primary key of `table`, e.g. 'composition_id'
+    type_table : str
+        The table holding the type descriptions of `table`, e.g.
+        'labcontrol.composition_type'
+    type_id_column : str
+        The column linking `table` and `type_table`, e.g.
+        'composition_type_id'
+    classes : dict of {str: LabControlObject subclass}
+        The class of each type description
+
+    Returns
+    -------
+    list of LabControlObject
+        The instances of the subclasses, in the same order as `ids`
+
+    Raises
+    ------
+    LabControlUnknownIdError
+        If any of the ids does not reference a known object
+
+    Notes
+    -----
+    The type and the subclass id of all the objects are retrieved with a
+    single query, and the subclass ids are known to exist, so the objects
+    are initialized without checking them.
+    """
+    ids = list(ids)
+    if not ids:
+        return []
+
+    subclass_sqls = [
+        "SELECT {0}, {1} AS subclass_id FROM {2}".format(
+            id_column, cls._id_column, cls._table)
+        for cls in classes.values() if cls._table != table]
+    with sql_connection.TRN as TRN:
+        sql = """SELECT {0}, description, subclass_id
+                 FROM {1}
+                    JOIN {2} USING ({3})
+                    LEFT JOIN ({4}) AS subclass USING ({0})
+                 WHERE {0} = ANY(%s)""".format(
+            id_column, table, type_table, type_id_column,
+            " UNION ALL ".join(subclass_sqls))
+        TRN.add(sql, [ids])
+        rows = {r[0]: r[1:] for r in TRN.execute_fetchindex()}
+
+    instances = []
+    for id_ in ids:
+        description, subclass_id = rows.get(id_, (None, None))
+        constructor = classes.get(description)
+        if constructor is not None and constructor._table == table:
+            subclass_id = id_
+        if constructor is None or subclass_id is None:
+            raise exceptions.LabControlUnknownIdError(table, id_)
+        instances.append(constructor._from_trusted_id(subclass_id))
+    return instances
+
+
 class LabControlObject(object):
     """Base class for any LabControl object
 
@@ -25,6 +93,7 @@ class LabControlObject(object):
     Methods
     -------
     exists
+    from_ids
 
     Raises
     ------
@@ -38,7 +107,64 @@ class LabControlObject(object):
     def __init__(self, id_):
         if not self.exists(id_):
             raise exceptions.LabControlUnknownIdError(self._table, id_)
+        self._init(id_)
+
+    def _init(self, id_):
+        """Initializes the object state, without checking the id"""
         self._id = id_
+        # The rows read by the attribute getters, keyed by query, with the
+        # data version at which they were read
+        self._row_cache = {}
+
+    @classmethod
+    def _from_trusted_id(cls, id_):
+        """Returns the object with the given id without checking it exists
+
+        Parameters
+        ----------
+        id_ : int
+            The object id. It should have been read from the database, e.g.
+            from a foreign key column, so it is known to exist
+
+        Returns
+        -------
+        LabControlObject
+            The object with the given id
+        """
+        obj = cls.__new__(cls)
+        obj._init(id_)
+        return obj
+
+    @classmethod
+    def from_ids(cls, ids):
+        """Returns the objects with the given ids
+
+        Parameters
+        ----------
+        ids : iterable of int
+            The object ids
+
+        Returns
+        -------
+        list of LabControlObject
+            The objects, in the same order as `ids`
+
+        Raises
+        ------
+        LabControlUnknownIdError
+            If any of the ids does not reference a known object
+        """
+        ids = list(ids)
+        if ids:
+            with sql_connection.TRN as TRN:
+                sql = "SELECT {0} FROM {1} WHERE {0} = ANY(%s)".format(
+                    cls._id_column, cls._table)
+                TRN.add(sql, [ids])
+                found = set(TRN.execute_fetchflatten())
+            for id_ in ids:
+                if id_ not in found:
+                    raise exceptions.LabControlUnknownIdError(cls._table, id_)
+        return [cls._from_trusted_id(id_) for id_ in ids]
 
     @classmethod
     def _attr_exists(cls, attr, value):
@@ -75,11 +201,44 @@ class LabControlObject(object):
         Object
             The attribute
         """
-        with sql_connection.TRN as TRN:
-            sql = "SELECT {} FROM {} WHERE {} = %s".format(attr, self._table,
-                                                           self._id_column)
-            TRN.add(sql, [self.id])
-            return TRN.execute_fetchlast()
+        sql = "SELECT * FROM {} WHERE {} = %s".format(self._table,
+                                                      self._id_column)
+        return self._get_cached_attr(sql, attr)
+
+    def _get_cached_attr(self, sql, attr):
+        """Returns an attribute of the row of the object returned by `sql`
+
+        Parameters
+        ----------
+        sql : str
+            The query returning the whole row of the object, with the object
+            id as its only parameter
+        attr : str
+            The attribute to retrieve
+
+        Returns
+        -------
+        Object
+            The attribute, or None if `sql` doesn't return any row
+
+        Notes
+        -----
+        The row is cached in the object, so retrieving other attributes of
+        the same row doesn't query the database again. The cached row is
+        discarded as soon as the data version changes, i.e. when any query
+        that may modify the database is added to a transaction or when a
+        transaction that modified the database is committed or rolled back.
+        """
+        version = sql_connection.data_version()
+        cached = self._row_cache.get(sql)
+        if cached is None or cached[0] != version:
+            with sql_connection.TRN as TRN:
+                TRN.add(sql, [self.id])
+                res = TRN.execute_fetchindex()
+                cached = (version, res[0] if res else None)
+            self._row_cache[sql] = cached
+        row = cached[1]
+        return None if row is None else row[attr]
 
     def _set_attr(self, attr, value):
         """Sets the value of the given attribute
@@ -7,13 +7,19 @@
 # ----------------------------------------------------------------------------
 
 import re
+from functools import lru_cache
+
+import numpy as np
+
 from . import base
 from . import sql_connection
+from . import reference
 from . import process
 from . import container as container_mod
 from . import exceptions as exceptions_mod
 from . import study as study_module
 from . import plate as plate_module
+from . import well_coordinates
 
 
 class Composition(base.LabControlObject):
@@ -40,7 +46,32 @@ class Composition(base.LabControlObject):
         -------
         An instance of a subclass of Composition
         """
-        factory_classes = {
+        return Composition.factory_many([composition_id])[0]
+
+    @staticmethod
+    def factory_many(composition_ids):
+        """Initializes the correct composition subclasses for a list of ids
+
+        Parameters
+        ----------
+        composition_ids : iterable of int
+            The composition ids
+
+        Returns
+        -------
+        list of instances of subclasses of Composition
+            The compositions, in the same order as `composition_ids`
+        """
+        return base.factory_many(
+            composition_ids, 'labcontrol.composition', 'composition_id',
+            'labcontrol.composition_type', 'composition_type_id',
+            Composition._factory_classes())
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _factory_classes():
+        """Returns the composition subclass of each composition type"""
+        return {
             'reagent': ReagentComposition,
             'primer set': PrimerSetComposition,
             'primer': PrimerComposition,
@@ -52,35 +83,11 @@ class Composition(base.LabControlObject):
             'shotgun library prep': LibraryPrepShotgunComposition,
             'pool': PoolComposition}
 
-        with sql_connection.TRN as TRN:
-            sql = """SELECT description
-                     FROM labcontrol.composition_type
-                        JOIN labcontrol.composition USING (composition_type_id)
-                     WHERE composition_id = %s"""
-            TRN.add(sql, [composition_id])
-            c_type = TRN.execute_fetchlast()
-            constructor = factory_classes[c_type]
-
-            sql = """SELECT {}
-                     FROM {}
-                     WHERE composition_id = %s""".format(
-                        constructor._id_column, constructor._table)
-            TRN.add(sql, [composition_id])
-            subclass_id = TRN.execute_fetchlast()
-            instance = constructor(subclass_id)
-
-        return instance
-
     @classmethod
     def _common_creation_steps(cls, process, container, volume):
         """"""
+        ct_id = reference.COMPOSITION_TYPES.get_id(cls._composition_type)
         with sql_connection.TRN as TRN:
-            sql = """SELECT composition_type_id
-                     FROM labcontrol.composition_type
-                     WHERE description = %s"""
-            TRN.add(sql, [cls._composition_type])
-            ct_id = TRN.execute_fetchlast()
-
             sql = """INSERT INTO labcontrol.composition
                         (composition_type_id, upstream_process_id,
                          container_id, total_volume)
@@ -108,14 +115,11 @@ class Composition(base.LabControlObject):
         Object
             The attribute
         """
-        with sql_connection.TRN as TRN:
-            sql = """SELECT {}
-                     FROM labcontrol.composition
-                        JOIN {} USING (composition_id)
-                     WHERE {} = %s""".format(attr, self._table,
-                                             self._id_column)
-            TRN.add(sql, [self.id])
-            return TRN.execute_fetchlast()
+        sql = """SELECT *
+                 FROM labcontrol.composition
+                    JOIN {} USING (composition_id)
+                 WHERE {} = %s""".format(self._table, self._id_column)
+        return self._get_cached_attr(sql, attr)
 
     def _set_composition_attr(self, attr, value):
         """Sets the value of the given composition attribute
@@ -254,7 +258,7 @@ class ReagentComposition(Composition):
             if not res:
                 raise exceptions_mod.LabControlUnknownIdError(
                     'ReagentComposition', external_id)
-            return cls(res[0][0])
+            return cls._from_trusted_id(res[0][0])
 
     @classmethod
     def create(cls, process, container, volume, reagent_type, external_lot_id):
@@ -282,11 +286,7 @@ class ReagentComposition(Composition):
             composition_id = cls._common_creation_steps(
                 process, container, volume)
             # Get the reagent composition type
-            sql = """SELECT reagent_composition_type_id
-                     FROM labcontrol.reagent_composition_type
-                     WHERE description = %s"""
-            TRN.add(sql, [reagent_type])
-            rct_id = TRN.execute_fetchlast()
+            rct_id = reference.REAGENT_COMPOSITION_TYPES.get_id(reagent_type)
 
             # Add the row into the reagent composition table
             sql = """INSERT INTO labcontrol.reagent_composition
@@ -296,7 +296,7 @@ class ReagentComposition(Composition):
                      RETURNING reagent_composition_id"""
             TRN.add(sql, [composition_id, rct_id, external_lot_id])
             rc_id = TRN.execute_fetchlast()
-        return cls(rc_id)
+        return cls._from_trusted_id(rc_id)
 
     @property
     def external_lot_id(self):
@@ -357,7 +357,7 @@ class PrimerComposition(Composition):
                      RETURNING primer_composition_id"""
             TRN.add(sql, [composition_id, primer_set_composition.id])
             pcid = TRN.execute_fetchlast()
-        return cls(pcid)
+        return cls._from_trusted_id(pcid)
 
     @property
     def primer_set_composition(self):
@@ -421,6 +421,7 @@ class SampleComposition(Composition):
                      VALUES (%s, %s)"""
             TRN.add(sql, [external_id, description])
             TRN.execute()
+            reference.SAMPLE_COMPOSITION_TYPES.invalidate_on_end()
 
     @staticmethod
     def get_control_samples(term=None):
@@ -475,13 +476,7 @@ class SampleComposition(Composition):
         int
             The id of the sample composition type
         """
-        with sql_connection.TRN as TRN:
-            sql = """SELECT sample_composition_type_id
-                     FROM labcontrol.sample_composition_type
-                     WHERE external_id = %s"""
-            TRN.add(sql, [compostion_type])
-            sct_id = TRN.execute_fetchlast()
-        return sct_id
+        return reference.SAMPLE_COMPOSITION_TYPES.get_id(compostion_type)
 
     @staticmethod
     def generate_content(sample_name, well):
@@ -502,6 +497,33 @@ class SampleComposition(Composition):
         result = '%s.%s.%s' % (sample_name, munged_plate_name, well.well_id)
         return result
 
+    @staticmethod
+    def generate_contents(sample_name, plate, rows, columns):
+        """Fully qualify sample name for several wells of a plate
+
+        Parameters
+        ----------
+        sample_name : str or array_like of str
+            The base name for the sample, such as 1.SKB1.640202 or blank, or
+            the base name of the sample of each well
+        plate : labcontrol.db.plate.Plate
+            The plate in which the samples are placed
+        rows : array_like of int
+            The 1-based rows of the wells
+        columns : array_like of int
+            The 1-based columns of the wells
+
+        Returns
+        -------
+        np.array of str
+            The contents, in the same format as `generate_content`, with the
+            shape of `rows`
+        """
+        munged_plate_name = re.sub(r'[\s,_]+', '.', plate.external_id)
+        suffixes = '.%s.' % munged_plate_name + well_coordinates.well_names(
+            rows, columns)
+        return np.asarray(sample_name, dtype=object) + suffixes
+
     @classmethod
     def create(cls, process, well, volume):
         """Creates a new blank sample composition
@@ -537,7 +559,7 @@ class SampleComposition(Composition):
             TRN.add(sql, [composition_id, sct_id,
                           cls.generate_content("blank", well)])
             sc_id = TRN.execute_fetchlast()
-        return cls(sc_id)
+        return cls._from_trusted_id(sc_id)
 
     @property
     def sample_id(self):
@@ -601,127 +623,66 @@ class SampleComposition(Composition):
     def update(self, content):
         """Updates the contents of the sample composition
 
+        If the content is a sample already plated in the same plate, the
+        content of all its wells is qualified with the plate name and well
+        id (see `generate_content`). If the previous sample is left in a
+        single well of the plate, the content of that well goes back to the
+        sample id.
+
         Parameters
         ----------
         content: str
             The new contents of the SampleComposition
+
+        Returns
+        -------
+        (str, bool)
+            The new contents of the SampleComposition, and whether they are
+            "ok", i.e. they are a control or a sample known to the database
+
+        Notes
+        -----
+        The update is done by the database function
+        `labcontrol.update_sample_composition`, in a single round-trip.
         """
         with sql_connection.TRN as TRN:
-            # First check if the previous content matches the new one. If the
-            # previous content is a experimental sample, then to be the same
-            # content the sample_id must match. If it is not an experimental
-            # sample, then the sample composition type must match
-            sc_type = self.sample_composition_type
-            contents_ok = True
-            if not ((sc_type == 'experimental sample' and
-                     self.content == content) or (sc_type == content)):
-                # The contents are different, we need to update
-                # Identify if the content is a control or experimental sample
-                sql = """SELECT sample_composition_type_id
-                         FROM labcontrol.sample_composition_type
-                         WHERE external_id = %s"""
-                TRN.add(sql, [content])
-                res = TRN.execute_fetchindex()
-                well = self.container
-
-                # if we got a result when looking up the content directly,
-                # that means the content is one of our fixed vocabulary words--
-                # e.g., blank, vibrio.positive.control, empty, etc--
-                # which means it must be a control since experimental samples
-                # each have their own names :)
-                if res:
-                    # The content is a control
-                    # res[0][0] -> Only 1 row and 1 column as result from the
-                    # previous SQL query
-                    sc_type_id = res[0][0]
-                    content = self.generate_content(content, well)
-                    sql_args = [sc_type_id, None, content, self.id]
-                else:
-                    # The content is a sample
-                    es_sci = self._get_sample_composition_type_id(
-                        'experimental sample')
-                    # Check if the sample exists in the DB
-                    sql = """SELECT EXISTS(SELECT *
-                                           FROM qiita.study_sample
-                                           WHERE sample_id = %s)"""
-                    TRN.add(sql, [content])
-
-                    # if the sample exists in the qiita database
-                    if TRN.execute_fetchlast():
-                        # Check if the sample has been plated in the same
-                        # plate before or not
-                        sql = """SELECT well_id, sample_composition_id,
-                                        sample_id
-                                 FROM labcontrol.well
-                                    JOIN labcontrol.composition
-                                        USING (container_id)
-                                    JOIN labcontrol.sample_composition
-                                        USING (composition_id)
-                                 WHERE plate_id = %s AND sample_id = %s"""
-                        TRN.add(sql, [well.plate.id, content])
-                        res = TRN.execute_fetchindex()
-
-                        # If the sample has been plated in this plate before
-                        if res:
-                            # Update the content values to include the
-                            # plate and well id
-                            sql = """UPDATE labcontrol.sample_composition
-                                        SET content = %s
-                                        WHERE sample_composition_id = %s"""
-                            for well_id, sc_id, s_id in res:
-                                w = container_mod.Well(well_id)
-                                TRN.add(sql, [self.generate_content(s_id, w),
-                                              sc_id])
-                            orig_content = content
-                            content = self.generate_content(content, well)
-                            sql_args = [es_sci, orig_content, content, self.id]
-                        else:
-                            # There is no need to update the content value
-                            sql_args = [es_sci, content, content, self.id]
-                    else:
-                        # If the sample doesn't exist in the database, put the
-                        # sample in the content but do not put it on the
-                        # sample_id
-                        contents_ok = False
-                        sql_args = [es_sci, None, content, self.id]
-
-                old_sample = self.sample_id
-
-                sql = """UPDATE labcontrol.sample_composition
-                         SET sample_composition_type_id = %s,
-                             sample_id = %s,
-                             content = %s
-                         WHERE sample_composition_id = %s"""
-                TRN.add(sql, sql_args)
-                TRN.execute()
-
-                if old_sample is not None:
-                    # This means that we had another experimental sample
-                    # in this plate before, check if the sample appears in
-                    # any other well
-                    sql = """SELECT sample_composition_id
-                             FROM labcontrol.well
-                                JOIN labcontrol.composition
-                                USING (container_id)
-                                JOIN labcontrol.sample_composition
-                                    USING (composition_id)
-                                WHERE plate_id = %s AND sample_id = %s"""
-                    TRN.add(sql, [well.plate.id, old_sample])
-                    res = TRN.execute_fetchflatten()
-                    if len(res) == 1:
-                        # The sample is present in another well AND only in
-                        # a single other other well (hence the check == 1)
-                        # This means that we can revert the content of the
-                        # other well to match the sample_id
-                        sql = """UPDATE labcontrol.sample_composition
-                                    SET content = sample_id
-                                    WHERE sample_composition_id = %s"""
-                        TRN.add(sql, [res[0]])
-                        TRN.execute()
-            else:
-                # cover the case in which the first thing plate is a blank
-                content = self.content
-        return content, contents_ok
+            sql = """SELECT out_content, out_content_ok
+                     FROM labcontrol.update_sample_composition(%s, %s)"""
+            TRN.add(sql, [self.id, content])
+            res = TRN.execute_fetchindex(row_type='tuple')[0]
+        return res[0], res[1]
+
+
+class ImplicitBlankComposition(object):
+    """The blank held by a position of a plate without a stored well
+
+    It reads like the `SampleComposition` of a blank, see
+    `container.ImplicitBlankWell`. It is not stored, so it has no id
+
+    Attributes
+    ----------
+    container
+    upstream_process
+    total_volume
+    content
+    """
+    id = None
+    composition_id = None
+    notes = None
+    sample_id = None
+    sample_composition_type = 'blank'
+    study = None
+
+    def __init__(self, container, upstream_process, total_volume, content):
+        self.container = container
+        self.upstream_process = upstream_process
+        self.total_volume = total_volume
+        self.content = content
+
+    @property
+    def specimen_id(self):
+        """Blanks are identified by their content"""
+        return self.content
 
 
 class GDNAComposition(Composition):
@@ -766,7 +727,7 @@ class GDNAComposition(Composition):
                      RETURNING gdna_composition_id"""
             TRN.add(sql, [composition_id, sample_composition.id])
             gdnac_id = TRN.execute_fetchlast()
-        return cls(gdnac_id)
+        return cls._from_trusted_id(gdnac_id)
 
     @property
     def sample_composition(self):
@@ -829,7 +790,7 @@ class LibraryPrep16SComposition(Composition):
             TRN.add(sql, [composition_id, gdna_composition.id,
                           primer_composition.id])
             lp16sc_id = TRN.execute_fetchlast()
-        return cls(lp16sc_id)
+        return cls._from_trusted_id(lp16sc_id)
 
     @property
     def gdna_composition(self):
@@ -890,7 +851,7 @@ class CompressedGDNAComposition(Composition):
                      RETURNING compressed_gdna_composition_id"""
             TRN.add(sql, [composition_id, gdna_composition.id])
             cgdna_id = TRN.execute_fetchlast()
-        return cls(cgdna_id)
+        return cls._from_trusted_id(cgdna_id)
 
     @property
     def gdna_composition(self):
@@ -955,7 +916,7 @@ class NormalizedGDNAComposition(Composition):
             TRN.add(sql, [composition_id, compressed_gdna_composition.id,
                           dna_vol, water_vol])
             ngdnac_id = TRN.execute_fetchlast()
-        return cls(ngdnac_id)
+        return cls._from_trusted_id(ngdnac_id)
 
     @property
     def compressed_gdna_composition(self):
@@ -1032,7 +993,7 @@ class LibraryPrepShotgunComposition(Composition):
             TRN.add(sql, [composition_id, norm_gdna_composition.id,
                           i5_composition.id, i7_composition.id])
             lpsc_id = TRN.execute_fetchlast()
-        return cls(lpsc_id)
+        return cls._from_trusted_id(lpsc_id)
 
     @property
     def normalized_gdna_composition(self):
@@ -1180,7 +1141,7 @@ class PoolComposition(Composition):
                      RETURNING pool_composition_id"""
             TRN.add(sql, [composition_id])
             pc_id = TRN.execute_fetchlast()
-        return cls(pc_id)
+        return cls._from_trusted_id(pc_id)
 
     @property
     def components(self):
@@ -1196,13 +1157,13 @@ class PoolComposition(Composition):
                      FROM labcontrol.pool_composition_components
                      WHERE output_pool_composition_id = %s"""
             TRN.add(sql, [self.id])
-            result = []
-            for res in TRN.execute_fetchindex():
-                result.append(
-                    {'composition': Composition.factory(
-                        res['input_composition_id']),
-                     'input_volume': res['volume'],
-                     'percentage_of_output': res['percentage']})
+            res = TRN.execute_fetchindex()
+            comps = Composition.factory_many(
+                r['input_composition_id'] for r in res)
+            result = [{'composition': comp,
+                       'input_volume': r['volume'],
+                       'percentage_of_output': r['percentage']}
+                      for comp, r in zip(comps, res)]
         return result
 
     @property
@@ -1269,7 +1230,7 @@ class PrimerSet(base.LabControlObject):
                      WHERE primer_set_id = %s
                      ORDER BY plate_id"""
             TRN.add(sql, [self.id])
-            res = [plate_module.Plate(pid)
+            res = [plate_module.Plate._from_trusted_id(pid)
                    for pid in TRN.execute_fetchflatten()]
         return res
 
@@ -39,6 +39,17 @@ class ConfigurationManager(object):
         The host where the database lives
     port : int
         The port used to connect to the postgres database in the previous host
+    read_host : str
+        The host used for read-only transactions, e.g. a streaming replica.
+        Defaults to `host`
+    read_port : int
+        The port used for read-only transactions. Defaults to `port`
+    max_connections : int
+        The maximum number of simultaneous connections to the postgres
+        database that this process will open
+    statement_cache_size : int
+        The number of prepared statements kept per postgres connection. If 0,
+        queries are not prepared
     qiita_server_cert : str
         If qiita enabled, the qiita server certificate
 
@@ -50,7 +61,9 @@ class ConfigurationManager(object):
     @staticmethod
     def create(config_fp, test_env, certificate_filepath, key_filepath,
                cookie_secret, db_host, db_port, db_name, db_user, db_password,
-               db_admin_user, db_admin_password, log_dir, qiita_server_cert):
+               db_admin_user, db_admin_password, log_dir, qiita_server_cert,
+               db_max_connections=10, db_statement_cache_size=0,
+               db_read_host='', db_read_port=''):
         """Creates a new labcontrol configuration file
 
         Parameters
@@ -85,6 +98,17 @@ class ConfigurationManager(object):
             Path to the log directory
         qiita_server_cert : str
             The qiita server certificate (for testing)
+        db_max_connections : int, optional
+            The maximum number of simultaneous connections to the postgres
+            database. Default: 10
+        db_statement_cache_size : int, optional
+            The number of prepared statements kept per postgres connection.
+            Default: 0, queries are not prepared
+        db_read_host : str, optional
+            The host used for read-only transactions, e.g. a streaming
+            replica. Default: use `db_host`
+        db_read_port : int, optional
+            The port used for read-only transactions. Default: use `db_port`
         """
         with open(config_fp, 'w') as f:
             f.write(CONFIG_TEMPLATE % {
@@ -100,6 +124,10 @@ class ConfigurationManager(object):
                 'database': db_name,
                 'host': db_host,
                 'port': db_port,
+                'read_host': db_read_host,
+                'read_port': db_read_port,
+                'max_connections': db_max_connections,
+                'statement_cache_size': db_statement_cache_size,
                 'logdir': log_dir,
                 'qiita_cert': qiita_server_cert})
 
@@ -164,6 +192,18 @@ class ConfigurationManager(object):
         self.database = config.get('postgres', 'DATABASE')
         self.host = config.get('postgres', 'HOST')
         self.port = config.getint('postgres', 'PORT')
+        # Read-only transactions can be routed to a replica. If not set, they
+        # use the same server as the rest of the transactions
+        self.read_host = (config.get('postgres', 'READ_HOST', fallback='') or
+                          self.host)
+        read_port = config.get('postgres', 'READ_PORT', fallback='')
+        self.read_port = int(read_port) if read_port else self.port
+        # Configuration files created before the connection pool existed
+        # do not have this option, so fall back to the default
+        self.max_connections = config.getint('postgres', 'MAX_CONNECTIONS',
+                                             fallback=10)
+        self.statement_cache_size = config.getint(
+            'postgres', 'STATEMENT_CACHE_SIZE', fallback=0)
 
     def _get_qiita(self, config):
         self.qiita_server_cert = config.get('qiita', 'SERVER_CERT')
@@ -188,6 +228,10 @@ ADMIN_PASSWORD=%(admin_password)s
 DATABASE=%(database)s
 HOST=%(host)s
 PORT=%(port)s
+READ_HOST=%(read_host)s
+READ_PORT=%(read_port)s
+MAX_CONNECTIONS=%(max_connections)s
+STATEMENT_CACHE_SIZE=%(statement_cache_size)s
 
 # ------------------------- QIITA SETTINGS ----------------------------------
 [qiita]
@@ -6,14 +6,15 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
+from functools import lru_cache
+
 from . import base
 from . import sql_connection
+from . import reference
 from . import plate as plate_module
 from . import process as process_module
 from . import composition as composition_module
-
-
-LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+from . import well_coordinates
 
 
 class Container(base.LabControlObject):
@@ -39,36 +40,37 @@ class Container(base.LabControlObject):
         -------
         An instance of a subclass of Container
         """
-        factory_classes = {'tube': Tube, 'well': Well}
+        return Container.factory_many([container_id])[0]
 
-        with sql_connection.TRN as TRN:
-            sql = """SELECT description
-                     FROM labcontrol.container_type
-                        JOIN labcontrol.container USING (container_type_id)
-                     WHERE container_id = %s"""
-            TRN.add(sql, [container_id])
-            c_type = TRN.execute_fetchlast()
-            constructor = factory_classes[c_type]
-
-            sql = """SELECT {}
-                     FROM {}
-                     WHERE container_id = %s""".format(
-                        constructor._id_column, constructor._table)
-            TRN.add(sql, [container_id])
-            subclass_id = TRN.execute_fetchlast()
-            instance = constructor(subclass_id)
-
-        return instance
+    @staticmethod
+    def factory_many(container_ids):
+        """Initializes the correct container subclasses for a list of ids
+
+        Parameters
+        ----------
+        container_ids : iterable of int
+            The container ids
+
+        Returns
+        -------
+        list of instances of subclasses of Container
+            The containers, in the same order as `container_ids`
+        """
+        return base.factory_many(
+            container_ids, 'labcontrol.container', 'container_id',
+            'labcontrol.container_type', 'container_type_id',
+            Container._factory_classes())
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _factory_classes():
+        """Returns the container subclass of each container type"""
+        return {'tube': Tube, 'well': Well}
 
     @classmethod
     def _common_creation_steps(cls, process, remaining_volume):
+        ct_id = reference.CONTAINER_TYPES.get_id(cls._container_type)
         with sql_connection.TRN as TRN:
-            sql = """SELECT container_type_id
-                     FROM labcontrol.container_type
-                     WHERE description = %s"""
-            TRN.add(sql, [cls._container_type])
-            ct_id = TRN.execute_fetchlast()
-
             sql = """INSERT INTO labcontrol.container
                         (container_type_id, latest_upstream_process_id,
                          remaining_volume)
@@ -92,14 +94,11 @@ class Container(base.LabControlObject):
         Object
             The attribute
         """
-        with sql_connection.TRN as TRN:
-            sql = """SELECT {}
-                     FROM labcontrol.container
-                        JOIN {} USING (container_id)
-                     WHERE {} = %s""".format(attr, self._table,
-                                             self._id_column)
-            TRN.add(sql, [self.id])
-            return TRN.execute_fetchlast()
+        sql = """SELECT *
+                 FROM labcontrol.container
+                    JOIN {} USING (container_id)
+                 WHERE {} = %s""".format(self._table, self._id_column)
+        return self._get_cached_attr(sql, attr)
 
     @property
     def remaining_volume(self):
@@ -177,7 +176,7 @@ class Tube(Container):
             TRN.add(sql, [container_id, external_id])
             tube_id = TRN.execute_fetchlast()
 
-        return cls(tube_id)
+        return cls._from_trusted_id(tube_id)
 
     @property
     def external_id(self):
@@ -249,7 +248,7 @@ class Well(Container):
                      RETURNING well_id"""
             TRN.add(sql, [container_id, plate.id, row, col])
             well_id = TRN.execute_fetchlast()
-        return cls(well_id)
+        return cls._from_trusted_id(well_id)
 
     @property
     def plate(self):
@@ -269,11 +268,52 @@ class Well(Container):
     @property
     def well_id(self):
         """The well id in the "A1","H12" form"""
-        row = self.row
-        col = self.column
-        # Adapted from https://stackoverflow.com/a/19169180/3746629
-        result = []
-        while row:
-            row, rem = divmod(row-1, 26)
-            result[:0] = LETTERS[rem]
-        return ''.join(result) + str(col)
+        return well_coordinates.well_name(self.row, self.column)
+
+
+class ImplicitBlankWell(object):
+    """A position of a plate with implicit blanks that has no stored well
+
+    It reads like a `Well` holding a blank, so `Plate.layout` can return the
+    whole plate without storing it. It can't be modified: the write paths
+    store the well first (see `Plate.materialize_blanks`)
+
+    Attributes
+    ----------
+    plate
+    row
+    column
+    latest_process
+    remaining_volume
+    composition
+    """
+    id = None
+    container_id = None
+    notes = None
+
+    def __init__(self, plate, row, column, process, volume, content):
+        self.plate = plate
+        self.row = row
+        self.column = column
+        self.latest_process = process
+        self.remaining_volume = volume
+        self.composition = composition_module.ImplicitBlankComposition(
+            self, process, volume, content)
+
+    def __eq__(self, other):
+        """Self and other are equal based on their plate and position"""
+        if type(self) is not type(other):
+            return False
+        return (self.plate, self.row, self.column) == (
+            other.plate, other.row, other.column)
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((self.plate, self.row, self.column))
+
+    @property
+    def well_id(self):
+        """The well id in the "A1","H12" form"""
+        return well_coordinates.well_name(self.row, self.column)
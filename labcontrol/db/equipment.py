@@ -8,6 +8,7 @@
 
 from . import base
 from . import sql_connection
+from . import reference
 from . import exceptions
 
 
@@ -106,6 +107,7 @@ class Equipment(base.LabControlObject):
                   "VALUES (%s)"
             TRN.add(sql, [description])
             TRN.execute()
+            reference.EQUIPMENT_TYPES.invalidate_on_end()
 
     @classmethod
     def create(cls, equipment_type, external_id, notes=None):
@@ -134,19 +136,9 @@ class Equipment(base.LabControlObject):
         """
         with sql_connection.TRN as TRN:
             # Check if the equipment type exists by getting his id
-            sql = """SELECT equipment_type_id
-                     FROM labcontrol.equipment_type
-                     WHERE description = %s"""
-            TRN.add(sql, [equipment_type])
-            res = TRN.execute_fetchindex()
-            if res:
-                # Fetchindex returns a list of results. If the previous call
-                # didn't return anything the list would be empty, and accessing
-                # to this values would've generated and IndexError. By the DB
-                # constraints, the above query can at most return one result
-                # with a single value, hence the [0][0]
-                equipment_type_id = res[0][0]
-            else:
+            equipment_type_id = reference.EQUIPMENT_TYPES.get_id(
+                equipment_type)
+            if equipment_type_id is None:
                 raise exceptions.LabControlUnknownIdError(
                     'Equipment type', equipment_type)
 
@@ -0,0 +1,208 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2017-, LabControl development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import json
+import logging
+import re
+from functools import lru_cache
+from time import perf_counter
+
+
+# Default number of executions of the same query in a single scope above
+# which the scope is flagged as having an N+1 pattern
+N_PLUS_ONE_THRESHOLD = 20
+
+_COMMENTS = re.compile(r'--[^\n]*|/\*.*?\*/', re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDERS = re.compile(r'%\([^)]*\)s|%s|\$\d+')
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_VALUE_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_REPEATED_ROWS = re.compile(r'\(\?\)(?:\s*,\s*\(\?\))+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(sql):
+    """Normalizes an SQL query so equivalent queries can be grouped together
+
+    Parameters
+    ----------
+    sql : str
+        The SQL query
+
+    Returns
+    -------
+    str
+        The query with literals and placeholders replaced by `?`, lists of
+        values and rows collapsed to `(?)` and whitespace collapsed to single
+        spaces
+    """
+    sql = _COMMENTS.sub(' ', sql)
+    sql = _STRINGS.sub('?', sql)
+    sql = _PLACEHOLDERS.sub('?', sql)
+    sql = _NUMBERS.sub('?', sql)
+    sql = _VALUE_LISTS.sub('(?)', sql)
+    sql = _REPEATED_ROWS.sub('(?)', sql)
+    return _WHITESPACE.sub(' ', sql.strip().rstrip(';')).strip()
+
+
+class QueryStats(object):
+    """Aggregated statistics of the executions of a query fingerprint
+
+    Parameters
+    ----------
+    fingerprint : str
+        The normalized SQL query
+
+    Attributes
+    ----------
+    count : int
+        The number of executions
+    total_time : float
+        The total wall time of the executions, in seconds
+    max_time : float
+        The wall time of the slowest execution, in seconds
+    rows : int
+        The total number of rows returned or affected by the executions
+    """
+    def __init__(self, fingerprint):
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.rows = 0
+
+    def add(self, elapsed, rows):
+        """Records an execution
+
+        Parameters
+        ----------
+        elapsed : float
+            The wall time of the execution, in seconds
+        rows : int
+            The number of rows returned or affected by the execution
+        """
+        self.count += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.rows += max(rows, 0)
+
+    def to_dict(self):
+        """Returns the statistics as a JSON-serializable dict"""
+        return {'fingerprint': self.fingerprint,
+                'count': self.count,
+                'total_time': self.total_time,
+                'max_time': self.max_time,
+                'rows': self.rows}
+
+
+class QueryScope(object):
+    """Collects the queries executed while the scope is active
+
+    Parameters
+    ----------
+    name : str
+        The name of the scope, e.g. the request URI
+    n_plus_one_threshold : int, optional
+        The number of executions of the same fingerprint above which the
+        scope is flagged as having an N+1 pattern.
+        Default: N_PLUS_ONE_THRESHOLD
+    """
+    def __init__(self, name, n_plus_one_threshold=None):
+        self.name = name
+        self.n_plus_one_threshold = (
+            N_PLUS_ONE_THRESHOLD if n_plus_one_threshold is None
+            else n_plus_one_threshold)
+        self.stats = {}
+        self._start = perf_counter()
+        self.elapsed = None
+
+    def record(self, sql, elapsed, rows):
+        """Records the execution of a query
+
+        Parameters
+        ----------
+        sql : str
+            The SQL query
+        elapsed : float
+            The wall time of the execution, in seconds
+        rows : int
+            The number of rows returned or affected by the query
+        """
+        fp = fingerprint(sql)
+        stats = self.stats.get(fp)
+        if stats is None:
+            stats = self.stats[fp] = QueryStats(fp)
+        stats.add(elapsed, rows)
+
+    def close(self):
+        """Stops the wall clock of the scope"""
+        if self.elapsed is None:
+            self.elapsed = perf_counter() - self._start
+
+    @property
+    def query_count(self):
+        """The total number of queries executed in the scope"""
+        return sum(s.count for s in self.stats.values())
+
+    @property
+    def query_time(self):
+        """The total wall time spent running queries, in seconds"""
+        return sum(s.total_time for s in self.stats.values())
+
+    def n_plus_one(self):
+        """Returns the fingerprints executed more times than the threshold
+
+        Returns
+        -------
+        list of QueryStats
+            The statistics of the flagged fingerprints, most executed first
+        """
+        return sorted(
+            (s for s in self.stats.values()
+             if s.count > self.n_plus_one_threshold),
+            key=lambda s: s.count, reverse=True)
+
+    def report(self):
+        """Returns a summary of the scope
+
+        Returns
+        -------
+        dict
+            The JSON-serializable summary of the scope, with the queries
+            sorted by total time
+        """
+        elapsed = self.elapsed
+        if elapsed is None:
+            elapsed = perf_counter() - self._start
+        return {
+            'scope': self.name,
+            'elapsed': elapsed,
+            'query_count': self.query_count,
+            'query_time': self.query_time,
+            'n_plus_one': [s.fingerprint for s in self.n_plus_one()],
+            'queries': [s.to_dict() for s in sorted(
+                self.stats.values(), key=lambda s: s.total_time,
+                reverse=True)]}
+
+    def to_json(self):
+        """Returns the summary of the scope as a JSON string"""
+        return json.dumps(self.report())
+
+    def log(self):
+        """Logs the summary of the scope
+
+        The summary is logged at DEBUG level, and each N+1 pattern found
+        is logged at WARNING level
+        """
+        for stats in self.n_plus_one():
+            logging.warning(
+                "Possible N+1 query in '%s': executed %d times (%.3fs): %s"
+                % (self.name, stats.count, stats.total_time,
+                   stats.fingerprint))
+        logging.debug("Query report: %s" % self.to_json())
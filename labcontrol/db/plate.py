@@ -6,13 +6,52 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
-from collections import defaultdict
+import numpy as np
 
 from . import base
 from . import sql_connection
+from . import reference
 from . import container as container_module
+from . import composition as composition_module
 from . import exceptions as exceptions_module
 from . import process as process_module
+from . import study as study_module
+from . import plate_builder
+
+
+# Resolves the composition `c` to the sample composition `sc` it derives from:
+# gDNA and 16S library preps go through gDNA, shotgun library preps go through
+# normalized and compressed gDNA
+_SAMPLE_COMPOSITION_JOINS = """
+                LEFT JOIN labcontrol.sample_composition sc0
+                    ON sc0.composition_id = c.composition_id
+                LEFT JOIN labcontrol.gdna_composition g0
+                    ON g0.composition_id = c.composition_id
+                LEFT JOIN labcontrol.library_prep_16s_composition l16
+                    ON l16.composition_id = c.composition_id
+                LEFT JOIN labcontrol.compressed_gdna_composition cg0
+                    ON cg0.composition_id = c.composition_id
+                LEFT JOIN labcontrol.normalized_gdna_composition ng0
+                    ON ng0.composition_id = c.composition_id
+                LEFT JOIN labcontrol.library_prep_shotgun_composition
+                    ls ON ls.composition_id = c.composition_id
+                LEFT JOIN labcontrol.normalized_gdna_composition ng
+                    ON ng.normalized_gdna_composition_id =
+                        ls.normalized_gdna_composition_id
+                LEFT JOIN labcontrol.compressed_gdna_composition cg
+                    ON cg.compressed_gdna_composition_id = COALESCE(
+                        cg0.compressed_gdna_composition_id,
+                        ng0.compressed_gdna_composition_id,
+                        ng.compressed_gdna_composition_id)
+                LEFT JOIN labcontrol.gdna_composition g
+                    ON g.gdna_composition_id = COALESCE(
+                        g0.gdna_composition_id,
+                        l16.gdna_composition_id,
+                        cg.gdna_composition_id)
+                LEFT JOIN labcontrol.sample_composition sc
+                    ON sc.sample_composition_id = COALESCE(
+                        sc0.sample_composition_id,
+                        g.sample_composition_id)"""
 
 
 class PlateConfiguration(base.LabControlObject):
@@ -46,7 +85,7 @@ class PlateConfiguration(base.LabControlObject):
                      ORDER BY plate_configuration_id"""
             TRN.add(sql)
             for pc_id in TRN.execute_fetchflatten():
-                yield cls(pc_id)
+                yield cls._from_trusted_id(pc_id)
 
     @classmethod
     def create(cls, description, num_rows, num_columns):
@@ -72,7 +111,29 @@ class PlateConfiguration(base.LabControlObject):
                     VALUES (%s, %s, %s)
                     RETURNING plate_configuration_id"""
             TRN.add(sql, [description, num_rows, num_columns])
-            return cls(TRN.execute_fetchlast())
+            pc_id = TRN.execute_fetchlast()
+            reference.PLATE_CONFIGURATIONS.invalidate_on_end()
+            return cls._from_trusted_id(pc_id)
+
+    @classmethod
+    def exists(cls, id_):
+        """Returns whether a plate configuration with the given id exists
+
+        Parameters
+        ----------
+        id_ : int
+            The id to test for
+
+        Returns
+        -------
+        bool
+            Whether the plate configuration exists or not
+        """
+        return reference.PLATE_CONFIGURATIONS.get_row(id_) is not None
+
+    def _get_attr(self, attr):
+        """Returns the value of the given attribute from the cached row"""
+        return reference.PLATE_CONFIGURATIONS.get_row(self.id)[attr]
 
     @property
     def description(self):
@@ -90,6 +151,78 @@ class PlateConfiguration(base.LabControlObject):
         return self._get_attr('num_columns')
 
 
+class PlateSnapshot(object):
+    """Read-only, array-backed view of the contents of a plate
+
+    All the attributes are 2D np.arrays with the shape of the plate
+    configuration, indexed by (row - 1, column - 1). Positions without a
+    well hold 0 in the numeric arrays and None in the object arrays.
+
+    Attributes
+    ----------
+    plate_id : int
+        The id of the plate
+    well_ids : np.array of int
+        The id of the well at each position
+    composition_ids : np.array of int
+        The composition id of the content of each well
+    composition_types : np.array of str
+        The composition type of each well, e.g. 'gDNA'
+    notes : np.array of str
+        The notes of the composition of each well
+    sample_ids : np.array of str
+        The sample id of the sample composition the well derives from, None
+        for blanks, controls and unknown samples
+    contents : np.array of str
+        The content of the sample composition the well derives from
+    sample_composition_types : np.array of str
+        The type of the sample composition the well derives from, e.g.
+        'blank' or 'experimental sample'
+    study_ids : np.array of int
+        The study of the sample in each well, None if it doesn't belong to
+        a study
+    specimen_ids : np.array of str
+        The specimen id of each well, see `SampleComposition.specimen_id`
+    quantified : np.array of bool
+        Whether each well was quantified by the quantification process.
+        Only set if the snapshot was taken for a quantification process
+    raw_concentrations : np.array of float
+        The raw concentration of each well. Only set if the snapshot was
+        taken for a quantification process
+    computed_concentrations : np.array of float
+        The computed concentration of each well. Only set if the snapshot was
+        taken for a quantification process
+
+    See Also
+    --------
+    Plate.snapshot
+    """
+    def __init__(self, plate_id, num_rows, num_columns, quantified=False):
+        shape = (num_rows, num_columns)
+        self.plate_id = plate_id
+        self.well_ids = np.zeros(shape, dtype=np.int64)
+        self.composition_ids = np.zeros(shape, dtype=np.int64)
+        self.composition_types = np.full(shape, None, dtype=object)
+        self.notes = np.full(shape, None, dtype=object)
+        self.sample_ids = np.full(shape, None, dtype=object)
+        self.contents = np.full(shape, None, dtype=object)
+        self.sample_composition_types = np.full(shape, None, dtype=object)
+        self.study_ids = np.full(shape, None, dtype=object)
+        self.specimen_ids = np.full(shape, None, dtype=object)
+        self.quantified = None
+        self.raw_concentrations = None
+        self.computed_concentrations = None
+        if quantified:
+            self.quantified = np.zeros(shape, dtype=bool)
+            self.raw_concentrations = np.zeros(shape, dtype=float)
+            self.computed_concentrations = np.zeros(shape, dtype=float)
+
+    @property
+    def shape(self):
+        """The (rows, columns) shape of the arrays"""
+        return self.well_ids.shape
+
+
 class Plate(base.LabControlObject):
     """Plate object
 
@@ -124,11 +257,78 @@ class Plate(base.LabControlObject):
         query_type : {INTERSECT, UNION}
             Whether to return the results that fullfill all of the search
             restrictions or just one of them. Defaul: INTERSECT
+
+        Returns
+        -------
+        list of Plate
+            The plates found, sorted by id
+
+        See Also
+        --------
+        search_page
+        """
+        page = Plate.search_page(samples=samples, plate_notes=plate_notes,
+                                 well_notes=well_notes, query_type=query_type)
+        return [Plate._from_trusted_id(pid)
+                for pid in sorted(p['plate_id'] for p in page['plates'])]
+
+    @staticmethod
+    @sql_connection.read_only_transaction
+    def search_page(samples=None, plate_notes=None, well_notes=None,
+                    plate_name=None, sample_content=None,
+                    query_type='INTERSECT', offset=0, limit=None):
+        """Search plates, returning a page of ranked results
+
+        Parameters
+        ----------
+        samples: list of str, optional
+            The samples to find in the plates
+        plate_notes : str, optional
+            The plate notes string to search for. Default: None
+        well_notes : str, optional
+            The well notes string to search for. Default: None
+        plate_name : str, optional
+            A substring of the plate name (external id) to search for,
+            case-insensitive. Default: None
+        sample_content : str, optional
+            A substring of the contents of the plate wells to search for,
+            case-insensitive. Default: None
+        query_type : {INTERSECT, UNION}
+            Whether to return the results that fullfill all of the search
+            restrictions or just one of them. Defaul: INTERSECT
+        offset: int, optional
+            The number of plates to skip. Default: 0
+        limit: int, optional
+            The maximum number of plates to return. Default: all
+
+        Returns
+        -------
+        dict
+            The page with the structure:
+            {'total': int,
+             'plates': [{'plate_id': int, 'external_id': str,
+                         'rank': float}]}
+            where 'total' is the number of plates found. The plates are
+            sorted from best to worst match, and then by id
+
+        Raises
+        ------
+        ValueError
+            If no search restriction is provided, or `query_type` is not
+            valid
+
+        Notes
+        -----
+        The notes are searched with the 'english' text search configuration,
+        which the full-text indexes of the notes are built with. A plate's
+        rank is the sum of its ranks for each restriction it fulfills.
         """
-        if samples is None and plate_notes is None and well_notes is None:
+        if all(r is None for r in [samples, plate_notes, well_notes,
+                                   plate_name, sample_content]):
             raise ValueError(
-                'Search error: "samples", "plate_notes" and "well_notes" is '
-                'None, please provide at least one of them.')
+                'Search error: "samples", "plate_notes", "well_notes", '
+                '"plate_name" and "sample_content" is None, please provide '
+                'at least one of them.')
 
         if query_type not in ('INTERSECT', 'UNION'):
             raise ValueError('query_type should be INTERSECT or UNION. Found:'
@@ -138,44 +338,99 @@ class Plate(base.LabControlObject):
             sql_queries = []
             sql_args = []
             if samples:
+                # Ranked by the fraction of the samples in the plate
                 sql_queries.append(
-                    """SELECT DISTINCT plate_id
-                       FROM labcontrol.well
-                            JOIN labcontrol.composition USING (container_id)
-                            JOIN labcontrol.sample_composition
+                    """SELECT w.plate_id,
+                              count(DISTINCT sc.sample_id)::real / %s AS rank
+                       FROM labcontrol.well w
+                            JOIN labcontrol.composition c USING (container_id)
+                            JOIN labcontrol.sample_composition sc
                                 USING (composition_id)
-                       WHERE sample_id IN %s""")
-                sql_args.append(tuple(samples))
+                       WHERE sc.sample_id = ANY(%s)
+                       GROUP BY w.plate_id""")
+                sql_args.extend([len(set(samples)), list(samples)])
             if plate_notes:
                 sql_queries.append(
-                    """SELECT plate_id
-                       FROM labcontrol.plate
-                       WHERE notes @@ to_tsquery(%s)""")
+                    """SELECT plate_id,
+                              ts_rank(to_tsvector('english', notes), q) AS rank
+                       FROM labcontrol.plate,
+                            to_tsquery('english', %s) AS q
+                       WHERE to_tsvector('english', notes) @@ q""")
                 sql_args.append(
                     ' & '.join([w for w in plate_notes.split()]))
             if well_notes:
                 sql_queries.append(
-                    """SELECT plate_id
-                       FROM labcontrol.well
-                            JOIN labcontrol.composition USING (container_id)
-                       WHERE notes @@ to_tsquery(%s)""")
+                    """SELECT w.plate_id,
+                              max(ts_rank(to_tsvector('english', c.notes), q))
+                                AS rank
+                       FROM labcontrol.well w
+                            JOIN labcontrol.composition c USING (container_id),
+                            to_tsquery('english', %s) AS q
+                       WHERE to_tsvector('english', c.notes) @@ q
+                       GROUP BY w.plate_id""")
                 sql_args.append(
                     ' & '.join([w for w in well_notes.split()]))
-
-            if len(sql_queries) > 1:
-                sql = (" %s " % query_type).join(sql_queries)
-            else:
-                sql = sql_queries[0]
+            # The substring matches are ranked by how much of the matched
+            # value the term covers
+            if plate_name:
+                sql_queries.append(
+                    """SELECT plate_id,
+                              length(%s)::real / length(external_id) AS rank
+                       FROM labcontrol.plate
+                       WHERE external_id ILIKE %s""")
+                sql_args.extend([plate_name, '%{}%'.format(plate_name)])
+            if sample_content:
+                sql_queries.append(
+                    """SELECT w.plate_id,
+                              max(length(%s)::real / length(sc.content))
+                                AS rank
+                       FROM labcontrol.well w
+                            JOIN labcontrol.composition c USING (container_id)
+                            JOIN labcontrol.sample_composition sc
+                                USING (composition_id)
+                       WHERE sc.content ILIKE %s
+                       GROUP BY w.plate_id""")
+                sql_args.extend(
+                    [sample_content, '%{}%'.format(sample_content)])
+
+            if not sql_queries:
+                # All the restrictions are empty, nothing can match them
+                return {'total': 0, 'plates': []}
+
+            # Each restriction matches a plate at most once, so the plates
+            # fulfilling all of them are the ones matched by all the queries
+            sql_having = ''
+            if query_type == 'INTERSECT':
+                sql_having = 'HAVING count(*) = %d' % len(sql_queries)
+            sql_args.extend([limit, offset])
+            sql = """WITH matches AS (
+                        SELECT m.plate_id, p.external_id, sum(m.rank) AS rank
+                        FROM ({0}) AS m
+                            JOIN labcontrol.plate p USING (plate_id)
+                        GROUP BY m.plate_id, p.external_id
+                        {1}),
+                     page AS (
+                        SELECT * FROM matches
+                        ORDER BY rank DESC, plate_id
+                        LIMIT %s OFFSET %s)
+                     SELECT (SELECT count(*) FROM matches) AS total,
+                            page.plate_id, page.external_id, page.rank
+                     FROM (SELECT 1) AS counts
+                        LEFT JOIN page ON TRUE
+                     ORDER BY page.rank DESC, page.plate_id""".format(
+                ' UNION ALL '.join(sql_queries), sql_having)
             TRN.add(sql, sql_args)
+            rows = TRN.execute_fetchindex(row_type='tuple')
 
-            # explicitly sorting to ensure a deterministic result.
-            # sorting ids in python rather than with a SQL ORDER BY since
-            # there are several different SQL queries potentially being run.
-            sorted_pids = sorted(TRN.execute_fetchflatten())
-            res = [Plate(pid) for pid in sorted_pids]
-        return res
+        # The page is empty if there is a single row without a plate
+        return {'total': rows[0][0],
+                'plates': [{'plate_id': plate_id, 'external_id': external_id,
+                            'rank': rank}
+                           for _, plate_id, external_id, rank in rows
+                           if plate_id is not None]}
 
     @staticmethod
+    @sql_connection.read_only_transaction
     def list_plates(plate_types=None, only_quantified=False,
                     include_discarded=False,
                     include_study_titles=False):
@@ -200,60 +455,160 @@ class Plate(base.LabControlObject):
             The list of plate information with the structure:
             [{'plate_id': int, 'external_id': string,
               'creation_timestamp': datetime}]
+
+        See Also
+        --------
+        list_plates_page
+        """
+        return Plate.list_plates_page(
+            plate_types=plate_types, only_quantified=only_quantified,
+            include_discarded=include_discarded,
+            include_study_titles=include_study_titles)['plates']
+
+    @staticmethod
+    @sql_connection.read_only_transaction
+    def list_plates_page(plate_types=None, only_quantified=False,
+                         include_discarded=False, include_study_titles=False,
+                         search=None, sort_column='plate_id',
+                         sort_descending=False, offset=0, limit=None,
+                         after=None):
+        """Returns a page of the plate list, with the total counts
+
+        Filtering, sorting, pagination and counting are all done by the
+        database in a single query, so this backs the server-side processing
+        mode of DataTables. The plates are filtered on their summary, which
+        is refreshed when the transactions modifying them commit.
+
+        Parameters
+        ----------
+        plate_types: list, optional
+            If provided, limit the plate list to the given types
+        only_quantified: bool, optional
+            If true, return only those plates that have been quantified
+            Default: false.
+        include_discarded: bool, optional
+            If true, plates that have been marked as discarded will be
+            included in this list, otherwise they won't.
+        include_study_titles: bool, optional
+            If true, return also the studies included in each plate
+        search: str, optional
+            If provided, return only the plates whose external id contains
+            the term (case-insensitive) or whose id is the term
+        sort_column: {'plate_id', 'external_id', 'creation_timestamp'}
+            The column to sort the plates by. Ties are sorted by plate id.
+            Default: 'plate_id'
+        sort_descending: bool, optional
+            Whether to sort in descending order. Default: false.
+        offset: int, optional
+            The number of plates to skip. Default: 0
+        limit: int, optional
+            The maximum number of plates to return. Default: all
+        after: tuple of (object, int), optional
+            The `sort_column` value and the plate id of the last plate of the
+            previous page. If provided, the page starts right after that
+            plate (keyset pagination), which unlike `offset` doesn't need to
+            scan the skipped plates
+
+        Returns
+        -------
+        dict
+            The page with the structure:
+            {'total': int, 'filtered': int,
+             'plates': [{'plate_id': int, 'external_id': string,
+                         'creation_timestamp': datetime}]}
+            where 'total' is the number of plates before applying `search`
+            and 'filtered' the number of plates after applying it
+
+        Raises
+        ------
+        ValueError
+            If `sort_column` is not one of the valid columns
         """
+        sort_columns = ('plate_id', 'external_id', 'creation_timestamp')
+        if sort_column not in sort_columns:
+            raise ValueError('sort_column must be one of: %s'
+                             % ', '.join(sort_columns))
+
         with sql_connection.TRN as TRN:
-            sql_where, sql_discard, sql_plate_types = '', '', ''
+            # Only plates holding compositions are listed
+            sql_plates = ['ps.composition_type_id IS NOT NULL']
             sql_args = []
-            sql_join = ''
-
             # do not include discarded plates
             if not include_discarded:
-                sql_discard = 'discarded = FALSE '
+                sql_plates.append('NOT p.discarded')
 
             # Not using if plate_type is not None cause I also want to cover
             # the case in which the list is empty
-            sql_studies = ''
             if plate_types:
-                sql_plate_types = 'description IN %s'
+                sql_plates.append("""ps.composition_type_id IN (
+                                        SELECT composition_type_id
+                                        FROM labcontrol.composition_type
+                                        WHERE description IN %s)""")
                 sql_args.append(tuple(plate_types))
-
-            # The WHERE clause is only needed if we have to filter plates
-            # (which may depend on multiple conditions)
-            if sql_discard != '' or sql_plate_types != '':
-                sql_where = 'WHERE '
-                if sql_discard != '' and sql_plate_types != '':
-                    sql_where += sql_discard + ' AND ' + sql_plate_types
-                else:
-                    sql_where += sql_discard + ' ' + sql_plate_types
-
             if only_quantified:
-                sql_join = ("JOIN labcontrol.concentration_calculation "
-                            "ON quantitated_composition_id = composition_id")
+                sql_plates.append('ps.quantified')
+
+            sql_search = ''
+            if search:
+                sql_search = """WHERE external_id ILIKE %s OR
+                                      plate_id::text = %s"""
+                sql_args.extend(['%{}%'.format(search), search])
+
+            order = 'DESC' if sort_descending else 'ASC'
+            sql_page = []
+            if after is not None:
+                sql_page.append('({0}, plate_id) {1} (%s, %s)'.format(
+                    sort_column, '<' if sort_descending else '>'))
+                sql_args.extend(after)
+            sql_page = 'WHERE ' + ' AND '.join(sql_page) if sql_page else ''
+            sql_args.extend([limit, offset])
+
+            sql_studies = ''
             if include_study_titles:
-                sql_studies = (', labcontrol.get_plate_studies(p.plate_id) '
-                               'AS studies')
-
-            sql = """SELECT p.plate_id, p.external_id, p.creation_timestamp {}
-                        FROM (SELECT DISTINCT plate_id, external_id,
-                                              creation_timestamp
-                              FROM labcontrol.plate
-                                JOIN labcontrol.well USING (plate_id)
-                                JOIN labcontrol.composition
-                                    USING (container_id)
-                                JOIN labcontrol.composition_type USING
-                                    (composition_type_id)
-                                {}
-                             {}) AS p
-                     ORDER BY plate_id""".format(sql_studies, sql_join,
-                                                 sql_where)
+                sql_studies = """,
+                        (SELECT array_agg(study_title ORDER BY study_title)
+                         FROM qiita.study
+                         WHERE study_id = ANY(page.study_ids)) AS studies"""
+
+            # The counts are joined to the page, instead of the other way
+            # around, so they are returned even if the page is empty
+            sql = """WITH plates AS (
+                        SELECT plate_id, p.external_id, p.creation_timestamp,
+                               ps.study_ids
+                        FROM labcontrol.plate p
+                            JOIN labcontrol.plate_summary ps USING (plate_id)
+                        WHERE {0}),
+                     filtered AS (
+                        SELECT * FROM plates {1}),
+                     page AS (
+                        SELECT * FROM filtered {2}
+                        ORDER BY {3} {4}, plate_id {4}
+                        LIMIT %s OFFSET %s)
+                     SELECT (SELECT count(*) FROM plates) AS total,
+                            (SELECT count(*) FROM filtered) AS filtered,
+                            page.plate_id, page.external_id,
+                            page.creation_timestamp{5}
+                     FROM (SELECT 1) AS counts
+                        LEFT JOIN page ON TRUE
+                     ORDER BY page.{3} {4}, page.plate_id {4}""".format(
+                ' AND '.join(sql_plates), sql_search, sql_page, sort_column,
+                order, sql_studies)
             TRN.add(sql, sql_args)
 
+            rows = TRN.execute_fetchindex()
             results = []
-            for r in TRN.execute_fetchindex():
+            for r in rows:
+                if r['plate_id'] is None:
+                    # The page is empty
+                    continue
                 r = dict(r)
+                r.pop('total')
+                r.pop('filtered')
                 r['creation_timestamp'] = str(r['creation_timestamp'])
                 results.append(r)
-            return results
+            return {'total': rows[0]['total'],
+                    'filtered': rows[0]['filtered'],
+                    'plates': results}
 
     @staticmethod
     def external_id_exists(external_id):
@@ -337,10 +692,84 @@ class Plate(base.LabControlObject):
     def notes(self, value):
         return self._set_attr('notes', value)
 
+    @property
+    def implicit_blanks(self):
+        """Whether the positions of the plate without a well hold blanks
+
+        Plates created with `SamplePlatingProcess.create(...,
+        implicit_blanks=True)` only store the wells that have been edited.
+        The rest read as blanks until `materialize_blanks` stores them, which
+        the processes that modify the plate or use it as input do first.
+
+        Returns
+        -------
+        bool
+        """
+        return self._get_implicit_blanks() is not None
+
+    def _get_implicit_blanks(self):
+        """Returns the plating process and well volume of the implicit blanks
+
+        Returns
+        -------
+        (int, float) or None
+            The id of the sample plating process that created the plate and
+            the volume of its wells, or None if the plate has no implicit
+            blanks
+        """
+        with sql_connection.TRN as TRN:
+            sql = """SELECT process_id, well_volume
+                     FROM labcontrol.implicit_blank_plate
+                     WHERE plate_id = %s"""
+            TRN.add(sql, [self.id])
+            res = TRN.execute_fetchindex(row_type='tuple')
+        return res[0] if res else None
+
+    def materialize_blanks(self):
+        """Stores the implicit blanks of the plate as wells
+
+        All the positions without a well get a well with a blank sample
+        composition, created in bulk. Plates without implicit blanks are
+        left untouched.
+        """
+        with sql_connection.TRN as TRN:
+            implicit = self._get_implicit_blanks()
+            if implicit is None:
+                return
+            process_id, volume = implicit
+            pc = self.plate_configuration
+            sql = """SELECT row_num, col_num
+                     FROM labcontrol.well
+                     WHERE plate_id = %s"""
+            TRN.add(sql, [self.id])
+            missing = np.ones((pc.num_rows, pc.num_columns), dtype=bool)
+            stored = np.array(TRN.execute_fetchindex(row_type='tuple'),
+                              dtype=np.int64).reshape(-1, 2)
+            missing[stored[:, 0] - 1, stored[:, 1] - 1] = False
+            rows, cols = np.nonzero(missing)
+            rows, cols = rows + 1, cols + 1
+
+            sc = composition_module.SampleComposition
+            plate_builder.create_wells(
+                process_module.SamplePlatingProcess._from_trusted_id(
+                    process_id),
+                self, sc, rows, cols, volume,
+                {'sample_composition_type_id':
+                    sc._get_sample_composition_type_id('blank'),
+                 'content': sc.generate_contents('blank', self, rows, cols)})
+
+            sql = """DELETE FROM labcontrol.implicit_blank_plate
+                     WHERE plate_id = %s"""
+            TRN.add(sql, [self.id])
+            TRN.execute()
+
     @property
     def layout(self):
         """Returns a matrix containing the wells of the plate
 
+        The implicit blanks of the plate, if any, are not stored: their
+        positions hold an in-memory `ImplicitBlankWell`
+
         Returns
         -------
         list of list of labcontrol.db.Well
@@ -357,10 +786,164 @@ class Plate(base.LabControlObject):
             TRN.add(sql, [self.id])
 
             for well_id, row, col in TRN.execute_fetchindex():
-                layout[row-1][col-1] = container_module.Well(well_id)
+                layout[row-1][col-1] = (
+                    container_module.Well._from_trusted_id(well_id))
+
+            implicit = self._get_implicit_blanks()
+            if implicit is not None:
+                self._fill_implicit_layout(layout, *implicit)
 
         return layout
 
+    def _fill_implicit_layout(self, layout, process_id, volume):
+        """Fills the positions of a layout without a well with blanks
+
+        Parameters
+        ----------
+        layout : list of list of labcontrol.db.Well
+            The layout of the plate
+        process_id : int
+            The id of the sample plating process that created the plate
+        volume : float
+            The volume of the wells of the plate
+        """
+        missing = np.array([[well is None for well in row]
+                            for row in layout], dtype=bool)
+        rows, cols = np.nonzero(missing)
+        rows, cols = rows + 1, cols + 1
+        contents = composition_module.SampleComposition.generate_contents(
+            'blank', self, rows, cols)
+        process = process_module.SamplePlatingProcess._from_trusted_id(
+            process_id)
+        for row, col, content in zip(rows, cols, contents):
+            layout[row - 1][col - 1] = container_module.ImplicitBlankWell(
+                self, int(row), int(col), process, volume, content)
+
+    def snapshot(self, quantification_process=None):
+        """Returns the contents of the plate as arrays
+
+        The contents of all the wells, including the sample they derive from,
+        are retrieved with a single query, so this is much cheaper than
+        walking `layout` when the whole plate is needed.
+
+        Parameters
+        ----------
+        quantification_process : QuantificationProcess, optional
+            If provided, the concentrations computed by this process are
+            also retrieved
+
+        Returns
+        -------
+        PlateSnapshot
+            The contents of the plate
+        """
+        with sql_connection.TRN as TRN:
+            pc = self.plate_configuration
+            sql = """SELECT w.well_id, w.row_num, w.col_num,
+                            c.composition_id, ct.description, c.notes,
+                            sc.sample_id, sc.content, sct.external_id,
+                            ss.study_id{0}
+                     FROM labcontrol.well w
+                        JOIN labcontrol.composition c USING (container_id)
+                        JOIN labcontrol.composition_type ct
+                            USING (composition_type_id)
+                        {1}
+                        LEFT JOIN labcontrol.sample_composition_type sct
+                            ON sct.sample_composition_type_id =
+                                sc.sample_composition_type_id
+                        LEFT JOIN qiita.study_sample ss
+                            ON ss.sample_id = sc.sample_id
+                        {2}
+                     WHERE w.plate_id = %s"""
+            args = [self.id]
+            quantified = quantification_process is not None
+            if quantified:
+                sql = sql.format(
+                    """, cc.raw_concentration, cc.computed_concentration""",
+                    _SAMPLE_COMPOSITION_JOINS,
+                    """LEFT JOIN labcontrol.concentration_calculation cc
+                            ON cc.quantitated_composition_id =
+                                c.composition_id
+                                AND cc.upstream_process_id = %s""")
+                args.insert(0, quantification_process.id)
+            else:
+                sql = sql.format('', _SAMPLE_COMPOSITION_JOINS, '')
+            TRN.add(sql, args)
+            rows = TRN.execute_fetchindex(row_type='tuple')
+
+            snapshot = PlateSnapshot(self.id, pc.num_rows, pc.num_columns,
+                                     quantified=quantified)
+            if not rows:
+                self._fill_implicit_blanks(snapshot)
+                return snapshot
+
+            columns = list(zip(*rows))
+            rows_idx = np.asarray(columns[1], dtype=np.intp) - 1
+            cols_idx = np.asarray(columns[2], dtype=np.intp) - 1
+            idx = (rows_idx, cols_idx)
+            snapshot.well_ids[idx] = columns[0]
+            snapshot.composition_ids[idx] = columns[3]
+            for attr, values in (('composition_types', columns[4]),
+                                 ('notes', columns[5]),
+                                 ('sample_ids', columns[6]),
+                                 ('contents', columns[7]),
+                                 ('sample_composition_types', columns[8]),
+                                 ('study_ids', columns[9])):
+                arr = np.empty(len(rows), dtype=object)
+                arr[:] = values
+                getattr(snapshot, attr)[idx] = arr
+            if quantified:
+                raw = np.array(columns[10], dtype=float)
+                computed = np.array(columns[11], dtype=float)
+                snapshot.quantified[idx] = ~np.isnan(raw)
+                snapshot.raw_concentrations[idx] = np.nan_to_num(raw)
+                # The computed concentration is optional, keep it as NaN
+                # in the wells that were quantified without one
+                computed[np.isnan(raw)] = 0
+                snapshot.computed_concentrations[idx] = computed
+
+            # Wells that don't belong to a study are identified by their
+            # content, the rest by the specimen id of their study
+            specimen_ids = snapshot.specimen_ids
+            specimen_ids[:] = snapshot.contents
+            study_ids = snapshot.study_ids
+            for study_id in set(columns[9]) - {None}:
+                mask = study_ids == study_id
+                sample_ids = snapshot.sample_ids[mask]
+                study = study_module.Study._from_trusted_id(study_id)
+                specimens = study.sample_ids_to_specimen_ids(sample_ids)
+                missing = set(sample_ids) - specimens.keys()
+                if missing:
+                    raise ValueError(
+                        'Could not find "%s"' % ', '.join(sorted(missing)))
+                specimen_ids[mask] = [specimens[s] for s in sample_ids]
+
+            self._fill_implicit_blanks(snapshot)
+
+        return snapshot
+
+    def _fill_implicit_blanks(self, snapshot):
+        """Fills the positions of a snapshot without a well with blanks
+
+        Only plates created with implicit blanks are filled, in the rest the
+        positions without a well are left empty
+
+        Parameters
+        ----------
+        snapshot : PlateSnapshot
+            The snapshot of the plate
+        """
+        if not self.implicit_blanks:
+            return
+        missing = snapshot.well_ids == 0
+        rows, cols = np.nonzero(missing)
+        contents = composition_module.SampleComposition.generate_contents(
+            'blank', self, rows + 1, cols + 1)
+        snapshot.composition_types[missing] = 'sample'
+        snapshot.sample_composition_types[missing] = 'blank'
+        snapshot.contents[missing] = contents
+        snapshot.specimen_ids[missing] = contents
+
     @property
     def studies(self):
         """The studies present in the plate
@@ -370,13 +953,17 @@ class Plate(base.LabControlObject):
         set of labcontrol.db.study.Study
         """
         with sql_connection.TRN as TRN:
-            sql = "SELECT well_id FROM labcontrol.well WHERE plate_id = %s"
+            sql = """SELECT DISTINCT ss.study_id
+                     FROM labcontrol.well w
+                        JOIN labcontrol.composition c USING (container_id)
+                        {}
+                        JOIN qiita.study_sample ss
+                            ON ss.sample_id = sc.sample_id
+                     WHERE w.plate_id = %s""".format(_SAMPLE_COMPOSITION_JOINS)
             TRN.add(sql, [self.id])
-            res = set(container_module.Well(well_id).composition.study
-                      for well_id in TRN.execute_fetchflatten())
-            # If there are controls, those return None as the study, remove it
-            # from the list
-            res.discard(None)
+            # Controls don't belong to any study, so they are not included
+            res = set(study_module.Study._from_trusted_id(study_id)
+                      for study_id in TRN.execute_fetchflatten())
         return res
 
     @property
@@ -394,7 +981,69 @@ class Plate(base.LabControlObject):
                         JOIN labcontrol.well USING (container_id)
                      WHERE plate_id = %s"""
             TRN.add(sql, [self.id])
-            return process_module.Process.factory(TRN.execute_fetchlast())
+            process_id = TRN.execute_fetchlast()
+            if process_id is None:
+                # A plate with implicit blanks may not have any well yet
+                implicit = self._get_implicit_blanks()
+                if implicit is not None:
+                    process_id = implicit[0]
+            return process_module.Process.factory(process_id)
+
+    @staticmethod
+    def summaries(plate_ids):
+        """Returns the summary of several plates
+
+        Parameters
+        ----------
+        plate_ids : iterable of int
+            The plate ids
+
+        Returns
+        -------
+        dict of {int: dict}
+            The summary of each plate, keyed by plate id, with the structure:
+            {'plate_id': int, 'content_type': str or None, 'num_wells': int,
+             'quantified': bool, 'process_id': int or None,
+             'study_ids': list of int}
+            where 'content_type' is the composition type of the contents of
+            the plate and 'process_id' the id of the process that generated
+            it, both None if the plate is empty
+
+        Raises
+        ------
+        LabControlUnknownIdError
+            If any of the plates doesn't exist
+
+        Notes
+        -----
+        The summaries are kept by the database, and refreshed when the
+        transaction that modified the plate commits.
+        """
+        plate_ids = [int(plate_id) for plate_id in plate_ids]
+        with sql_connection.TRN as TRN:
+            sql = """SELECT plate_id, description AS content_type, num_wells,
+                            quantified, process_id, study_ids
+                     FROM labcontrol.plate_summary
+                        LEFT JOIN labcontrol.composition_type
+                            USING (composition_type_id)
+                     WHERE plate_id = ANY(%s)"""
+            TRN.add(sql, [plate_ids])
+            res = {r['plate_id']: dict(r) for r in TRN.execute_fetchindex()}
+        for plate_id in plate_ids:
+            if plate_id not in res:
+                raise exceptions_module.LabControlUnknownIdError(
+                    Plate._table, plate_id)
+        return res
+
+    @property
+    def summary(self):
+        """The summary of the plate
+
+        See Also
+        --------
+        summaries
+        """
+        return Plate.summaries([self.id])[self.id]
 
     @property
     def quantification_processes(self):
@@ -415,8 +1064,8 @@ class Plate(base.LabControlObject):
                      WHERE plate_id = %s
                      ORDER BY cc.upstream_process_id"""
             TRN.add(sql, [self.id])
-            res = [process_module.QuantificationProcess(process_id)
-                   for process_id in TRN.execute_fetchflatten()]
+            res = [process_module.QuantificationProcess._from_trusted_id(
+                process_id) for process_id in TRN.execute_fetchflatten()]
             res.sort(key=lambda x: x.date)
         return res
 
@@ -441,7 +1090,7 @@ class Plate(base.LabControlObject):
                      HAVING array_length(array_agg(well_id), 1) > 1
                      ORDER BY sample_id"""
             TRN.add(sql, [self.id])
-            res = {sample_id: [[container_module.Well(w), c]
+            res = {sample_id: [[container_module.Well._from_trusted_id(w), c]
                                for w, c in zip(wells, contents)]
                    for sample_id, wells, contents in TRN.execute_fetchindex()}
         return res
@@ -467,7 +1116,7 @@ class Plate(base.LabControlObject):
                            sample_id IS NULL
                      ORDER BY well_id"""
             TRN.add(sql, [self.id])
-            res = [container_module.Well(w)
+            res = [container_module.Well._from_trusted_id(w)
                    for w in TRN.execute_fetchflatten()]
         return res
 
@@ -502,7 +1151,7 @@ class Plate(base.LabControlObject):
                     "Well (%s, %s) doesn't exist in plate %s"
                     % (row, column, self.id))
 
-            return container_module.Well(res[0][0])
+            return container_module.Well._from_trusted_id(res[0][0])
 
     def get_wells_by_sample(self, sample_id):
         """Returns the list of wells containing the given sample
@@ -525,10 +1174,41 @@ class Plate(base.LabControlObject):
                      WHERE plate_id = %s AND sample_id = %s
                      ORDER BY well_id"""
             TRN.add(sql, [self.id, sample_id])
-            res = [container_module.Well(well)
+            res = [container_module.Well._from_trusted_id(well)
                    for well in TRN.execute_fetchflatten()]
         return res
 
+    def get_other_plates_by_sample(self, sample_ids):
+        """Returns the other plates holding each of the given samples
+
+        Parameters
+        ----------
+        sample_ids : iterable of str
+            The samples to search for
+
+        Returns
+        -------
+        dict of {str: list of dict}
+            The plates other than this one holding each sample, as
+            {'plate_id': int, 'external_id': str}, sorted by id. Samples
+            that are not in any other plate are not included
+        """
+        with sql_connection.TRN as TRN:
+            sql = """SELECT DISTINCT sc.sample_id, p.plate_id, p.external_id
+                     FROM labcontrol.sample_composition sc
+                        JOIN labcontrol.composition c USING (composition_id)
+                        JOIN labcontrol.well w USING (container_id)
+                        JOIN labcontrol.plate p USING (plate_id)
+                     WHERE sc.sample_id = ANY(%s) AND p.plate_id <> %s
+                     ORDER BY sc.sample_id, p.plate_id"""
+            TRN.add(sql, [list(sample_ids), self.id])
+            res = {}
+            for sample_id, plate_id, external_id in TRN.execute_fetchindex(
+                    row_type='tuple'):
+                res.setdefault(sample_id, []).append(
+                    {'plate_id': plate_id, 'external_id': external_id})
+        return res
+
     def get_previously_plated_wells(self):
         """Get wells with samples that have been previously plated
 
@@ -539,24 +1219,28 @@ class Plate(base.LabControlObject):
             and the plates in which they're found
         """
         with sql_connection.TRN as TRN:
-            sql = """SELECT plate_id, array_agg(sample_id)
-                     FROM labcontrol.sample_composition
-                        JOIN labcontrol.composition USING (composition_id)
-                        JOIN labcontrol.well USING (container_id)
-                     WHERE plate_id <> %s AND sample_id IN (
-                        SELECT sample_id
-                        FROM labcontrol.sample_composition
-                            JOIN labcontrol.composition USING (composition_id)
-                            JOIN labcontrol.well USING (container_id)
-                            WHERE plate_id = %s)
-                     GROUP BY plate_id"""
+            sql = """SELECT w.well_id,
+                            array_agg(DISTINCT pw.plate_id
+                                      ORDER BY pw.plate_id)
+                     FROM labcontrol.well w
+                        JOIN labcontrol.composition c USING (container_id)
+                        JOIN labcontrol.sample_composition sc
+                            USING (composition_id)
+                        JOIN labcontrol.sample_composition psc
+                            ON psc.sample_id = sc.sample_id
+                        JOIN labcontrol.composition pc
+                            ON pc.composition_id = psc.composition_id
+                        JOIN labcontrol.well pw
+                            ON pw.container_id = pc.container_id
+                     WHERE w.plate_id = %s AND pw.plate_id <> %s
+                     GROUP BY w.well_id"""
             TRN.add(sql, [self.id, self.id])
-            prev_plated = TRN.execute_fetchindex()
-            res = defaultdict(list)
-            for plate_id, samples in prev_plated:
-                for sample in samples:
-                    for well in self.get_wells_by_sample(sample):
-                        res[well].append(plate_id)
-            res = {well: [Plate(x) for x in sorted(list(set(plate_ids)))]
-                   for well, plate_ids in res.items()}
+            prev_plated = TRN.execute_fetchindex(row_type='tuple')
+            # Share the plate objects, so each plate is only loaded once
+            plates = {plate_id: Plate._from_trusted_id(plate_id)
+                      for _, plate_ids in prev_plated
+                      for plate_id in plate_ids}
+            res = {container_module.Well._from_trusted_id(well_id):
+                   [plates[plate_id] for plate_id in plate_ids]
+                   for well_id, plate_ids in prev_plated}
         return res
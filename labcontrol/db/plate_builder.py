@@ -0,0 +1,152 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2017-, LabControl development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+"""Bulk creation of the wells of a plate and their compositions
+
+Creating a well with `Well.create` and its composition with the `create`
+method of a composition subclass takes several queries, so filling a plate
+one well at a time takes thousands of round-trips. `create_wells` inserts
+the containers, wells, compositions and composition subtype rows of all the
+wells with one COPY per table instead.
+"""
+
+import numpy as np
+
+from . import sql_connection
+from . import reference
+
+
+def create_wells(process, plate, composition_cls, rows, columns, volumes,
+                 subtype_columns=None):
+    """Creates wells holding new compositions in a constant number of queries
+
+    Parameters
+    ----------
+    process : labcontrol.db.process.Process
+        The process creating the wells and their compositions
+    plate : labcontrol.db.plate.Plate
+        The plate the wells belong to
+    composition_cls : subclass of labcontrol.db.composition.Composition
+        The class of the compositions held by the wells
+    rows : array_like of int
+        The 1-based row of each well
+    columns : array_like of int
+        The 1-based column of each well
+    volumes : float or array_like of float
+        The initial volume of each well and of its composition
+    subtype_columns : dict of {str: array_like}, optional
+        The values of the columns of the composition subtype table (e.g.
+        `{'sample_composition_id': [...]}` for gDNA compositions), one per
+        well. Scalars are used for all the wells
+
+    Returns
+    -------
+    (np.array of int, np.array of int)
+        The ids of the new wells and the ids of their compositions in the
+        subtype table, in the same order as `rows`
+
+    Raises
+    ------
+    ValueError
+        If `rows` and `columns` have different lengths, or any of the values
+        cannot be inserted
+    """
+    rows = np.asarray(rows, dtype=np.int64).ravel()
+    columns = np.asarray(columns, dtype=np.int64).ravel()
+    if len(rows) != len(columns):
+        raise ValueError('Found %d rows but %d columns'
+                         % (len(rows), len(columns)))
+    n_wells = len(rows)
+    volumes = _column(volumes, n_wells)
+    subtype_columns = subtype_columns or {}
+    subtype_names = sorted(subtype_columns)
+    subtype_values = [_column(subtype_columns[c], n_wells)
+                      for c in subtype_names]
+
+    ct_id = reference.CONTAINER_TYPES.get_id('well')
+    comp_type_id = reference.COMPOSITION_TYPES.get_id(
+        composition_cls._composition_type)
+    process_id = process.process_id
+    with sql_connection.TRN as TRN:
+        container_ids = TRN.copy_rows(
+            'labcontrol.container',
+            ['container_type_id', 'latest_upstream_process_id',
+             'remaining_volume'],
+            ((ct_id, process_id, v) for v in volumes),
+            returning='container_id')
+        well_ids = TRN.copy_rows(
+            'labcontrol.well', ['container_id', 'plate_id', 'row_num',
+                                'col_num'],
+            zip(container_ids, [plate.id] * n_wells, rows.tolist(),
+                columns.tolist()),
+            returning='well_id')
+        composition_ids = TRN.copy_rows(
+            'labcontrol.composition',
+            ['composition_type_id', 'upstream_process_id', 'container_id',
+             'total_volume'],
+            ((comp_type_id, process_id, c_id, v)
+             for c_id, v in zip(container_ids, volumes)),
+            returning='composition_id')
+        subtype_ids = TRN.copy_rows(
+            composition_cls._table, ['composition_id'] + subtype_names,
+            zip(composition_ids, *subtype_values),
+            returning=composition_cls._id_column)
+
+    return (np.array(well_ids, dtype=np.int64),
+            np.array(subtype_ids, dtype=np.int64))
+
+
+def subtype_ids(composition_cls, composition_ids):
+    """Returns the ids of some compositions in their subtype table
+
+    Parameters
+    ----------
+    composition_cls : subclass of labcontrol.db.composition.Composition
+        The class of the compositions
+    composition_ids : array_like of int
+        The ids of the compositions in the composition table, e.g. the
+        `composition_ids` of a `PlateSnapshot`
+
+    Returns
+    -------
+    np.array of int
+        The ids of the compositions in the table of `composition_cls`, with
+        the shape of `composition_ids`. Compositions of any other type map
+        to 0
+    """
+    composition_ids = np.asarray(composition_ids, dtype=np.int64)
+    res = np.zeros(composition_ids.shape, dtype=np.int64)
+    if composition_ids.size == 0:
+        return res
+    with sql_connection.TRN as TRN:
+        sql = """SELECT composition_id, {0}
+                 FROM {1}
+                 WHERE composition_id = ANY(%s)""".format(
+            composition_cls._id_column, composition_cls._table)
+        TRN.add(sql, [np.unique(composition_ids).tolist()])
+        lookup = dict(TRN.execute_fetchindex(row_type='tuple'))
+    flat = res.ravel()
+    for i, comp_id in enumerate(composition_ids.ravel().tolist()):
+        flat[i] = lookup.get(comp_id, 0)
+    return res
+
+
+def _column(values, length):
+    """Returns `values` as a list of `length` python values
+
+    Scalars are repeated `length` times
+    """
+    if np.ndim(values) == 0:
+        if isinstance(values, np.generic):
+            values = values.item()
+        return [values] * length
+    values = np.asarray(values).ravel().tolist()
+    if len(values) != length:
+        raise ValueError('Found %d values for %d wells'
+                         % (len(values), length))
+    return values
@@ -0,0 +1,325 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2017-, LabControl development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+"""Parsers of the files exported by plate readers
+
+Each file format has a parser, registered in `PARSERS` with
+`register_parser`. A parser reads the lines of the raw (undecoded) file and
+returns the name of each well it found and the value read for it, or None
+if the file doesn't have the header of its format. `parse` lays the values
+out in the shape of the plate, whatever the format of the file is.
+
+The files are tokenized by hand instead of with pandas: their tables are
+surrounded by free-form text blocks, which pandas can only skip with its
+slow python engine.
+"""
+
+from collections import namedtuple
+from time import perf_counter
+import re
+
+import numpy as np
+import pandas as pd
+
+from . import well_coordinates
+
+
+# The parser of each file format, in the order they are tried when the
+# format of a file is not known
+PARSERS = {}
+
+ParsedPlate = namedtuple('ParsedPlate',
+                         ['file_format', 'concentrations', 'elapsed'])
+ParsedPlate.__doc__ = """The contents of a plate reader file
+
+Attributes
+----------
+file_format : str
+    The format of the file
+concentrations : 2D np.array of float
+    The concentration of each well, NaN for the wells not in the file
+elapsed : float
+    The time it took to parse the file, in seconds
+"""
+
+_ROW_LETTERS = re.compile(rb'^[A-Za-z]+$')
+
+
+def register_parser(file_format):
+    """Registers the decorated function as the parser of a file format
+
+    Parameters
+    ----------
+    file_format : str
+        The name of the file format
+
+    Returns
+    -------
+    callable
+        The decorator
+    """
+    def decorator(func):
+        PARSERS[file_format] = func
+        return func
+    return decorator
+
+
+def read(contents, file_format=None):
+    """Reads the wells and values of a plate reader file
+
+    Parameters
+    ----------
+    contents : bytes or str
+        The contents of the plate reader file
+    file_format : str, optional
+        The format of the file, one of `PARSERS`. Default: the first format
+        whose header is found in the file
+
+    Returns
+    -------
+    (str, np.array of str, np.array of float)
+        The format of the file, and the name and concentration of each of
+        its wells
+
+    Raises
+    ------
+    ValueError
+        If the file format is not known or the file is not in that format
+        If the file doesn't have any well, or has a well more than once
+        If any of the well names is not valid
+        If any of the concentrations is not a number
+    """
+    if isinstance(contents, str):
+        contents = contents.encode('utf-8')
+    if file_format is not None and file_format not in PARSERS:
+        raise ValueError(
+            'File format %s not recognized. Supported file formats: %s'
+            % (file_format, ', '.join(PARSERS)))
+
+    lines = contents.splitlines()
+    formats = [file_format] if file_format is not None else list(PARSERS)
+    for fmt in formats:
+        res = PARSERS[fmt](lines)
+        if res is not None:
+            break
+    else:
+        if file_format is not None:
+            raise ValueError('The file is not a %s file' % file_format)
+        raise ValueError('The format of the file is not recognized. '
+                         'Supported file formats: %s' % ', '.join(PARSERS))
+
+    wells, values = res
+    if not wells:
+        raise ValueError('The %s file does not have any well' % fmt)
+    wells = np.char.strip(
+        np.char.decode(np.array(wells, dtype=bytes), 'ascii', 'replace'))
+    # Compare the wells by position, so "A1" and "a01" are the same well
+    names, counts = np.unique(
+        well_coordinates.well_names(
+            *well_coordinates.parse_well_names(wells)).astype(str),
+        return_counts=True)
+    if (counts > 1).any():
+        raise ValueError('Wells %s are in the file more than once'
+                         % ', '.join(names[counts > 1]))
+    return fmt, wells, _to_concentrations(wells, values)
+
+
+def parse(contents, file_format=None, rows=8, cols=12):
+    """Parses a plate reader file into the concentrations of a plate
+
+    Parameters
+    ----------
+    contents : bytes or str
+        The contents of the plate reader file
+    file_format : str, optional
+        The format of the file, one of `PARSERS`. Default: the first format
+        whose header is found in the file
+    rows : int, optional
+        The number of rows in the plate. Default: 8
+    cols : int, optional
+        The number of columns in the plate. Default: 12
+
+    Returns
+    -------
+    ParsedPlate
+
+    Raises
+    ------
+    ValueError
+        If the file can't be read, see `read`
+        If any of the wells is outside of the plate
+    """
+    start = perf_counter()
+    file_format, wells, values = read(contents, file_format)
+    well_rows, well_cols = well_coordinates.parse_well_names(wells)
+    outside = (well_rows > rows) | (well_cols < 1) | (well_cols > cols)
+    if outside.any():
+        raise ValueError('Wells %s are outside of a %d x %d plate'
+                         % (', '.join(wells[outside]), rows, cols))
+    concentrations = np.full((rows, cols), np.nan)
+    concentrations[well_rows - 1, well_cols - 1] = values
+    return ParsedPlate(file_format, concentrations, perf_counter() - start)
+
+
+def _to_concentrations(wells, values):
+    """Converts the values read from a file to concentrations
+
+    Values such as "<0.000" and ">15302.000" are taken as the number they
+    bound. Values made of question marks, which plate readers write when
+    the sensor is overflowed (usually because the sample is too
+    concentrated), are replaced with the highest concentration in the file,
+    per wet lab practice.
+
+    Parameters
+    ----------
+    wells : np.array of str
+        The name of the well of each value
+    values : list of bytes
+        The values read from the file
+
+    Returns
+    -------
+    np.array of float
+
+    Raises
+    ------
+    ValueError
+        If any of the values is not a number
+    """
+    values = pd.Series(np.char.strip(np.char.decode(
+        np.array(values, dtype=bytes), 'ascii', 'replace'), ' <>'),
+        dtype=object)
+    overflow = values.str.match(r'^\?+$').values.astype(bool)
+    concentrations = pd.to_numeric(values, errors='coerce').values.astype(
+        float)
+    if overflow.any() and not overflow.all():
+        concentrations[overflow] = np.nanmax(concentrations[~overflow])
+
+    # If there are any NaN concentrations left, there's a problem with the
+    # parsing
+    wrong = np.isnan(concentrations)
+    if wrong.any():
+        raise ValueError(
+            'Some concentrations in the plate reader file are not numbers: '
+            '%s' % ', '.join('%s: "%s"' % (w, v) for w, v in zip(
+                wells[wrong], values[wrong])))
+    return concentrations
+
+
+def _fields(line, sep):
+    """Splits a line in its stripped fields"""
+    return [f.strip() for f in line.split(sep)]
+
+
+def _table(lines, sep, is_header):
+    """Finds a table in the lines of a file
+
+    Parameters
+    ----------
+    lines : list of bytes
+        The lines of the file
+    sep : bytes
+        The field separator
+    is_header : callable
+        Returns whether a list of fields is the header of the table
+
+    Returns
+    -------
+    (list of bytes, list of list of bytes) or None
+        The fields of the header and of each row of the table, which ends at
+        the first blank line. None if the header is not found
+    """
+    for idx, line in enumerate(lines):
+        header = _fields(line, sep)
+        if is_header(header):
+            break
+    else:
+        return None
+    table = []
+    for line in lines[idx + 1:]:
+        fields = _fields(line, sep)
+        if not any(fields):
+            break
+        # Pad the short rows, so all the columns of the header can be read
+        fields.extend([b''] * (len(header) - len(fields)))
+        table.append(fields)
+    return header, table
+
+
+@register_parser('minipico')
+def _parse_minipico(lines):
+    """Parses the tab-delimited output of the Quant-iT PicoGreen plate reader
+
+    The well table has a 'Well' and a '[Concentration]' column, and is
+    surrounded by a 'Results' title and the results of the curve fitting
+    """
+    res = _table(lines, b'\t',
+                 lambda h: b'Well' in h and b'[Concentration]' in h)
+    if res is None:
+        return None
+    header, table = res
+    well_idx = header.index(b'Well')
+    conc_idx = header.index(b'[Concentration]')
+    return [r[well_idx] for r in table], [r[conc_idx] for r in table]
+
+
+@register_parser('well_table')
+def _parse_well_table(lines):
+    """Parses a comma or tab delimited table with a row per well
+
+    The table has a 'Well' column, and the first column whose name contains
+    'concentration' (case-insensitive) holds the values
+    """
+    def is_header(header):
+        return b'Well' in header and any(
+            b'concentration' in h.lower() for h in header)
+
+    for sep in (b',', b'\t'):
+        res = _table(lines, sep, is_header)
+        if res is not None:
+            break
+    else:
+        return None
+    header, table = res
+    well_idx = header.index(b'Well')
+    conc_idx = [b'concentration' in h.lower() for h in header].index(True)
+    return [r[well_idx] for r in table], [r[conc_idx] for r in table]
+
+
+@register_parser('plate_grid')
+def _parse_plate_grid(lines):
+    """Parses a comma or tab delimited grid with the layout of the plate
+
+    The header holds the column numbers, starting at 1, and each row starts
+    with its row letters. Empty cells are wells that were not read
+    """
+    def is_header(header):
+        numbers = header[1:]
+        while numbers and not numbers[-1]:
+            numbers.pop()
+        return bool(numbers) and numbers == [
+            str(i).encode() for i in range(1, len(numbers) + 1)]
+
+    for sep in (b'\t', b','):
+        res = _table(lines, sep, is_header)
+        if res is not None:
+            break
+    else:
+        return None
+    header, table = res
+    ncols = len([h for h in header[1:] if h])
+    grid = [r for r in table if _ROW_LETTERS.match(r[0])]
+    letters = np.array([r[0] for r in grid], dtype=bytes)
+    values = np.array([r[1:ncols + 1] for r in grid], dtype=bytes).reshape(
+        len(grid), ncols)
+    read = values != b''
+    row_idx, col_idx = np.nonzero(read)
+    row_nums = np.array([well_coordinates.row_number(r.decode().upper())
+                         for r in letters], dtype=np.int64)
+    wells = well_coordinates.well_names(row_nums[row_idx], col_idx + 1)
+    return [w.encode() for w in wells], values[read].tolist()
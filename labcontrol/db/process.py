@@ -6,9 +6,9 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
-from collections import namedtuple
+from collections import Counter, namedtuple
 from datetime import datetime
-from io import StringIO
+from functools import lru_cache
 from itertools import chain
 from random import randrange
 import re
@@ -18,11 +18,16 @@ import pandas as pd
 
 from . import base
 from . import sql_connection
+from . import reference
 from . import user as user_module
 from . import plate as plate_module
 from . import container as container_module
 from . import composition as composition_module
 from . import equipment as equipment_module
+from . import exceptions as exceptions_module
+from . import well_coordinates
+from . import plate_builder
+from . import plate_reader
 
 from . import sheet as sheet_module
 
@@ -60,7 +65,32 @@ class Process(base.LabControlObject):
         -------
         An instance of a subclass of Process
         """
-        factory_classes = {
+        return Process.factory_many([process_id])[0]
+
+    @staticmethod
+    def factory_many(process_ids):
+        """Initializes the correct Process subclasses for a list of ids
+
+        Parameters
+        ----------
+        process_ids : iterable of int
+            The process ids
+
+        Returns
+        -------
+        list of instances of subclasses of Process
+            The processes, in the same order as `process_ids`
+        """
+        return base.factory_many(
+            process_ids, 'labcontrol.process', 'process_id',
+            'labcontrol.process_type', 'process_type_id',
+            Process._factory_classes())
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _factory_classes():
+        """Returns the Process subclass of each process type"""
+        return {
             # 'primer template creation': TODO,
             'primer working plate creation': PrimerWorkingPlateCreationProcess,
             'sample plating': SamplePlatingProcess,
@@ -74,28 +104,6 @@ class Process(base.LabControlObject):
             'pooling': PoolingProcess,
             'sequencing': SequencingProcess}
 
-        with sql_connection.TRN as TRN:
-            sql = """SELECT description
-                     FROM labcontrol.process_type
-                        JOIN labcontrol.process USING (process_type_id)
-                     WHERE process_id = %s"""
-            TRN.add(sql, [process_id])
-            p_type = TRN.execute_fetchlast()
-            constructor = factory_classes[p_type]
-
-            if constructor._table == 'labcontrol.process':
-                instance = constructor(process_id)
-            else:
-                sql = """SELECT {}
-                         FROM {}
-                         WHERE process_id = %s""".format(
-                    constructor._id_column, constructor._table)
-                TRN.add(sql, [process_id])
-                subclass_id = TRN.execute_fetchlast()
-                instance = constructor(subclass_id)
-
-        return instance
-
     @staticmethod
     def get_date_format():
         return '%Y-%m-%d %H:%M'
@@ -109,13 +117,8 @@ class Process(base.LabControlObject):
         if process_date is None:
             process_date = datetime.now()
 
+        pt_id = reference.PROCESS_TYPES.get_id(cls._process_type)
         with sql_connection.TRN as TRN:
-            sql = """SELECT process_type_id
-                     FROM labcontrol.process_type
-                     WHERE description = %s"""
-            TRN.add(sql, [cls._process_type])
-            pt_id = TRN.execute_fetchlast()
-
             sql = """INSERT INTO labcontrol.process
                         (process_type_id, run_date, run_personnel_id, notes)
                      VALUES (%s, %s, %s, %s)
@@ -137,14 +140,11 @@ class Process(base.LabControlObject):
         Object
             The attribute
         """
-        with sql_connection.TRN as TRN:
-            sql = """SELECT {}
-                     FROM labcontrol.process
-                        JOIN {} USING (process_id)
-                     WHERE {} = %s""".format(attr, self._table,
-                                             self._id_column)
-            TRN.add(sql, [self.id])
-            return TRN.execute_fetchlast()
+        sql = """SELECT *
+                 FROM labcontrol.process
+                    JOIN {} USING (process_id)
+                 WHERE {} = %s""".format(self._table, self._id_column)
+        return self._get_cached_attr(sql, attr)
 
     @property
     def date(self):
@@ -179,7 +179,7 @@ class Process(base.LabControlObject):
                      ORDER BY plate_id"""
             TRN.add(sql, [self.process_id])
             plate_ids = TRN.execute_fetchflatten()
-        return [plate_module.Plate(plate_id) for plate_id in plate_ids]
+        return plate_module.Plate.from_ids(plate_ids)
 
 
 class _Process(Process):
@@ -226,7 +226,8 @@ class SamplePlatingProcess(_Process):
     _process_type = 'sample plating'
 
     @classmethod
-    def create(cls, user, plate_config, plate_ext_id, volume=None):
+    def create(cls, user, plate_config, plate_ext_id, volume=None,
+               implicit_blanks=False):
         """Creates a new sample plating process
 
         Parameters
@@ -239,12 +240,16 @@ class SamplePlatingProcess(_Process):
             The external plate id
         volume : float, optional
             Starting well volume
+        implicit_blanks : bool, optional
+            If true, the wells are not created up front: the positions of the
+            plate without a well read as blanks, and each well is stored when
+            it is edited or when the plate is extracted. Default: False
 
         Returns
         -------
         SamplePlatingProcess
         """
-        with sql_connection.TRN:
+        with sql_connection.TRN as TRN:
             volume = volume if volume else 0
             # Add the row to the process table
             instance = cls(cls._common_creation_steps(user))
@@ -252,14 +257,24 @@ class SamplePlatingProcess(_Process):
             # Create the plate
             plate = plate_module.Plate.create(plate_ext_id, plate_config)
 
+            if implicit_blanks:
+                sql = """INSERT INTO labcontrol.implicit_blank_plate
+                            (plate_id, process_id, well_volume)
+                         VALUES (%s, %s, %s)"""
+                TRN.add(sql, [plate.id, instance.id, volume])
+                return instance
+
             # By definition, all well plates are blank at the beginning
             # so populate all the wells in the plate with BLANKS
-            for i in range(plate_config.num_rows):
-                for j in range(plate_config.num_columns):
-                    well = container_module.Well.create(
-                        plate, instance, volume, i + 1, j + 1)
-                    composition_module.SampleComposition.create(
-                        instance, well, volume)
+            rows, cols = np.indices(
+                (plate_config.num_rows, plate_config.num_columns)) + 1
+            sc = composition_module.SampleComposition
+            plate_builder.create_wells(
+                instance, plate, sc, rows, cols, volume,
+                {'sample_composition_type_id':
+                    sc._get_sample_composition_type_id('blank'),
+                 'content': sc.generate_contents('blank', plate, rows,
+                                                 cols)})
 
         return instance
 
@@ -273,15 +288,51 @@ class SamplePlatingProcess(_Process):
             The plate being plated
         """
         with sql_connection.TRN as TRN:
-            sql = """SELECT DISTINCT plate_id
+            # The plate may not have any stored well if it was created with
+            # implicit blanks
+            sql = """SELECT plate_id
+                     FROM labcontrol.implicit_blank_plate
+                     WHERE process_id = %s
+                     UNION
+                     SELECT DISTINCT plate_id
                      FROM labcontrol.container
                         LEFT JOIN labcontrol.well USING (container_id)
                         LEFT JOIN labcontrol.plate USING (plate_id)
                      WHERE latest_upstream_process_id = %s"""
-            TRN.add(sql, [self.id])
+            TRN.add(sql, [self.id, self.id])
             plate_id = TRN.execute_fetchlast()
         return plate_module.Plate(plate_id)
 
+    def _get_well(self, row, col):
+        """Returns the well at (row, col), storing it if it is implicit
+
+        Parameters
+        ----------
+        row: int
+            The well row
+        col: int
+            The well column
+
+        Returns
+        -------
+        labcontrol.db.container.Well
+        """
+        row, col = int(row), int(col)
+        with sql_connection.TRN:
+            plate = self.plate
+            try:
+                return plate.get_well(row, col)
+            except exceptions_module.LabControlError:
+                implicit = plate._get_implicit_blanks()
+                pc = plate.plate_configuration
+                if (implicit is None or not 1 <= row <= pc.num_rows or
+                        not 1 <= col <= pc.num_columns):
+                    raise
+            volume = implicit[1]
+            well = container_module.Well.create(plate, self, volume, row, col)
+            composition_module.SampleComposition.create(self, well, volume)
+        return well
+
     def update_well(self, row, col, content):
         """Updates the content of a well
 
@@ -300,7 +351,166 @@ class SamplePlatingProcess(_Process):
             The str corresponds to the new contents of the well; the bool
             indicates whether or not the new contents of the well are "ok"
         """
-        return self.plate.get_well(row, col).composition.update(content)
+        return self._get_well(row, col).composition.update(content)
+
+    def update_wells(self, updates):
+        """Updates the contents of several wells
+
+        The outcome is the same as calling `update_well` on each update in
+        turn, but all the samples are resolved and all the wells updated in
+        a constant number of queries.
+
+        Parameters
+        ----------
+        updates : iterable of (int, int, str)
+            The row, column and new contents of each well. If a well is
+            updated more than once, the last update wins
+
+        Returns
+        -------
+        list of (str, bool)
+            The new contents of the well of each update and whether or not
+            they are "ok", in the same order as `updates`
+
+        Raises
+        ------
+        LabControlError
+            If the plate doesn't have a well at any of the positions
+        """
+        updates = [(int(row), int(col), content)
+                   for row, col, content in updates]
+        if not updates:
+            return []
+        # The last update of each well wins
+        new_contents = {(row, col): content for row, col, content in updates}
+        sc = composition_module.SampleComposition
+        es_sct = 'experimental sample'
+
+        with sql_connection.TRN as TRN:
+            plate = self.plate
+            sql = """SELECT row_num, col_num, sample_composition_id,
+                            external_id, sample_id, content
+                     FROM labcontrol.well
+                        JOIN labcontrol.composition USING (container_id)
+                        JOIN labcontrol.sample_composition
+                            USING (composition_id)
+                        JOIN labcontrol.sample_composition_type
+                            USING (sample_composition_type_id)
+                     WHERE plate_id = %s"""
+            TRN.add(sql, [plate.id])
+            # {(row, col): [sample composition id, sample composition type,
+            #               sample id, content]}
+            wells = {(row, col): list(values)
+                     for row, col, *values in TRN.execute_fetchindex(
+                        row_type='tuple')}
+
+            # Wells that are not stored yet hold implicit blanks, they are
+            # stored with their new contents below
+            missing = sorted(pos for pos in new_contents if pos not in wells)
+            if missing:
+                pc = plate.plate_configuration
+                implicit = plate._get_implicit_blanks()
+                for row, col in missing:
+                    if (implicit is None or not 1 <= row <= pc.num_rows or
+                            not 1 <= col <= pc.num_columns):
+                        raise exceptions_module.LabControlError(
+                            "Well (%s, %s) doesn't exist in plate %s"
+                            % (row, col, plate.id))
+                rows, cols = np.array(missing).T
+                blanks = sc.generate_contents('blank', plate, rows, cols)
+                for pos, content in zip(missing, blanks):
+                    wells[pos] = [None, 'blank', None, content]
+
+            # The contents that are not a control are samples, which are
+            # only linked to the well if they exist in the database
+            type_ids = reference.SAMPLE_COMPOSITION_TYPES.get_ids(
+                new_contents.values())
+            candidates = {content for content, sct_id in type_ids.items()
+                          if sct_id is None}
+            known = set()
+            if candidates:
+                sql = """SELECT sample_id
+                         FROM qiita.study_sample
+                         WHERE sample_id = ANY(%s)"""
+                TRN.add(sql, [list(candidates)])
+                known = set(TRN.execute_fetchflatten())
+
+            ok = {}
+            changed = {}
+            for pos, content in new_contents.items():
+                _, sc_type, _, old_content = wells[pos]
+                ok[pos] = True
+                if ((sc_type == es_sct and old_content == content) or
+                        sc_type == content):
+                    # The contents don't change
+                    continue
+                if content not in candidates:
+                    changed[pos] = (content, None)
+                elif content in known:
+                    changed[pos] = (es_sct, content)
+                else:
+                    # Unknown samples keep the content but not the sample id
+                    ok[pos] = False
+                    changed[pos] = (es_sct, None)
+
+            # Controls, and samples plated more than once in the plate, are
+            # qualified with the plate and well, so adding a sample to or
+            # removing it from a well may change the contents of the other
+            # wells holding it
+            state = {pos: list(values) for pos, values in wells.items()}
+            affected = set()
+            for pos, (sc_type, sample_id) in changed.items():
+                affected.add(state[pos][2])
+                affected.add(sample_id)
+                state[pos][1:3] = [sc_type, sample_id]
+                if sample_id is None and sc_type == es_sct:
+                    state[pos][3] = new_contents[pos]
+            affected.discard(None)
+            counts = Counter(values[2] for values in state.values())
+
+            qualify = sorted(
+                pos for pos, values in state.items()
+                if (values[2] in affected and counts[values[2]] > 1) or
+                (pos in changed and values[1] != es_sct))
+            if qualify:
+                rows, cols = np.array(qualify).T
+                names = [state[pos][2] or state[pos][1] for pos in qualify]
+                for pos, content in zip(qualify, sc.generate_contents(
+                        names, plate, rows, cols)):
+                    state[pos][3] = content
+            for pos, values in state.items():
+                if values[2] in affected and counts[values[2]] == 1:
+                    values[3] = values[2]
+
+            sql_args = []
+            for pos, values in state.items():
+                # The wells that are not stored yet have no id
+                if values != wells[pos] and values[0] is not None:
+                    sc_id, sc_type, sample_id, content = values
+                    sql_args.append(
+                        [sc._get_sample_composition_type_id(sc_type),
+                         sample_id, content, sc_id])
+            if sql_args:
+                sql = """UPDATE labcontrol.sample_composition
+                         SET sample_composition_type_id = %s,
+                             sample_id = %s,
+                             content = %s
+                         WHERE sample_composition_id = %s"""
+                TRN.add(sql, sql_args, many=True)
+            if missing:
+                rows, cols = np.array(missing).T
+                plate_builder.create_wells(
+                    self, plate, sc, rows, cols, implicit[1],
+                    {'sample_composition_type_id': [
+                        sc._get_sample_composition_type_id(state[pos][1])
+                        for pos in missing],
+                     'sample_id': [state[pos][2] for pos in missing],
+                     'content': [state[pos][3] for pos in missing]})
+            TRN.execute()
+
+        # Wells whose contents didn't change report their stored contents
+        return [(state[(row, col)][3], ok[(row, col)])
+                for row, col, _ in updates]
 
     def comment_well(self, row, col, comment):
         """Updates the comment of a well
@@ -314,7 +524,7 @@ class SamplePlatingProcess(_Process):
         content: str
             The new contents of the well
         """
-        self.plate.get_well(row, col).composition.notes = comment
+        self._get_well(row, col).composition.notes = comment
 
 
 class ReagentCreationProcess(_Process):
@@ -429,13 +639,15 @@ class PrimerWorkingPlateCreationProcess(Process):
                 work_plate = plate_module.Plate.create(
                     plate_name, plate_config)
                 # Add the wells to the new plate
-                for row in ps_plate.layout:
-                    for ps_well in row:
-                        w_well = container_module.Well.create(
-                            work_plate, instance, 10, ps_well.row,
-                            ps_well.column)
-                        composition_module.PrimerComposition.create(
-                            instance, w_well, 10, ps_well.composition)
+                snapshot = ps_plate.snapshot()
+                rows, cols = np.nonzero(snapshot.well_ids)
+                ps_comps = plate_builder.subtype_ids(
+                    composition_module.PrimerSetComposition,
+                    snapshot.composition_ids[rows, cols])
+                plate_builder.create_wells(
+                    instance, work_plate,
+                    composition_module.PrimerComposition, rows + 1,
+                    cols + 1, 10, {'primer_set_composition_id': ps_comps})
 
         return instance
 
@@ -625,20 +837,26 @@ class GDNAExtractionProcess(Process):
                           externally_extracted])
             instance = cls(TRN.execute_fetchlast())
 
+            # The implicit blanks of the plate are extracted too, so they
+            # must be stored first
+            plate.materialize_blanks()
+
             # Create the extracted plate
             plate_config = plate.plate_configuration
             gdna_plate = plate_module.Plate.create(
                 gdna_plate_name, plate_config)
-            plate_layout = plate.layout
+            snapshot = plate.snapshot()
             # Add the wells to the new plate
-            for i in range(plate_config.num_rows):
-                for j in range(plate_config.num_columns):
-                    plated_sample = plate_layout[i][j].composition
-                    if plated_sample.sample_composition_type != 'empty':
-                        well = container_module.Well.create(
-                            gdna_plate, instance, volume, i + 1, j + 1)
-                        composition_module.GDNAComposition.create(
-                            instance, well, volume, plated_sample)
+            rows, cols = np.nonzero(
+                (snapshot.well_ids != 0) &
+                (snapshot.sample_composition_types != 'empty'))
+            sample_comps = plate_builder.subtype_ids(
+                composition_module.SampleComposition,
+                snapshot.composition_ids[rows, cols])
+            plate_builder.create_wells(
+                instance, gdna_plate, composition_module.GDNAComposition,
+                rows + 1, cols + 1, volume,
+                {'sample_composition_id': sample_comps})
 
         return instance
 
@@ -666,6 +884,89 @@ class GDNAPlateCompressionProcess(Process):
                                      "input_plate_order_index input_row_index "
                                      "input_col_index")
 
+    # Compression and decompression index arrays. The first five are 1D
+    # arrays with one entry per interleaved position, in the order of
+    # get_interleaved_quarters_position_generator. The `*_map` arrays have
+    # the shape of the large plate and give, for each of its positions, the
+    # input plate order, row and column it comes from (-1 if none does).
+    InterleavedMaps = namedtuple("InterleavedMaps",
+                                 "output_row_index output_col_index "
+                                 "input_plate_order_index input_row_index "
+                                 "input_col_index input_plate_order_map "
+                                 "input_row_map input_col_map")
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get_interleaved_quarters_maps(num_quarters, total_num_rows,
+                                      total_num_cols):
+        """Make index arrays interleaving small plates onto large.
+
+        The positions follow the same interleaving and order as
+        `get_interleaved_quarters_position_generator`, so a whole plate can be
+        compressed or decompressed with array indexing. The arrays are cached
+        and read-only.
+
+        Parameters
+        ----------
+        num_quarters : int
+            Number of quarters of interleaved positions to generate; equivalent
+            to number of smaller plates to interleave.  Must be 1-4, inclusive.
+        total_num_rows : int
+            Number of rows on large plate (e.g., 16 for a 384-well plate); must
+            be even.
+        total_num_cols : int
+            Number of columns on large plate (e.g., 24 for a 384-well plate);
+            must be even.
+
+        Returns
+        -------
+        InterleavedMaps namedtuple of np.array of int
+
+        Raises
+        ------
+        ValueError
+            if num_quarters is not an integer in the range 1-4, inclusive or
+            if total_num_rows is not positive and even or
+            if total_num_cols is not positive and even
+        """
+        if num_quarters < 1 or num_quarters > 4 or \
+                int(num_quarters) != num_quarters:
+            raise ValueError("Expected number of quarters to be an integer"
+                             " between 1 and 4 but received {0}".format(
+                                    num_quarters))
+
+        if total_num_rows <= 0 or total_num_rows % 2 > 0 or \
+                total_num_cols <= 0 or total_num_cols % 2 > 0:
+
+            raise ValueError("Expected number of rows and columns to be"
+                             " positive integers evenly divisible by two"
+                             " but received {0} rows and {1}"
+                             " columns".format(total_num_rows,
+                                               total_num_cols))
+
+        # Positions are ordered by input plate, then input column, then
+        # input row
+        quarters, input_cols, input_rows = (
+            a.ravel() for a in np.indices(
+                (int(num_quarters), total_num_cols // 2,
+                 total_num_rows // 2)))
+        output_rows = input_rows * 2 + quarters // 2
+        output_cols = input_cols * 2 + quarters % 2
+
+        shape = (total_num_rows, total_num_cols)
+        reverse_maps = []
+        for values in (quarters, input_rows, input_cols):
+            reverse_map = np.full(shape, -1, dtype=values.dtype)
+            reverse_map[output_rows, output_cols] = values
+            reverse_maps.append(reverse_map)
+
+        maps = GDNAPlateCompressionProcess.InterleavedMaps(
+            output_rows, output_cols, quarters, input_rows, input_cols,
+            *reverse_maps)
+        for values in maps:
+            values.setflags(write=False)
+        return maps
+
     @staticmethod
     def get_interleaved_quarters_position_generator(
             num_quarters, total_num_rows, total_num_cols):
@@ -725,36 +1026,10 @@ class GDNAPlateCompressionProcess(Process):
             if total_num_cols is not positive and even
         """
 
-        if num_quarters < 1 or num_quarters > 4 or \
-                int(num_quarters) != num_quarters:
-            raise ValueError("Expected number of quarters to be an integer"
-                             " between 1 and 4 but received {0}".format(
-                                    num_quarters))
-
-        if total_num_rows <= 0 or total_num_rows % 2 > 0 or \
-                total_num_cols <= 0 or total_num_cols % 2 > 0:
-
-            raise ValueError("Expected number of rows and columns to be"
-                             " positive integers evenly divisible by two"
-                             " but received {0} rows and {1}"
-                             " columns".format(total_num_rows,
-                                               total_num_cols))
-
-        input_max_rows = int(total_num_rows / 2)
-        input_max_cols = int(total_num_cols / 2)
-
-        for input_plate_order in range(0, num_quarters):
-            row_pad = int(input_plate_order / 2)  # rounds down for positive #s
-            col_pad = input_plate_order % 2
-
-            for input_col_index in range(0, input_max_cols):
-                output_col_index = (input_col_index * 2) + col_pad
-                for input_row_index in range(0, input_max_rows):
-                    output_row_index = (input_row_index * 2) + row_pad
-                    result = GDNAPlateCompressionProcess.InterleavedPosition(
-                        output_row_index, output_col_index, input_plate_order,
-                        input_row_index, input_col_index)
-                    yield result
+        maps = GDNAPlateCompressionProcess.get_interleaved_quarters_maps(
+            num_quarters, total_num_rows, total_num_cols)
+        for values in zip(*(values.tolist() for values in maps[:5])):
+            yield GDNAPlateCompressionProcess.InterleavedPosition(*values)
 
     @classmethod
     def create(cls, user, plates, plate_ext_id, robot):
@@ -798,32 +1073,52 @@ class GDNAPlateCompressionProcess(Process):
             TRN.add(sql, [process_id, robot.id])
             instance = cls(TRN.execute_fetchlast())
 
-        # get the input plates' layouts (to avoid repeated sql calls)
-        plate_layouts = [x.layout for x in plates]
-
-        # Create the output plate
-        # Magic number 3 -> 384-well plate
-        plate_config_384 = plate_module.PlateConfiguration(3)
-        plate = plate_module.Plate.create(plate_ext_id, plate_config_384)
+        # get the input plates' contents (to avoid repeated sql calls)
+        snapshots = [x.snapshot() for x in plates]
+        input_shapes = set(snap.shape for snap in snapshots)
+        if len(input_shapes) != 1:
+            raise ValueError('Cannot compress plates of different sizes')
+        num_rows, num_cols = input_shapes.pop()
+
+        # Create the output plate, twice as large as the input plates in both
+        # dimensions: 96-well plates are compressed onto a 384-well plate
+        # (magic number 3) and 384-well plates onto a 1536-well plate
+        if (num_rows, num_cols) == (8, 12):
+            plate_config = plate_module.PlateConfiguration(3)
+        else:
+            plate_config = None
+            for pc in plate_module.PlateConfiguration.iter():
+                if (pc.num_rows, pc.num_columns) == (num_rows * 2,
+                                                     num_cols * 2):
+                    plate_config = pc
+                    break
+            if plate_config is None:
+                raise ValueError(
+                    'No plate configuration with %d rows and %d columns to '
+                    'compress the plates onto'
+                    % (num_rows * 2, num_cols * 2))
+        plate = plate_module.Plate.create(plate_ext_id, plate_config)
 
         # Compress the plates
-        position_generator = GDNAPlateCompressionProcess.\
-            get_interleaved_quarters_position_generator(
-                len(plates), plate_config_384.num_rows,
-                plate_config_384.num_columns)
-
-        for p in position_generator:  # each position on interleaved plate
-            input_layout = plate_layouts[p.input_plate_order_index]
-            input_well = input_layout[p.input_row_index][p.input_col_index]
-            # completely empty wells (represented as Nones) are ignored
-            if input_well is not None:
-                # note adding 1 to the row/col from p, as those are
-                # 0-based while the positions in Well are 1-based
-                out_well = container_module.Well.create(
-                    plate, instance, volume, p.output_row_index + 1,
-                    p.output_col_index + 1)
-                composition_module.CompressedGDNAComposition.create(
-                    instance, out_well, volume, input_well.composition)
+        maps = GDNAPlateCompressionProcess.get_interleaved_quarters_maps(
+            len(plates), plate_config.num_rows, plate_config.num_columns)
+        well_ids = np.stack([snap.well_ids for snap in snapshots])
+        composition_ids = np.stack(
+            [snap.composition_ids for snap in snapshots])
+        input_idx = (maps.input_plate_order_index, maps.input_row_index,
+                     maps.input_col_index)
+        # completely empty wells are ignored
+        present = well_ids[input_idx] != 0
+        gdna_comps = plate_builder.subtype_ids(
+            composition_module.GDNAComposition,
+            composition_ids[input_idx][present])
+        # note adding 1 to the output row/col, as those are
+        # 0-based while the positions in Well are 1-based
+        plate_builder.create_wells(
+            instance, plate, composition_module.CompressedGDNAComposition,
+            maps.output_row_index[present] + 1,
+            maps.output_col_index[present] + 1, volume,
+            {'gdna_composition_id': gdna_comps})
 
         return instance
 
@@ -856,7 +1151,7 @@ class GDNAPlateCompressionProcess(Process):
                         cw.row_num IN (1, 2) AND cw.col_num IN (1, 2)
                      ORDER BY cw.row_num, cw.col_num"""
             TRN.add(sql, [self.process_id])
-            return [plate_module.Plate(pid)
+            return [plate_module.Plate._from_trusted_id(pid)
                     for pid in TRN.execute_fetchflatten()]
 
 
@@ -932,17 +1227,20 @@ class LibraryPrep16SProcess(Process):
             plate_config = plate.plate_configuration
             library_plate = plate_module.Plate.create(lib_plate_name,
                                                       plate_config)
-            gdna_layout = plate.layout
-            primer_layout = primer_plate.layout
-            for i in range(plate_config.num_rows):
-                for j in range(plate_config.num_columns):
-                    if gdna_layout[i][j] is not None:
-                        well = container_module.Well.create(
-                            library_plate, instance, volume, i + 1, j + 1)
-                        composition_module.LibraryPrep16SComposition.create(
-                            instance, well, volume,
-                            gdna_layout[i][j].composition,
-                            primer_layout[i][j].composition)
+            gdna_snapshot = plate.snapshot()
+            primer_snapshot = primer_plate.snapshot()
+            rows, cols = np.nonzero(gdna_snapshot.well_ids)
+            gdna_comps = plate_builder.subtype_ids(
+                composition_module.GDNAComposition,
+                gdna_snapshot.composition_ids[rows, cols])
+            primer_comps = plate_builder.subtype_ids(
+                composition_module.PrimerComposition,
+                primer_snapshot.composition_ids[rows, cols])
+            plate_builder.create_wells(
+                instance, library_plate,
+                composition_module.LibraryPrep16SComposition, rows + 1,
+                cols + 1, volume, {'gdna_composition_id': gdna_comps,
+                                   'primer_composition_id': primer_comps})
 
         return instance
 
@@ -1109,6 +1407,28 @@ class NormalizationProcess(Process):
         sample_vols = np.round(sample_vols / resolution) * resolution
         return sample_vols
 
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _get_reformat_maps():
+        """Index arrays moving a 384-well plate from the interleaved format to
+        the column format
+
+        Returns
+        -------
+        (np.array of int, np.array of int)
+            Read-only 16x24 arrays with the 0-based row and column, in the
+            column format, of each 0-based position of the interleaved plate
+        """
+        rows, cols = np.indices((16, 24))
+        roffset = rows % 2
+        new_rows = rows - roffset + cols // 12
+
+        coffset = cols % 2 + ((new_rows + 1) % 2) * 2
+        new_cols = coffset * 6 + (cols // 2) % 6
+        new_rows.setflags(write=False)
+        new_cols.setflags(write=False)
+        return new_rows, new_cols
+
     @classmethod
     def create(cls, user, quant_process, water, plate_name, total_vol=3500,
                ng=5, min_vol=2.5, max_vol=3500, resolution=2.5,
@@ -1163,36 +1483,43 @@ class NormalizationProcess(Process):
                           dumps(func_data)])
             instance = cls(TRN.execute_fetchlast())
 
-            # Retrieve all the concentration values
-            concs = quant_process.concentrations
+            # Retrieve all the concentration values, along with the position
+            # of the quantified compressed gDNA compositions
+            sql = """SELECT cgc.compressed_gdna_composition_id, w.row_num,
+                            w.col_num, cc.raw_concentration
+                     FROM labcontrol.concentration_calculation cc
+                        JOIN labcontrol.composition c
+                            ON c.composition_id =
+                                cc.quantitated_composition_id
+                        JOIN labcontrol.compressed_gdna_composition cgc
+                            ON cgc.composition_id = c.composition_id
+                        JOIN labcontrol.well w USING (container_id)
+                     WHERE cc.upstream_process_id = %s
+                     ORDER BY cc.concentration_calculation_id"""
+            TRN.add(sql, [quant_process.id])
+            concs = TRN.execute_fetchindex(row_type='tuple')
+            comps = np.array([c[0] for c in concs], dtype=np.int64)
+            rows = np.array([c[1] for c in concs], dtype=np.int64)
+            columns = np.array([c[2] for c in concs], dtype=np.int64)
             # Transform the concentrations to a numpy array
-            np_conc = np.asarray([raw_con for _, raw_con, _ in concs])
+            np_conc = np.array([c[3] for c in concs], dtype=float)
             dna_v = NormalizationProcess._calculate_norm_vol(
                 np_conc, ng, min_vol, max_vol, resolution)
             water_v = total_vol - dna_v
 
+            if reformat:
+                row_map, col_map = NormalizationProcess._get_reformat_maps()
+                rows, columns = (row_map[rows - 1, columns - 1] + 1,
+                                 col_map[rows - 1, columns - 1] + 1)
+
             # Create the plate. 3 -> 384-well plate
             plate_config = plate_module.PlateConfiguration(3)
             plate = plate_module.Plate.create(plate_name, plate_config)
-            for (comp, _, _), dna_vol, water_vol in zip(concs, dna_v, water_v):
-                comp_well = comp.container
-                row = comp_well.row
-                column = comp_well.column
-
-                if reformat:
-                    row = row - 1
-                    column = column - 1
-
-                    roffset = row % 2
-                    row = int(row - roffset + np.floor(column / 12)) + 1
-
-                    coffset = column % 2 + (row % 2) * 2
-                    column = int(coffset * 6 + (column / 2) % 6) + 1
-
-                well = container_module.Well.create(
-                    plate, instance, total_vol, row, column)
-                composition_module.NormalizedGDNAComposition.create(
-                    instance, well, total_vol, comp, dna_vol, water_vol)
+            plate_builder.create_wells(
+                instance, plate, composition_module.NormalizedGDNAComposition,
+                rows, columns, total_vol,
+                {'compressed_gdna_composition_id': comps,
+                 'dna_volume': dna_v, 'water_volume': water_v})
 
         return instance
 
@@ -1489,14 +1816,11 @@ class LibraryPrepShotgunProcess(Process):
             primer_set = composition_module.ShotgunPrimerSet(
                 TRN.execute_fetchlast())
 
-            # Get a list of wells that actually contain information
-            wells = [well for well in chain.from_iterable(plate.layout)
-                     if well is not None]
+            # Get the positions of the wells that actually contain information
+            snapshot = plate.snapshot()
             # Get the list of index pairs to use
-            idx_combos = primer_set.get_next_combos(len(wells))
-
-            i5_layout = i5_plate.layout
-            i7_layout = i7_plate.layout
+            idx_combos = primer_set.get_next_combos(
+                int(np.count_nonzero(snapshot.well_ids)))
 
             # Create the library plate
             lib_plate = plate_module.Plate.create(
@@ -1504,59 +1828,63 @@ class LibraryPrepShotgunProcess(Process):
 
             # walk across all the positions on the plate in interleaved order;
             # magic number 4 = get all positions (all 4 quarters)
-            position_generator = GDNAPlateCompressionProcess. \
-                get_interleaved_quarters_position_generator(
-                    4, plate.plate_configuration.num_rows,
-                    plate.plate_configuration.num_columns)
-
-            combo_index = 0
-            plate_layout = plate.layout  # time-consuming so do only once
-            for p in position_generator:  # each position on interleaved plate
-                # note OUTPUT indices rather than input indices because the
-                # normalized gdna plate we are working from is the SAME SIZE
-                # as the library prep plate, not 1/4 its size.
-                input_well = \
-                    plate_layout[p.output_row_index][p.output_col_index]
-                # completely empty wells (represented as Nones) are ignored
-                if input_well is not None:
-                    curr_combo = idx_combos[combo_index]
-                    # As database entities, these "wells" represent the
-                    # positions of the current i5 and i7 primers on the primer
-                    # set plate maps (NOT on the chosen actual, physical primer
-                    # working plates for these primer sets).  That is why we
-                    # aren't just getting the compositions that go with these
-                    # "wells"--these aren't real, physical wells and their
-                    # compositions aren't real, physical compositions.
-                    i5_well = curr_combo[0].container
-                    i7_well = curr_combo[1].container
-
-                    # While the positions of the relevant i5 and i7 primers
-                    # in the i5 and i7 plate maps have separate database
-                    # entities from the positions of those primers on the
-                    # actual physical primer working plates being used, the
-                    # primers are at the same positions (of course!) in the
-                    # working plates made from a given primer set plate map
-                    # as they are in the plate map itself--duh :)
-                    # Thus, we use the position of the relevant i5 and i7
-                    # primers in the plate map (gotten above) to find the
-                    # real, physical compositions for the primers at those
-                    # positions on the real, physical primer working plates.
-                    # Note subtracting 1 from positions in Well, as those
-                    # are 1-based while the positions in layout are 0-based.
-                    i5_comp = i5_layout[i5_well.row - 1][i5_well.column - 1]\
-                        .composition
-                    i7_comp = i7_layout[i7_well.row - 1][i7_well.column - 1]\
-                        .composition
-
-                    # Note adding 1 to the row/col from p, as those are
-                    # 0-based while the positions in Well are 1-based
-                    lib_well = container_module.Well.create(
-                        lib_plate, instance, volume, p.output_row_index + 1,
-                        p.output_col_index + 1)
-                    composition_module.LibraryPrepShotgunComposition.create(
-                        instance, lib_well, volume, input_well.composition,
-                        i5_comp, i7_comp)
-                    combo_index = combo_index + 1
+            maps = GDNAPlateCompressionProcess.get_interleaved_quarters_maps(
+                4, plate.plate_configuration.num_rows,
+                plate.plate_configuration.num_columns)
+            # note OUTPUT indices rather than input indices because the
+            # normalized gdna plate we are working from is the SAME SIZE
+            # as the library prep plate, not 1/4 its size.
+            # completely empty wells are ignored
+            present = snapshot.well_ids[maps.output_row_index,
+                                        maps.output_col_index] != 0
+            rows = maps.output_row_index[present]
+            cols = maps.output_col_index[present]
+
+            # As database entities, the wells of the i5 and i7 primer set
+            # compositions of the combos represent the positions of the
+            # primers on the primer set plate maps (NOT on the chosen actual,
+            # physical primer working plates for these primer sets). The
+            # primers are at the same positions in the working plates made
+            # from a given primer set plate map, so those positions are used
+            # to find the real, physical compositions for the primers on the
+            # real, physical primer working plates.
+            i5_ids = [c[0].id for c in idx_combos]
+            i7_ids = [c[1].id for c in idx_combos]
+            sql = """SELECT primer_set_composition_id, row_num, col_num
+                     FROM labcontrol.primer_set_composition
+                        JOIN labcontrol.composition USING (composition_id)
+                        JOIN labcontrol.well USING (container_id)
+                     WHERE primer_set_composition_id = ANY(%s)"""
+            TRN.add(sql, [list(set(i5_ids + i7_ids))])
+            # Note subtracting 1 from positions in Well, as those are 1-based
+            # while the positions in the snapshots are 0-based
+            primer_pos = {r[0]: (r[1] - 1, r[2] - 1)
+                          for r in TRN.execute_fetchindex(row_type='tuple')}
+            i5_pos = np.array([primer_pos[i] for i in i5_ids],
+                              dtype=np.int64).reshape(-1, 2)
+            i7_pos = np.array([primer_pos[i] for i in i7_ids],
+                              dtype=np.int64).reshape(-1, 2)
+            i5_comps = plate_builder.subtype_ids(
+                composition_module.PrimerComposition,
+                i5_plate.snapshot().composition_ids[i5_pos[:, 0],
+                                                    i5_pos[:, 1]])
+            i7_comps = plate_builder.subtype_ids(
+                composition_module.PrimerComposition,
+                i7_plate.snapshot().composition_ids[i7_pos[:, 0],
+                                                    i7_pos[:, 1]])
+            norm_comps = plate_builder.subtype_ids(
+                composition_module.NormalizedGDNAComposition,
+                snapshot.composition_ids[rows, cols])
+
+            # Note adding 1 to the row/col, as those are 0-based while the
+            # positions in Well are 1-based
+            plate_builder.create_wells(
+                instance, lib_plate,
+                composition_module.LibraryPrepShotgunComposition, rows + 1,
+                cols + 1, volume,
+                {'normalized_gdna_composition_id': norm_comps,
+                 'i5_primer_composition_id': i5_comps,
+                 'i7_primer_composition_id': i7_comps})
 
         return instance
 
@@ -1834,51 +2162,13 @@ class QuantificationProcess(Process):
         return lib_concentration
 
     @staticmethod
-    def _make_2D_array(df, data_col='Sample DNA Concentration',
-                       well_col='Well', rows=8, cols=12):
-        """Pulls a column of data out of a dataframe and puts into array format
-        based on well IDs in another column
-
-        Parameters
-        ----------
-        df: Pandas DataFrame
-            dataframe from which to pull values
-        data_col: str, optional
-            name of column with data. Default: Sample DNA Concentration
-        well_col: str, optional
-            name of column with well IDs, in 'A1,B12' format. Default: Well
-        rows: int, optional
-            number of rows in array to return. Default: 8
-        cols: int, optional
-            number of cols in array to return. Default: 12
-
-        Returns
-        -------
-        numpy 2D array
-        """
-        # initialize empty Cp array
-        cp_array = np.empty((rows, cols), dtype=object)
-
-        # fill Cp array with the post-cleaned values from the right half of the
-        # plate
-        for record in df.iterrows():
-            row = ord(str.upper(record[1][well_col][0])) - ord('A')
-            col = int(record[1][well_col][1:]) - 1
-            cp_array[row, col] = record[1][data_col]
-
-        return cp_array
-
-    @staticmethod
-    def _parse_pico_csv(contents, sep='\t',
-                        conc_col_name='Sample DNA Concentration'):
+    def _parse_pico_csv(contents, conc_col_name='Sample DNA Concentration'):
         """Reads tab-delimited pico quant
 
         Parameters
         ----------
-        contents : str
+        contents : bytes or str
             The contents of the pico green plate reader output
-        sep: str
-            sep char used in quant file
         conc_col_name: str
             name to use for concentration column output
 
@@ -1886,64 +2176,18 @@ class QuantificationProcess(Process):
         -------
         pico_df: pandas DataFrame object
             DataFrame relating well location and DNA concentration
-        """
-
-        cleaned_contents = QuantificationProcess._rationalize_pico_csv_string(
-            contents)
-        contents_io = StringIO(cleaned_contents)
-
-        # when reading in concentrations, force them to come in as strings
-        # so can check for overflow entries using regex
-        raw_df = pd.read_csv(contents_io, sep=sep, skiprows=2, skipfooter=5,
-                             engine='python',
-                             converters={'[Concentration]': lambda x: str(x)})
-
-        pico_df = raw_df[['Well', '[Concentration]']]
-        pico_df = pico_df.rename(columns={'[Concentration]': conc_col_name})
-
-        # any concentrations containing strings of question marks
-        # (generated when you overflow the sensor; usually due to sample being
-        # too concentrated) should be replaced with the highest concentration
-        # found in this file, per wet lab practice. Start by
-        # getting mask of the concentration rows that hold only question marks;
-        # regex matches start of string followed by one or more literal
-        # question marks, followed by end of string
-        overflow_mask = pico_df[conc_col_name].str.contains(
-            r'^\?+$', regex=True)
-
-        # coerce oddball concentrations to np.nan
-        pico_df[conc_col_name] = pd.to_numeric(pico_df[conc_col_name],
-                                               errors='coerce')
-
-        # find the highest concentration in the file and replace all overflow
-        # concentrations with that value
-        max_concentration = pico_df[conc_col_name].max()
-        pico_df.loc[overflow_mask, conc_col_name] = max_concentration
-
-        # if there are any NaN concentrations left, there's a problem with the
-        # parsing, so throw an error
-        if pico_df[conc_col_name].isnull().any():
-            raise ValueError("Some concentrations in pico green quantitation "
-                             "file are NaN: {0}".format(pico_df))
-
-        return pico_df
-
-    @staticmethod
-    def _rationalize_pico_csv_string(contents):
-        # Some plate reader files end with CRLF; convert to LF
-        contents = contents.replace('\r\n', '\n')
 
-        # Some plate reader files end with JUST CR;
-        # convert any of those remaining to LF
-        contents = contents.replace('\r', '\n')
-
-        # anything valued as "<X" is converted to just "X"
-        # e.g., <0.000 becomes 0.000
-        contents = contents.replace('<', '')
+        Raises
+        ------
+        ValueError
+            If any of the concentrations is not a number
 
-        # anything valued as ">X" is converted to just "X"
-        contents = contents.replace('>', '')
-        return contents
+        See Also
+        --------
+        labcontrol.db.plate_reader
+        """
+        _, wells, concentrations = plate_reader.read(contents, 'minipico')
+        return pd.DataFrame({'Well': wells, conc_col_name: concentrations})
 
     @staticmethod
     def parse(contents, file_format="minipico", rows=8, cols=12):
@@ -1951,10 +2195,12 @@ class QuantificationProcess(Process):
 
         Parameters
         ----------
-        contents : str
+        contents : bytes or str
             The contents of the plate reader output
-        file_format: str
-            The quantification file format
+        file_format: str, optional
+            The quantification file format, one of
+            `labcontrol.db.plate_reader.PARSERS`. If None, the format is
+            detected from the file. Default: minipico
         rows: int, optional
             The number of rows in the plate. Default: 8
         cols: int, optional
@@ -1962,17 +2208,16 @@ class QuantificationProcess(Process):
 
         Returns
         -------
-        DataFrame
-        """
-        parsers = {'minipico': QuantificationProcess._parse_pico_csv}
+        2D np.array of float
+            The concentration of each well of the plate, NaN for the wells
+            not in the file
 
-        if file_format not in parsers:
-            raise ValueError(
-                'File format %s not recognized. Supported file formats: %s'
-                % (file_format, ', '.join(parsers)))
-        df = parsers[file_format](contents)
-        array = QuantificationProcess._make_2D_array(df, rows=rows, cols=cols)
-        return array.astype(float)
+        See Also
+        --------
+        labcontrol.db.plate_reader.parse
+        """
+        return plate_reader.parse(contents, file_format=file_format,
+                                  rows=rows, cols=cols).concentrations
 
     @classmethod
     def create_manual(cls, user, quantifications, notes=None):
@@ -2110,9 +2355,10 @@ class QuantificationProcess(Process):
                      WHERE upstream_process_id = %s
                      ORDER BY concentration_calculation_id"""
             TRN.add(sql, [self._id])
-            return [
-                (composition_module.Composition.factory(comp_id), r_con, c_con)
-                for comp_id, r_con, c_con in TRN.execute_fetchindex()]
+            res = TRN.execute_fetchindex(row_type='tuple')
+        comps = composition_module.Composition.factory_many(r[0] for r in res)
+        return [(comp, r_con, c_con)
+                for comp, (_, r_con, c_con) in zip(comps, res)]
 
     def compute_concentrations(self, size=500):
         """Compute the normalized library molarity based on pico green dna
@@ -2485,8 +2731,9 @@ class PoolingProcess(Process):
                      WHERE upstream_process_id = %s
                      ORDER BY pool_composition_components_id"""
             TRN.add(sql, [self.process_id])
-            return [(composition_module.Composition.factory(comp_id), vol)
-                    for comp_id, vol in TRN.execute_fetchindex()]
+            res = TRN.execute_fetchindex(row_type='tuple')
+        comps = composition_module.Composition.factory_many(r[0] for r in res)
+        return [(comp, vol) for comp, (_, vol) in zip(comps, res)]
 
     @property
     def pool(self):
@@ -2531,19 +2778,9 @@ class PoolingProcess(Process):
         Raises
         ------
         ValueError
-            If input and/or output plate has >26 rows
             If volume of any individual input well exceeds the max vol per well
             If more output wells are needed than there are on the output plate
         """
-
-        def get_well_name(offset_from_ascii_ucase_a, col_num):
-            if offset_from_ascii_ucase_a > 25:
-                raise ValueError("Row letter generation for >26 wells is not "
-                                 "supported")  # Recall max # rows = offset + 1
-            row_ascii_code = ord('A') + offset_from_ascii_ucase_a
-            row_letter = chr(row_ascii_code)
-            return "%s%d" % (row_letter, col_num)
-
         if dest_plate_shape is None:
             dest_plate_shape = [16, 24]
 
@@ -2555,14 +2792,18 @@ class PoolingProcess(Process):
         num_dest_rows = dest_plate_shape[0]
         num_dest_cols = dest_plate_shape[1]
         dest_well_index = 0
+        input_well_names = well_coordinates.plate_well_names(
+            num_input_rows, num_input_cols)
+        dest_well_names = well_coordinates.plate_well_names(
+            num_dest_rows, num_dest_cols)
 
         # replace NaN values with 0s to leave a trail of unpooled wells
         pool_vols = np.nan_to_num(vol_sample)
 
         for curr_input_row_index in range(num_input_rows):
             for curr_input_col_index in range(num_input_cols):
-                curr_input_well_name = get_well_name(curr_input_row_index,
-                                                     curr_input_col_index + 1)
+                curr_input_well_name = input_well_names[
+                    curr_input_row_index, curr_input_col_index]
                 curr_input_well_vol = (pool_vols[curr_input_row_index]
                                        [curr_input_col_index])
 
@@ -2601,9 +2842,8 @@ class PoolingProcess(Process):
                                      "rows".format((curr_output_row_offset+1),
                                                    num_dest_rows))
 
-                curr_output_col_num = (dest_well_index % num_dest_cols) + 1
-                curr_dest_well_name = get_well_name(curr_output_row_offset,
-                                                    curr_output_col_num)
+                curr_dest_well_name = dest_well_names[
+                    curr_output_row_offset, dest_well_index % num_dest_cols]
 
                 curr_output_line = ",".join(
                     ['1', '384LDV_AQ_B2_HT', curr_input_well_name,
@@ -2842,8 +3082,10 @@ class SequencingProcess(Process):
                      WHERE sequencing_process_id = %s
                      ORDER BY contact_id"""
             TRN.add(sql, [self.id])
-            return [user_module.User(r[0]) for r in TRN.execute_fetchindex()]
+            return [user_module.User._from_trusted_id(r[0])
+                    for r in TRN.execute_fetchindex()]
 
+    @sql_connection.read_only_transaction
     def generate_sample_sheet(self):
         """Generates Illumina compatible sample sheets
 
@@ -2872,6 +3114,7 @@ class SequencingProcess(Process):
 
         return sheet.generate()
 
+    @sql_connection.read_only_transaction
     def generate_prep_information(self):
         """Generates prep information
 
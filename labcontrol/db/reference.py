@@ -0,0 +1,230 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2017-, LabControl development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from threading import Lock
+from time import monotonic
+
+from . import sql_connection
+
+
+class ReferenceTable(object):
+    """In-process cache of a small, rarely changing lookup table
+
+    The whole table is loaded on first use and kept in memory, so the
+    lookups don't query the database.
+
+    Parameters
+    ----------
+    table : str
+        The schema-qualified name of the table
+    id_column : str
+        The primary key of the table
+    key_column : str, optional
+        A unique column used to look up the ids, e.g. 'description'
+    max_age : float, optional
+        The number of seconds after which the cached rows are reloaded, so
+        changes made by other processes are eventually picked up.
+        Default: 300
+
+    Notes
+    -----
+    Any code that writes the table must call `invalidate_on_end` inside its
+    transaction, so the rows are reloaded once the transaction ends.
+
+    A lookup that misses reloads the rows once, in case the row has just
+    been added by another process. The miss is then remembered until the
+    rows are reloaded, so looking up the same missing value again doesn't
+    query the database.
+    """
+    def __init__(self, table, id_column, key_column=None, max_age=300):
+        self.table = table
+        self.id_column = id_column
+        self.key_column = key_column
+        self.max_age = max_age
+        self._lock = Lock()
+        self._rows = None
+        self._ids = None
+        self._missing = None
+        self._loaded_at = None
+        self._version = 0
+
+    def _load(self, reload=False):
+        """Returns the rows of the table, loading them if needed
+
+        Parameters
+        ----------
+        reload : bool, optional
+            Whether to reload the rows even if they are cached
+
+        Returns
+        -------
+        dict of {object: dict}
+            The rows of the table keyed by id
+        dict of {object: object}
+            The ids keyed by `key_column`, empty if there is no key column
+        set of (int, object)
+            The lookups that missed since the rows were loaded, as
+            (0, id) and (1, key) pairs
+
+        Notes
+        -----
+        The query runs without holding the lock: it may need a connection
+        from the pool, and the threads holding the connections may be
+        waiting for the lock. If the cache is invalidated while the rows are
+        loaded, the loaded rows are returned but not cached.
+        """
+        with self._lock:
+            if not (reload or self._rows is None or
+                    monotonic() - self._loaded_at > self.max_age):
+                return self._rows, self._ids, self._missing
+            version = self._version
+
+        loaded_at = monotonic()
+        with sql_connection.TRN as TRN:
+            sql = "SELECT * FROM {} ORDER BY {}".format(
+                self.table, self.id_column)
+            TRN.add(sql)
+            rows = [dict(r) for r in TRN.execute_fetchindex()]
+        rows_by_id = {r[self.id_column]: r for r in rows}
+        ids = {}
+        if self.key_column is not None:
+            ids = {r[self.key_column]: r[self.id_column] for r in rows}
+        missing = set()
+
+        with self._lock:
+            if self._version == version:
+                self._rows = rows_by_id
+                self._ids = ids
+                self._missing = missing
+                self._loaded_at = loaded_at
+        return rows_by_id, ids, missing
+
+    def _get(self, index, value):
+        """Looks up a value, reloading the rows once if it is not cached
+
+        Parameters
+        ----------
+        index : int
+            0 to look up a row by id, 1 to look up an id by key
+        value : object
+            The id or the key
+
+        Returns
+        -------
+        object or None
+            The row or the id, or None if the table doesn't have it
+        """
+        loaded = self._load()
+        found = loaded[index].get(value)
+        if found is None and (index, value) not in loaded[2]:
+            loaded = self._load(reload=True)
+            found = loaded[index].get(value)
+            if found is None:
+                loaded[2].add((index, value))
+        return found
+
+    def invalidate(self):
+        """Discards the cached rows, so they are reloaded on the next use"""
+        with self._lock:
+            self._rows = None
+            self._ids = None
+            self._missing = None
+            self._version += 1
+
+    def invalidate_on_end(self):
+        """Invalidates the cache now and when the current transaction ends
+
+        Must be called inside a transaction that wrote the table. The cache
+        is invalidated after both commit and rollback: the rows written by
+        the transaction may have been cached before it ended.
+        """
+        self.invalidate()
+        with sql_connection.TRN as TRN:
+            TRN.add_post_commit_func(self.invalidate)
+            TRN.add_post_rollback_func(self.invalidate)
+
+    def get_id(self, key):
+        """Returns the id of the row with the given key
+
+        Parameters
+        ----------
+        key : object
+            The value of `key_column`
+
+        Returns
+        -------
+        object or None
+            The id of the row, or None if there is no row with the given key
+        """
+        return self._get(1, key)
+
+    def get_ids(self, keys):
+        """Returns the ids of the rows with the given keys
+
+        Parameters
+        ----------
+        keys : iterable of object
+            The values of `key_column`
+
+        Returns
+        -------
+        dict of {object: object}
+            The id of each key, None if there is no row with that key
+
+        Notes
+        -----
+        Unlike `get_id`, a miss doesn't reload the rows: the keys are
+        usually user input, most of which is not in the table. New rows are
+        picked up after `max_age` or when the cache is invalidated.
+        """
+        ids = self._load()[1]
+        return {key: ids.get(key) for key in set(keys)}
+
+    def get_row(self, id_):
+        """Returns the row with the given id
+
+        Parameters
+        ----------
+        id_ : object
+            The value of `id_column`
+
+        Returns
+        -------
+        dict or None
+            The row as a {column: value} dict, or None if there is no row
+            with the given id. The dict is shared, it should not be modified
+        """
+        return self._get(0, id_)
+
+
+PROCESS_TYPES = ReferenceTable(
+    'labcontrol.process_type', 'process_type_id', 'description')
+COMPOSITION_TYPES = ReferenceTable(
+    'labcontrol.composition_type', 'composition_type_id', 'description')
+CONTAINER_TYPES = ReferenceTable(
+    'labcontrol.container_type', 'container_type_id', 'description')
+SAMPLE_COMPOSITION_TYPES = ReferenceTable(
+    'labcontrol.sample_composition_type', 'sample_composition_type_id',
+    'external_id')
+REAGENT_COMPOSITION_TYPES = ReferenceTable(
+    'labcontrol.reagent_composition_type', 'reagent_composition_type_id',
+    'description')
+EQUIPMENT_TYPES = ReferenceTable(
+    'labcontrol.equipment_type', 'equipment_type_id', 'description')
+PLATE_CONFIGURATIONS = ReferenceTable(
+    'labcontrol.plate_configuration', 'plate_configuration_id')
+
+REFERENCE_TABLES = [PROCESS_TYPES, COMPOSITION_TYPES, CONTAINER_TYPES,
+                    SAMPLE_COMPOSITION_TYPES, REAGENT_COMPOSITION_TYPES,
+                    EQUIPMENT_TYPES, PLATE_CONFIGURATIONS]
+
+
+def invalidate_all():
+    """Discards the cached rows of all the reference tables"""
+    for table in REFERENCE_TABLES:
+        table.invalidate()
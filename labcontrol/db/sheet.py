@@ -1,9 +1,10 @@
 from datetime import datetime
 from io import StringIO
+from itertools import chain
 import re
 import pandas as pd
 from . import sql_connection
-from . import container as container_module
+from . import well_coordinates
 
 
 class Sheet:
@@ -635,19 +636,17 @@ class PrepInfoSheet16S(PrepInfoSheet):
                                       for row in TRN.execute_fetchindex()}
 
             TRN.add(sql, [self.sequencing_process_id])
-            for result in TRN.execute_fetchindex():
+            results = TRN.execute_fetchindex()
+            well_ids = well_coordinates.well_names(
+                [r['row_num'] for r in results],
+                [r['col_num'] for r in results])
+            for result, well_id in zip(results, well_ids):
                 result = dict(result)
                 study_id = result.pop('study_id')
                 content = result.pop('content')
 
                 # format well
-                col = result['col_num']
-                row = result['row_num']
-                well = []
-                while row:
-                    row, rem = divmod(row - 1, 26)
-                    well[:0] = container_module.LETTERS[rem]
-                result['well_id'] = ''.join(well) + str(col)
+                result['well_id'] = well_id
 
                 # format extra fields list
                 for t, k, nk in extra_fields:
@@ -1143,15 +1142,16 @@ class PrepInfoSheetShotgun(PrepInfoSheet):
         Gathers metadata used by above method and performs initial munging
         for clarity.
 
-        Returns
-        -------
-        list: dict, each one representing a row of results.
+        Yields
+        ------
+        dict
+            Each one representing a row of results.
 
         Notes
         -----
-        This fetchall() seemed appropriate, as we only expect to return several
-        hundred results at most. This allows us to capture the results and
-        clean them up before handing them off. This also allows us to refactor
+        The rows are streamed from the database in batches, so the memory
+        used doesn't grow with the number of plates in the run. This allows
+        us to clean up the results before handing them off, and to refactor
         this query in time without touching the rest of the code.
         """
         inst_mdl, equipment, reagent = self._get_additional_prep_metadata()
@@ -1278,11 +1278,9 @@ class PrepInfoSheetShotgun(PrepInfoSheet):
             """
 
         with sql_connection.TRN as TRN:
-            TRN.add(sql, [self.sequencing_process_id])
-
-            results = [dict(r) for r in TRN.execute_fetchindex()]
+            batches = TRN.execute_stream(sql, [self.sequencing_process_id])
 
-            for d in results:
+            for d in map(dict, chain.from_iterable(batches)):
                 d['primer_date_i5'] = \
                     d['primer_date_i5'].strftime(Sheet.get_date_format())
                 d['primer_date_i7'] = \
@@ -1343,7 +1341,7 @@ class PrepInfoSheetShotgun(PrepInfoSheet):
                                              '',
                                              d['orig_name2'])
 
-            return results
+                yield d
 
     def _get_additional_prep_metadata(self):
         """Gathers additional prep_info metadata for file generation
@@ -1433,16 +1431,10 @@ class PrepInfoSheetShotgun(PrepInfoSheet):
         data = {}
 
         for item in results:
-            # format well
-            well = []
-            col = item['col_num']
-            row = item['row_num']
-            while row:
-                row, rem = divmod(row - 1, 26)
-                well[:0] = container_module.LETTERS[rem]
-
-            # adding a new field to the item
-            item['well_id'] = ''.join(well) + str(col)
+            # adding a new field to the item. The rows are streamed, so the
+            # well names are looked up one by one
+            item['well_id'] = well_coordinates.well_name(item['row_num'],
+                                                         item['col_num'])
 
             # Note: currently we have reverted to generating just one prep
             # sheet for all items in run, but we anticipate that may change
@@ -10,17 +10,25 @@
 # -----------------------------------------------------------------------------
 
 from __future__ import division
+from collections import OrderedDict
 from contextlib import contextmanager
-from itertools import chain
+from itertools import chain, count, groupby
 from functools import partial, wraps
 from datetime import date, time, datetime
+from io import StringIO
+import re
+from threading import BoundedSemaphore, Lock, local
+from time import perf_counter
 
 from psycopg2 import (connect, ProgrammingError, Error as PostgresError,
                       OperationalError)
-from psycopg2.extras import DictCursor
-from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from psycopg2 import sql as pgsql
+from psycopg2.extras import DictCursor, NamedTupleCursor
+from psycopg2.extensions import (
+    TRANSACTION_STATUS_IDLE, connection as PostgresConnection)
 
 from . import settings
+from .instrumentation import QueryScope
 
 
 class SQLConnectionHandler(object):
@@ -380,6 +388,451 @@ class SQLConnectionHandler(object):
         return result
 
 
+class _Connection(PostgresConnection):
+    """A psycopg2 connection that holds its prepared statements cache
+
+    Prepared statements live as long as the database session, so their cache
+    is bound to the connection rather than to the transaction using it.
+    """
+    def __init__(self, *args, **kwargs):
+        super(_Connection, self).__init__(*args, **kwargs)
+        self.statement_cache = None
+
+
+class StatementCache(object):
+    """LRU cache of the statements prepared in a connection
+
+    Parameters
+    ----------
+    maxsize : int
+        The maximum number of prepared statements kept in the connection
+
+    Attributes
+    ----------
+    hits : int
+        The number of queries executed from an already prepared statement
+    misses : int
+        The number of queries that were not found in the cache
+    evictions : int
+        The number of statements deallocated to make room for new ones
+    """
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # SQL queries that cannot be prepared, e.g. because postgres cannot
+        # infer the types of its parameters
+        self.unpreparable = set()
+        self._statements = OrderedDict()
+        self._count = 0
+
+    def __len__(self):
+        return len(self._statements)
+
+    def __contains__(self, sql):
+        return sql in self._statements
+
+    def get(self, sql):
+        """Returns the name of the statement prepared for `sql`
+
+        Parameters
+        ----------
+        sql : str
+            The SQL query
+
+        Returns
+        -------
+        str or None
+            The name of the prepared statement, None if `sql` is not cached
+        """
+        name = self._statements.get(sql)
+        if name is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._statements.move_to_end(sql)
+        return name
+
+    def new_name(self):
+        """Returns a name for a new prepared statement
+
+        Returns
+        -------
+        str
+            A statement name not used before in the connection
+        """
+        self._count += 1
+        return 'labcontrol_stmt_%d' % self._count
+
+    def put(self, sql, name):
+        """Adds `sql` to the cache
+
+        Parameters
+        ----------
+        sql : str
+            The SQL query
+        name : str
+            The name of the statement prepared for `sql`
+
+        Returns
+        -------
+        str or None
+            The name of the statement that has been evicted to make room for
+            the new one, if any. It should be deallocated
+        """
+        evicted = None
+        if len(self._statements) >= self.maxsize:
+            _, evicted = self._statements.popitem(last=False)
+            self.evictions += 1
+        self._statements[sql] = name
+        return evicted
+
+    def discard(self, sql):
+        """Removes `sql` from the cache, if present
+
+        Parameters
+        ----------
+        sql : str
+            The SQL query
+        """
+        self._statements.pop(sql, None)
+
+
+_PREPARABLE_SQL = re.compile(
+    r'^\s*(SELECT|INSERT|UPDATE|DELETE|WITH|VALUES)\b', re.IGNORECASE)
+_PLACEHOLDER = re.compile(r'%(.)', re.DOTALL)
+
+
+def _to_prepared_sql(sql, sql_args):
+    """Translates a query to the syntax of PREPARE
+
+    Parameters
+    ----------
+    sql : str
+        The SQL query, with psycopg2 placeholders
+    sql_args : list or tuple of objects or None
+        The arguments of the SQL query
+
+    Returns
+    -------
+    str or None
+        The query with positional ($n) parameters, or None if the query
+        cannot be prepared
+    """
+    if isinstance(sql_args, dict) or _PREPARABLE_SQL.match(sql) is None:
+        return None
+    sql = sql.rstrip().rstrip(';')
+    if ';' in sql:
+        return None
+    if sql_args is None:
+        # psycopg2 doesn't process the placeholders if there are no arguments
+        return sql
+    if any(isinstance(arg, tuple) for arg in sql_args):
+        # Tuples are expanded to lists of values, e.g. for "IN %s"
+        return None
+
+    n_params = 0
+    prepared = []
+    last = 0
+    for match in _PLACEHOLDER.finditer(sql):
+        char = match.group(1)
+        if char == 's':
+            n_params += 1
+            param = '$%d' % n_params
+        elif char == '%':
+            param = '%'
+        else:
+            # Named placeholders, e.g. %(name)s
+            return None
+        prepared.append(sql[last:match.start()])
+        prepared.append(param)
+        last = match.end()
+    prepared.append(sql[last:])
+
+    if n_params != len(sql_args):
+        return None
+    return ''.join(prepared)
+
+
+def _connect(**conn_args):
+    """Opens a new connection to the LabControl database
+
+    Parameters
+    ----------
+    conn_args : dict
+        The keyword arguments passed to psycopg2's connect
+
+    Returns
+    -------
+    psycopg2.extensions.connection
+        The new connection
+
+    Raises
+    ------
+    RuntimeError
+        If the connection cannot be established
+    """
+    try:
+        return connect(connection_factory=_Connection, **conn_args)
+    except OperationalError as e:
+        # catch three known common exceptions and raise runtime errors
+        error_str = str(e)
+        try:
+            etype = error_str.split(':')[1].split()[0]
+        except IndexError:
+            # we recieved a really unanticipated error without a colon
+            etype = ''
+        if etype == 'database':
+            etext = ('This is likely because the database `%s` has not '
+                     'been created or has been dropped.' %
+                     settings.labcontrol_settings.database)
+        elif etype == 'role':
+            etext = ('This is likely because the user string `%s` '
+                     'supplied in your configuration file `%s` is '
+                     'incorrect or not an authorized postgres user.' %
+                     (settings.labcontrol_settings.user,
+                      settings.labcontrol_settings.conf_fp))
+        elif etype == 'Connection':
+            etext = ('This is likely because postgres isn\'t '
+                     'running. Check that postgres is correctly '
+                     'installed and is running.')
+        else:
+            # we recieved a really unanticipated error with a colon
+            etext = ''
+        ebase = ('An OperationalError with the following message occured'
+                 '\n\n\t%s\n%s For more information, review `INSTALL.md`'
+                 ' in the LabControl installation base directory.')
+        raise RuntimeError(ebase % (error_str, etext))
+
+
+class ConnectionPool(object):
+    """A bounded, thread-safe pool of postgres connections
+
+    Parameters
+    ----------
+    maxconn : int
+        The maximum number of connections that can be open at the same time
+    timeout : float, optional
+        The number of seconds to wait for a free connection before giving up.
+        Default: wait forever
+    conn_args : dict
+        The keyword arguments used to open new connections
+
+    Notes
+    -----
+    Connections are opened lazily, so the pool never holds more connections
+    than the maximum number of callers that have used it concurrently.
+    """
+    def __init__(self, maxconn, timeout=None, **conn_args):
+        if maxconn < 1:
+            raise ValueError("maxconn should be a positive integer. Found %s"
+                             % maxconn)
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self._conn_args = conn_args
+        self._idle = []
+        self._lock = Lock()
+        self._slots = BoundedSemaphore(maxconn)
+
+    def getconn(self):
+        """Checks out a connection from the pool
+
+        Blocks until a connection is available if all of them are in use
+
+        Returns
+        -------
+        psycopg2.extensions.connection
+            An open connection, with no transaction in progress
+
+        Raises
+        ------
+        RuntimeError
+            If no connection became available before the pool's timeout
+        """
+        if not self._slots.acquire(timeout=self.timeout):
+            raise RuntimeError(
+                "Timed out waiting for a free database connection: all %d "
+                "connections of the pool are in use" % self.maxconn)
+        try:
+            with self._lock:
+                while self._idle:
+                    conn = self._idle.pop()
+                    if conn.closed == 0:
+                        return conn
+            return _connect(**self._conn_args)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        """Returns a connection to the pool
+
+        Parameters
+        ----------
+        conn : psycopg2.extensions.connection
+            The connection to return, as obtained from `getconn`
+        """
+        try:
+            if conn.closed == 0:
+                if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                    # Never hand an open transaction to the next caller
+                    conn.rollback()
+                with self._lock:
+                    self._idle.append(conn)
+        finally:
+            self._slots.release()
+
+    def closeall(self):
+        """Closes all the idle connections of the pool"""
+        with self._lock:
+            for conn in self._idle:
+                conn.close()
+            self._idle = []
+
+
+# Only single data-modifying statements without a RETURNING clause can be
+# batched: they never produce results, so sending several of them in a single
+# round-trip doesn't change what the transaction returns
+_BATCHABLE_SQL = re.compile(r'^\s*(INSERT|UPDATE|DELETE)\b', re.IGNORECASE)
+_RETURNING_SQL = re.compile(r'\bRETURNING\b', re.IGNORECASE)
+_VALUES_INSERT_SQL = re.compile(
+    r'^(\s*INSERT\s+INTO\s+[^;]+?\s+VALUES\s*)(\(.*\))\s*;?\s*$',
+    re.IGNORECASE | re.DOTALL)
+
+
+def _is_batchable(sql):
+    """Whether the query can be sent to the DB along with other queries
+
+    Parameters
+    ----------
+    sql : str
+        The SQL query
+
+    Returns
+    -------
+    bool
+        True if the query is a single INSERT, UPDATE or DELETE statement
+        without a RETURNING clause
+    """
+    if ';' in sql.rstrip().rstrip(';'):
+        # Multiple statements (or a literal with a semicolon), be safe
+        return False
+    return (_BATCHABLE_SQL.match(sql) is not None and
+            _RETURNING_SQL.search(sql) is None)
+
+
+def _split_values_insert(sql):
+    """Splits an `INSERT ... VALUES (...)` query in its head and row template
+
+    Parameters
+    ----------
+    sql : str
+        The SQL query
+
+    Returns
+    -------
+    (str, str) or None
+        The part of the query up to VALUES and the row template, or None if
+        the query can't be expanded into a multi-row insert
+    """
+    match = _VALUES_INSERT_SQL.match(sql)
+    if match is None:
+        return None
+    head, row = match.groups()
+    # Make sure that the row template is a single parenthesized expression,
+    # e.g. not "(%s) ON CONFLICT (col)"
+    depth = 0
+    for pos, char in enumerate(row):
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0 and pos != len(row) - 1:
+                return None
+    return head, row
+
+
+def _copy_text_value(value):
+    """Formats a python value for PostgreSQL's COPY text format
+
+    Parameters
+    ----------
+    value : object
+        The value to format
+
+    Returns
+    -------
+    str
+        The value formatted as a COPY text field
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (date, time, datetime)):
+        return value.isoformat()
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+# Queries that never modify the database. Anything else (including CTEs,
+# which may contain data-modifying statements) is considered a write
+_READ_SQL = re.compile(r'^\s*(SELECT|SHOW|EXPLAIN|VALUES)\b', re.IGNORECASE)
+# The database functions that modify the database, which are called from
+# SELECT queries
+_WRITE_FUNCTIONS = re.compile(r'\blabcontrol\.update_sample_composition\s*\(',
+                              re.IGNORECASE)
+
+_DATA_VERSIONS = count(1)
+_data_version = 0
+
+
+def _is_write(sql):
+    """Whether the query may modify the database
+
+    Parameters
+    ----------
+    sql : str
+        The SQL query
+
+    Returns
+    -------
+    bool
+        False if the query is a plain read, True otherwise
+    """
+    return (not isinstance(sql, str) or _READ_SQL.match(sql) is None or
+            _WRITE_FUNCTIONS.search(sql) is not None)
+
+
+def _bump_data_version():
+    """Signals that the data in the database may have changed"""
+    global _data_version
+    _data_version = next(_DATA_VERSIONS)
+
+
+def data_version():
+    """Returns the current version of the data of the database
+
+    The version changes whenever a transaction of this process adds a query
+    that may modify the database, and when a transaction that did so is
+    committed or rolled back. Any value read from the database while the
+    version doesn't change can be reused.
+
+    Returns
+    -------
+    int
+        The current data version
+    """
+    return _data_version
+
+
+# The cursor factories used to build the rows of the query results
+ROW_TYPES = {'dict': DictCursor,
+             'namedtuple': NamedTupleCursor,
+             'tuple': None}
+
+
 def _checker(func):
     """Decorator to check that methods are executed inside the context"""
     @wraps(func)
@@ -398,6 +851,18 @@ class Transaction(object):
     A transaction is defined by a series of consecutive queries that need to
     be applied to the database as a single block.
 
+    Parameters
+    ----------
+    pool : ConnectionPool, optional
+        The pool from where the connection is checked out. If not provided,
+        the transaction opens its own connection
+    statement_cache_size : int, optional
+        The number of prepared statements kept per connection. Default: 0,
+        queries are not prepared
+    read_only : bool, optional
+        If true, the transactions are started as READ ONLY, so the database
+        rejects any write. Default: false
+
     Raises
     ------
     RuntimeError
@@ -407,65 +872,106 @@ class Transaction(object):
     -----
     When the execution leaves the context manager, any remaining queries in
     the transaction will be executed and committed.
+
+    If `statement_cache_size` is positive, each distinct query executed on
+    its own is prepared once per connection and the following executions
+    use the prepared statement, so postgres doesn't plan it again. The least
+    recently used statements are deallocated when the cache is full.
+
+    Adding a query that may modify the database, and committing or rolling
+    back a transaction that added one, change the value of `data_version`,
+    which is used to invalidate the values cached from the database.
+
+    Consecutive queued INSERT, UPDATE and DELETE statements without a
+    RETURNING clause are sent to the database in batches of up to
+    `batch_size` statements per round-trip, and repetitions of the same
+    `INSERT ... VALUES (...)` statement (e.g. from `add(..., many=True)`) are
+    merged into a single multi-row INSERT.
     """
-    def __init__(self):
+    # Maximum number of statements sent to the database in a single round-trip
+    batch_size = 500
+
+    def __init__(self, pool=None, statement_cache_size=0, read_only=False):
         self._queries = []
         self._results = []
         self._contexts_entered = 0
         self._connection = None
+        self._pool = pool
+        self._statement_cache_size = statement_cache_size
+        self._read_only = read_only
+        self._stream_count = 0
+        # The server-side cursors of the streams that are still open
+        self._streams = []
+        self._scopes = []
+        self._wrote = False
+        self._checked_out = False
         self._post_commit_funcs = []
         self._post_rollback_funcs = []
 
     def _open_connection(self):
+        if self._pool is not None:
+            # The connection belongs to the pool, and it is only ours while
+            # we are inside the context manager
+            if self._checked_out and self._connection.closed == 0:
+                return
+            if self._checked_out:
+                # The connection got closed (e.g. a failed commit), give it
+                # back so the pool can free its slot
+                self._release_connection()
+            self._connection = self._pool.getconn()
+            self._checked_out = True
+            if self._read_only:
+                self._connection.readonly = True
+            return
+
         # If the connection already exists and is not closed, don't do anything
         if self._connection is not None and self._connection.closed == 0:
             return
 
-        try:
-            self._connection = connect(
-                user=settings.labcontrol_settings.user,
-                password=settings.labcontrol_settings.password,
-                database=settings.labcontrol_settings.database,
-                host=settings.labcontrol_settings.host,
-                port=settings.labcontrol_settings.port)
-        except OperationalError as e:
-            # catch three known common exceptions and raise runtime errors
-            error_str = str(e)
-            try:
-                etype = error_str.split(':')[1].split()[0]
-            except IndexError:
-                # we recieved a really unanticipated error without a colon
-                etype = ''
-            if etype == 'database':
-                etext = ('This is likely because the database `%s` has not '
-                         'been created or has been dropped.' %
-                         settings.labcontrol_settings.database)
-            elif etype == 'role':
-                etext = ('This is likely because the user string `%s` '
-                         'supplied in your configuration file `%s` is '
-                         'incorrect or not an authorized postgres user.' %
-                         (settings.labcontrol_settings.user,
-                          settings.labcontrol_settings.conf_fp))
-            elif etype == 'Connection':
-                etext = ('This is likely because postgres isn\'t '
-                         'running. Check that postgres is correctly '
-                         'installed and is running.')
-            else:
-                # we recieved a really unanticipated error with a colon
-                etext = ''
-            ebase = ('An OperationalError with the following message occured'
-                     '\n\n\t%s\n%s For more information, review `INSTALL.md`'
-                     ' in the LabControl installation base directory.')
-            raise RuntimeError(ebase % (error_str, etext))
+        self._connection = _connect(
+            user=settings.labcontrol_settings.user,
+            password=settings.labcontrol_settings.password,
+            database=settings.labcontrol_settings.database,
+            host=settings.labcontrol_settings.host,
+            port=settings.labcontrol_settings.port)
+        if self._read_only:
+            self._connection.readonly = True
+
+    def _release_connection(self):
+        """Gives the connection back to the pool, if the transaction has one
+
+        The reference to the connection is kept for introspection purposes,
+        but it is not used again until it is checked out from the pool.
+        """
+        # Whatever happened to its cursors, the streams must not read from
+        # a connection that is no longer ours
+        self._streams = []
+        if self._pool is not None and self._checked_out:
+            self._checked_out = False
+            conn = self._connection
+            if self._read_only and not conn.closed:
+                # The pool may hand this connection to a transaction that
+                # writes, so restore the default access mode
+                if conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                conn.readonly = None
+            self._pool.putconn(conn)
 
     def close(self):
         if self._connection is not None:
             self._connection.close()
+            self._release_connection()
 
     @contextmanager
-    def _get_cursor(self):
+    def _get_cursor(self, cursor_factory=DictCursor):
         """Returns a postgres cursor
 
+        Parameters
+        ----------
+        cursor_factory : psycopg2 cursor class, optional
+            The cursor class. Default: DictCursor. If None, the rows are
+            plain tuples
+
         Returns
         -------
         psycopg2.cursor
@@ -479,7 +985,7 @@ class Transaction(object):
         self._open_connection()
 
         try:
-            with self._connection.cursor(cursor_factory=DictCursor) as cur:
+            with self._connection.cursor(cursor_factory=cursor_factory) as cur:
                 yield cur
         except PostgresError as e:
             raise RuntimeError("Cannot get postgres cursor: %s" % e)
@@ -516,6 +1022,7 @@ class Transaction(object):
                 self._clean_up(exc_type)
             finally:
                 self._contexts_entered -= 1
+                self._release_connection()
         else:
             self._contexts_entered -= 1
 
@@ -573,39 +1080,303 @@ class Transaction(object):
                                     " Found %s" % type(args))
             self._queries.append((sql, args))
 
-    def _execute(self):
+        if _is_write(sql):
+            self._wrote = True
+            _bump_data_version()
+
+    def _record(self, sql, elapsed, rows):
+        """Records the execution of a query in the active profiling scopes"""
+        for scope in self._scopes:
+            scope.record(sql, elapsed, rows)
+
+    def start_profile(self, name, n_plus_one_threshold=None):
+        """Starts collecting statistics of the queries executed
+
+        Parameters
+        ----------
+        name : str
+            The name of the profiling scope, e.g. the request URI
+        n_plus_one_threshold : int, optional
+            The number of executions of the same query above which the scope
+            is flagged as having an N+1 pattern
+
+        Returns
+        -------
+        QueryScope
+            The new scope, which collects the queries until it is stopped
+
+        See Also
+        --------
+        stop_profile
+        profile
+        """
+        scope = QueryScope(name, n_plus_one_threshold=n_plus_one_threshold)
+        self.attach_profile(scope)
+        return scope
+
+    def stop_profile(self, scope):
+        """Stops collecting statistics in `scope` and logs its report
+
+        Parameters
+        ----------
+        scope : QueryScope
+            The scope returned by `start_profile`
+        """
+        self.detach_profile(scope)
+        scope.close()
+        scope.log()
+
+    def attach_profile(self, scope):
+        """Records the queries executed from now on in an existing scope
+
+        This allows a scope started in one thread to collect the queries
+        that other threads execute on its behalf
+
+        Parameters
+        ----------
+        scope : QueryScope
+            The scope in which the queries are recorded
+        """
+        if scope not in self._scopes:
+            self._scopes.append(scope)
+
+    def detach_profile(self, scope):
+        """Stops recording queries in `scope`, without closing it
+
+        Parameters
+        ----------
+        scope : QueryScope
+            The scope in which the queries are no longer recorded
+        """
+        if scope in self._scopes:
+            self._scopes.remove(scope)
+
+    @contextmanager
+    def profile(self, name, n_plus_one_threshold=None):
+        """Context manager that profiles the queries executed inside it
+
+        Parameters
+        ----------
+        name : str
+            The name of the profiling scope
+        n_plus_one_threshold : int, optional
+            The number of executions of the same query above which the scope
+            is flagged as having an N+1 pattern
+
+        Yields
+        ------
+        QueryScope
+            The scope collecting the queries. Scopes can be nested
+        """
+        scope = self.start_profile(name, n_plus_one_threshold)
+        try:
+            yield scope
+        finally:
+            self.stop_profile(scope)
+
+    @property
+    def statement_cache(self):
+        """The prepared statements cache of the current connection
+
+        Returns
+        -------
+        StatementCache or None
+            The cache, or None if the statement cache is disabled or there
+            is no connection
+        """
+        if self._statement_cache_size < 1 or self._connection is None:
+            return None
+        cache = getattr(self._connection, 'statement_cache', None)
+        if cache is None and isinstance(self._connection, _Connection):
+            cache = StatementCache(self._statement_cache_size)
+            self._connection.statement_cache = cache
+        return cache
+
+    def _get_statement(self, cur, sql, sql_args):
+        """Returns the query to execute, preparing it if needed
+
+        Parameters
+        ----------
+        cur : psycopg2.cursor
+            The cursor in which the query is executed
+        sql : str
+            The SQL query
+        sql_args : list, tuple or dict of objects
+            The arguments of the SQL query
+
+        Returns
+        -------
+        str, list, tuple or dict of objects
+            The query to execute and its arguments
+        """
+        cache = self.statement_cache
+        if cache is None or sql in cache.unpreparable:
+            return sql, sql_args
+
+        name = cache.get(sql)
+        if name is None:
+            prepared = _to_prepared_sql(sql, sql_args)
+            if prepared is None:
+                cache.unpreparable.add(sql)
+                return sql, sql_args
+
+            name = cache.new_name()
+            # A failed PREPARE aborts the transaction, so isolate it
+            cur.execute('SAVEPOINT labcontrol_prepare')
+            try:
+                cur.execute('PREPARE %s AS %s' % (name, prepared))
+            except PostgresError:
+                cur.execute('ROLLBACK TO SAVEPOINT labcontrol_prepare')
+                cache.unpreparable.add(sql)
+                return sql, sql_args
+            finally:
+                cur.execute('RELEASE SAVEPOINT labcontrol_prepare')
+
+            evicted = cache.put(sql, name)
+            if evicted is not None:
+                cur.execute('DEALLOCATE %s' % evicted)
+
+        if not sql_args:
+            return 'EXECUTE %s' % name, None
+        return ('EXECUTE %s (%s)' % (name, ', '.join(['%s'] * len(sql_args))),
+                sql_args)
+
+    def _execute_query(self, cur, sql, sql_args):
+        """Executes a single query and stores its results
+
+        Parameters
+        ----------
+        cur : psycopg2.cursor
+            The cursor in which the query is executed
+        sql : str
+            The SQL query
+        sql_args : list, tuple or dict of objects
+            The arguments of the SQL query
+        """
+        query, query_args = self._get_statement(cur, sql, sql_args)
+        if self._scopes:
+            start = perf_counter()
+        # Execute the current SQL command
+        try:
+            cur.execute(query, query_args)
+        except Exception as e:
+            # We catch any exception as we want to make sure that we
+            # rollback every time that something went wrong
+            self._raise_execution_error(sql, sql_args, e)
+
+        try:
+            res = cur.fetchall()
+        except ProgrammingError:
+            # At this execution point, we don't know if the sql query
+            # that we executed should retrieve values from the database
+            # If the query was not supposed to retrieve any value
+            # (e.g. an INSERT without a RETURNING clause), it will
+            # raise a ProgrammingError. Otherwise it will just return
+            # an empty list
+            res = None
+        except PostgresError as e:
+            # Some other error happened during the execution of the
+            # query, so we need to rollback
+            self._raise_execution_error(sql, sql_args, e)
+
+        if self._scopes:
+            self._record(sql, perf_counter() - start,
+                         cur.rowcount if res is None else len(res))
+
+        # Store the results of the current query
+        self._results.append(res)
+
+    def _execute_batch(self, cur, batch):
+        """Executes a list of queries that don't return results in one go
+
+        Parameters
+        ----------
+        cur : psycopg2.cursor
+            The cursor in which the queries are executed
+        batch : list of (str, list, tuple or dict of objects)
+            The SQL queries and their arguments. All of them should be
+            batchable, see `_is_batchable`
+        """
+        if len(batch) == 1:
+            self._execute_query(cur, *batch[0])
+            return
+
+        if self._scopes:
+            start = perf_counter()
+        try:
+            statements = []
+            for sql, group in groupby(batch, key=lambda q: q[0]):
+                group = list(group)
+                values_insert = _split_values_insert(sql)
+                if len(group) > 1 and values_insert is not None:
+                    # Expand the repeated INSERT in a multi-row INSERT
+                    head, row = values_insert
+                    statements.append(
+                        head.encode() + b', '.join(
+                            cur.mogrify(row, args) for _, args in group))
+                else:
+                    statements.extend(
+                        cur.mogrify(q, args) for q, args in group)
+            cur.execute(b';\n'.join(statements))
+        except Exception as e:
+            # We can't tell which query of the batch failed, so report all
+            # of them. This also rollbacks the transaction
+            queries = [q for q, _ in groupby(batch, key=lambda q: q[0])]
+            self._raise_execution_error(
+                '\n'.join(queries), [args for _, args in batch], e)
+
+        if self._scopes:
+            # The time of the round-trip is split evenly across the queries
+            elapsed = (perf_counter() - start) / len(batch)
+            for sql, _ in batch:
+                self._record(sql, elapsed, 0)
+
+        # None of these queries produce results
+        self._results.extend([None] * len(batch))
+
+    def _execute(self, idx=None, row_type='dict'):
         """Internal function that actually executes the transaction
         The `execute` function exposed in the API wraps this one to make sure
         that we catch any exception that happens in here and we rollback the
         transaction
-        """
-        with self._get_cursor() as cur:
-            for sql, sql_args in self._queries:
-                # Execute the current SQL command
-                try:
-                    cur.execute(sql, sql_args)
-                except Exception as e:
-                    # We catch any exception as we want to make sure that we
-                    # rollback every time that something went wrong
-                    self._raise_execution_error(sql, sql_args, e)
 
-                try:
-                    res = cur.fetchall()
-                except ProgrammingError as e:
-                    # At this execution point, we don't know if the sql query
-                    # that we executed should retrieve values from the database
-                    # If the query was not supposed to retrieve any value
-                    # (e.g. an INSERT without a RETURNING clause), it will
-                    # raise a ProgrammingError. Otherwise it will just return
-                    # an empty list
-                    res = None
-                except PostgresError as e:
-                    # Some other error happened during the execution of the
-                    # query, so we need to rollback
-                    self._raise_execution_error(sql, sql_args, e)
+        Parameters
+        ----------
+        idx : int, optional
+            The index of the query whose rows are built as `row_type`. The
+            rows of the rest of the queries are DictRow
+        row_type : {'dict', 'namedtuple', 'tuple'}, optional
+            The type of the rows of the `idx` query
+        """
+        target = None
+        if idx is not None and ROW_TYPES[row_type] is not DictCursor:
+            # Translate the transaction index to a position in the queue
+            target = (idx if idx >= 0 else self.index + idx) - len(
+                self._results)
 
-                # Store the results of the current query
-                self._results.append(res)
+        with self._get_cursor() as cur:
+            batch = []
+            for pos, (sql, sql_args) in enumerate(self._queries):
+                if _is_batchable(sql):
+                    batch.append((sql, sql_args))
+                    if len(batch) == self.batch_size:
+                        self._execute_batch(cur, batch)
+                        batch = []
+                    continue
+
+                # The batched queries need to be executed before the current
+                # one, as the current one may depend on them
+                if batch:
+                    self._execute_batch(cur, batch)
+                    batch = []
+                if pos == target:
+                    with self._get_cursor(ROW_TYPES[row_type]) as row_cur:
+                        self._execute_query(row_cur, sql, sql_args)
+                else:
+                    self._execute_query(cur, sql, sql_args)
+
+            if batch:
+                self._execute_batch(cur, batch)
 
         # wipe out the already executed queries
         self._queries = []
@@ -664,7 +1435,8 @@ class Transaction(object):
         execute_fetchflatten
         """
 
-        res = self.execute()
+        # Only the position of the values is needed, so skip building dicts
+        res = self._execute_rows(-1, 'tuple')
         last_res = res[-1]
 
         error_str = "Query was expected to return only one result but " \
@@ -681,8 +1453,32 @@ class Transaction(object):
 
         return last_res[0][0] if last_res else None
 
+    def _execute_rows(self, idx, row_type):
+        """Executes the transaction building the `idx` query rows as `row_type`
+
+        Parameters
+        ----------
+        idx : int
+            The index of the query
+        row_type : {'dict', 'namedtuple', 'tuple'}
+            The type of the rows of the `idx` query
+
+        Returns
+        -------
+        list
+            The results of all the SQL queries in the transaction
+        """
+        if row_type not in ROW_TYPES:
+            raise ValueError("Unknown row type '%s'. Choose from: %s"
+                             % (row_type, ', '.join(sorted(ROW_TYPES))))
+        try:
+            return self._execute(idx, row_type)
+        except Exception:
+            self.rollback()
+            raise
+
     @_checker
-    def execute_fetchindex(self, idx=-1):
+    def execute_fetchindex(self, idx=-1, row_type='dict'):
         """Executes the transaction and returns the results of the `idx` query
 
         This is a convenient function that is equivalent to
@@ -693,10 +1489,15 @@ class Transaction(object):
         idx : int, optional
             The index of the query to return the result. It defaults to -1, the
             last query.
+        row_type : {'dict', 'namedtuple', 'tuple'}, optional
+            The type of the returned rows, if the query is executed now.
+            'dict' rows (the default) can be indexed both by position and by
+            column name, 'namedtuple' rows expose the columns as attributes
+            and 'tuple' rows are the cheapest to build
 
         Returns
         -------
-        DictCursor
+        list of DictRow, namedtuple or tuple
             The results of the `idx` query in the transaction
 
         See Also
@@ -705,7 +1506,7 @@ class Transaction(object):
         execute_fetchlast
         execute_fetchflatten
         """
-        return self.execute()[idx]
+        return self._execute_rows(idx, row_type)[idx]
 
     @_checker
     def execute_fetchflatten(self, idx=-1):
@@ -732,7 +1533,296 @@ class Transaction(object):
         execute_fetchlast
         execute_fetchindex
         """
-        return list(chain.from_iterable(self.execute()[idx]))
+        # Only the position of the values is needed, so skip building dicts
+        return list(chain.from_iterable(self._execute_rows(idx, 'tuple')[idx]))
+
+    @_checker
+    def execute_stream(self, sql, sql_args=None, batch_size=1000):
+        """Executes a query and yields its results in batches
+
+        Parameters
+        ----------
+        sql : str
+            The sql query
+        sql_args : list, tuple or dict of objects, optional
+            The arguments to the sql query
+        batch_size : int, optional
+            The maximum number of rows on each batch. Default: 1000
+
+        Returns
+        -------
+        generator of list of DictRow
+            Yields the next `batch_size` rows of the query result
+
+        Raises
+        ------
+        RuntimeError
+            If invoked outside a context, or if the generator is read after
+            the transaction in which it was created ended
+        ValueError
+            If there is a problem running the query
+
+        Notes
+        -----
+        The rows are retrieved from a server-side cursor, so only a batch of
+        rows is kept in memory at a time. Any query already added to the
+        transaction is executed before `sql`, and the results of the streamed
+        query are not stored in the transaction. The cursor is closed when
+        the transaction is committed or rolled back.
+        """
+        if self._queries:
+            self.execute()
+
+        self._stream_count += 1
+        cur = self._connection.cursor(
+            name='labcontrol_stream_%d' % self._stream_count,
+            cursor_factory=DictCursor)
+        # The stream is only valid while the cursor is registered, i.e.
+        # until the transaction ends (see _close_streams)
+        self._streams.append(cur)
+        return self._stream(cur, sql, sql_args, batch_size)
+
+    def _stream(self, cur, sql, sql_args, batch_size):
+        """Yields the results of a query from a server-side cursor
+
+        See Also
+        --------
+        execute_stream
+        """
+        elapsed = 0.0
+        n_rows = 0
+        try:
+            start = perf_counter()
+            # The generator may be started or resumed after the transaction
+            # ended, when the connection may already belong to another thread
+            self._check_stream(cur)
+            try:
+                cur.execute(sql, sql_args)
+            except Exception as e:
+                self._raise_execution_error(sql, sql_args, e)
+
+            while True:
+                self._check_stream(cur)
+                try:
+                    rows = cur.fetchmany(batch_size)
+                except Exception as e:
+                    self._raise_execution_error(sql, sql_args, e)
+                elapsed += perf_counter() - start
+                if not rows:
+                    break
+                n_rows += len(rows)
+                yield rows
+                start = perf_counter()
+        finally:
+            if self._scopes:
+                self._record(sql, elapsed, n_rows)
+            # If the stream is no longer registered, the cursor was closed
+            # when the transaction ended
+            if cur in self._streams:
+                self._streams.remove(cur)
+                self._close_cursor(cur)
+
+    def _check_stream(self, cur):
+        """Checks that a stream can still read from its cursor
+
+        Parameters
+        ----------
+        cur : psycopg2.cursor
+            The server-side cursor of the stream
+
+        Raises
+        ------
+        RuntimeError
+            If the transaction in which the stream was started has ended
+        """
+        if (self._contexts_entered == 0 or cur not in self._streams or
+                cur.connection is not self._connection):
+            raise RuntimeError(
+                "Operation not permitted. The stream can only be read "
+                "within the transaction in which it was started.")
+
+    def _close_cursor(self, cur):
+        """Closes a server-side cursor, if its connection is still open"""
+        if not cur.closed and not cur.connection.closed:
+            try:
+                cur.close()
+            except PostgresError:
+                # The transaction has been aborted, so the cursor no
+                # longer exists in the server
+                pass
+
+    def _close_streams(self):
+        """Closes the cursors of the streams that are still open
+
+        The streams are closed before the transaction ends, so they can't
+        read from the connection once it goes back to the pool
+        """
+        streams = self._streams
+        self._streams = []
+        for cur in streams:
+            self._close_cursor(cur)
+
+    @_checker
+    def copy_rows(self, table, columns, rows, returning=None):
+        """Bulk inserts rows in a table using COPY
+
+        Parameters
+        ----------
+        table : str
+            The schema-qualified name of the table, e.g. 'labcontrol.well'
+        columns : list of str
+            The columns of the table for which `rows` provides values
+        rows : iterable of sequences
+            The values of each row, in the same order as `columns`
+        returning : str, optional
+            A column of the table whose values for the inserted rows should
+            be returned, e.g. the primary key
+
+        Returns
+        -------
+        list of objects or None
+            If `returning` is provided, the values of that column for the
+            inserted rows, in the same order as `rows`
+
+        Raises
+        ------
+        ValueError
+            If the rows cannot be inserted
+
+        Notes
+        -----
+        Any query already added to the transaction is executed before the
+        rows are copied. The rows are copied in a temporary table and moved
+        to `table` with a single `INSERT ... SELECT` so the database can fill
+        the columns that are not provided (e.g. serial ids) and check the
+        table constraints. If `returning` is not provided, it is filled with
+        its default value in the temporary table, where each value is matched
+        with the number of its row. The result of the copy is stored as a
+        query result, so it is accounted in `index`.
+        """
+        if self._queries:
+            self.execute()
+
+        table = pgsql.SQL('.').join(
+            pgsql.Identifier(name) for name in table.split('.'))
+        cols = pgsql.SQL(', ').join(pgsql.Identifier(c) for c in columns)
+        tmp_table = pgsql.Identifier('copy_rows_tmp')
+        n_cols = len(columns)
+
+        data = StringIO()
+        n_rows = 0
+        for n_rows, row in enumerate(rows, start=1):
+            if len(row) != n_cols:
+                self.rollback()
+                raise ValueError(
+                    "Row %d has %d values but %d columns were provided"
+                    % (n_rows, len(row), n_cols))
+            data.write('%d\t' % n_rows)
+            data.write('\t'.join(_copy_text_value(v) for v in row))
+            data.write('\n')
+
+        if n_rows == 0:
+            res = [] if returning is not None else None
+            self._results.append(res)
+            return res
+
+        self._wrote = True
+        _bump_data_version()
+
+        # PostgreSQL doesn't guarantee the order of the rows returned by
+        # INSERT ... RETURNING, so the returned values are read from the
+        # temporary table, next to the number of their row. A returned column
+        # that is not provided is filled in the temporary table first, with
+        # its default value (e.g. the next value of its sequence)
+        fill_returning = returning is not None and returning not in columns
+        tmp_cols = cols
+        if fill_returning:
+            tmp_cols = pgsql.SQL(', ').join(
+                [cols, pgsql.Identifier(returning)])
+        sqls = [
+            pgsql.SQL("CREATE TEMP TABLE {0} ON COMMIT DROP AS "
+                      "SELECT 0::bigint AS copy_row_number, {1} FROM {2} "
+                      "WITH NO DATA").format(tmp_table, tmp_cols, table),
+            pgsql.SQL("COPY {0} (copy_row_number, {1}) FROM STDIN").format(
+                tmp_table, cols),
+            pgsql.SQL("INSERT INTO {0} ({1}) SELECT {1} FROM {2} "
+                      "ORDER BY copy_row_number").format(
+                          table, tmp_cols, tmp_table)]
+        if returning is not None:
+            sqls.append(pgsql.SQL(
+                "SELECT copy_row_number, {0} FROM {1}").format(
+                    pgsql.Identifier(returning), tmp_table))
+        sqls.append(pgsql.SQL("DROP TABLE {0}").format(tmp_table))
+
+        start = perf_counter()
+        with self._get_cursor() as cur:
+            sqls = [q.as_string(cur) for q in sqls]
+            res = None
+            try:
+                cur.execute(sqls[0])
+                data.seek(0)
+                cur.copy_expert(sqls[1], data)
+                if fill_returning:
+                    self._fill_column_default(cur, table, tmp_table,
+                                              returning)
+                cur.execute(sqls[2])
+                if returning is not None:
+                    cur.execute(sqls[3])
+                    res = [None] * n_rows
+                    for row_number, value in cur.fetchall():
+                        res[row_number - 1] = value
+                cur.execute(sqls[-1])
+            except Exception as e:
+                self._raise_execution_error(
+                    '\n'.join(sqls), 'Copy of %d rows' % n_rows, e)
+
+        if self._scopes:
+            self._record(sqls[2], perf_counter() - start, n_rows)
+
+        self._results.append(res)
+        return res
+
+    @staticmethod
+    def _fill_column_default(cur, table, tmp_table, column):
+        """Fills a column of a copy with the default value of the table
+
+        Parameters
+        ----------
+        cur : psycopg2.cursor
+            The cursor of the copy
+        table : psycopg2.sql.Composable
+            The table in which the rows are copied
+        tmp_table : psycopg2.sql.Composable
+            The temporary table holding the copied rows
+        column : str
+            The column to fill
+
+        Raises
+        ------
+        ValueError
+            If the column doesn't have a default value
+        """
+        cur.execute(
+            pgsql.SQL("SELECT pg_get_expr(d.adbin, d.adrelid) "
+                      "FROM pg_attrdef d "
+                      "JOIN pg_attribute a ON a.attrelid = d.adrelid "
+                      "AND a.attnum = d.adnum "
+                      "WHERE d.adrelid = {0}::regclass AND a.attname = %s")
+            .format(pgsql.Literal(table.as_string(cur))), [column])
+        res = cur.fetchone()
+        if res is None:
+            raise ValueError(
+                "Column %s is not provided and doesn't have a default value"
+                % column)
+        # The expression comes from the catalog, not from the caller. It is
+        # evaluated in the order of the rows, so serial ids follow the rows
+        cur.execute(pgsql.SQL(
+            "UPDATE {0} t SET {1} = d.value "
+            "FROM (SELECT copy_row_number, {2} AS value "
+            "FROM (SELECT copy_row_number FROM {0} "
+            "ORDER BY copy_row_number) AS s) AS d "
+            "WHERE t.copy_row_number = d.copy_row_number").format(
+                tmp_table, pgsql.Identifier(column), pgsql.SQL(res[0])))
 
     def _funcs_executor(self, funcs, func_str):
         error_msg = []
@@ -762,11 +1852,15 @@ class Transaction(object):
         # Reset the queries, the results and the index
         self._queries = []
         self._results = []
+        self._close_streams()
         try:
             self._connection.commit()
         except Exception:
             self._connection.close()
             raise
+        if self._wrote:
+            self._wrote = False
+            _bump_data_version()
         # Execute the post commit functions
         self._funcs_executor(self._post_commit_funcs, "commit")
 
@@ -782,11 +1876,15 @@ class Transaction(object):
         # Reset the queries, the results and the index
         self._queries = []
         self._results = []
+        self._close_streams()
         try:
             self._connection.rollback()
         except Exception:
             self._connection.close()
             raise
+        if self._wrote:
+            self._wrote = False
+            _bump_data_version()
         # Execute the post rollback functions
         self._funcs_executor(self._post_rollback_funcs, "rollback")
 
@@ -835,5 +1933,151 @@ class Transaction(object):
         self._post_rollback_funcs.append((func, args, kwargs))
 
 
-# Singleton pattern, create the transaction for the entire system
-TRN = Transaction()
+_POOL = None
+_POOL_LOCK = Lock()
+
+
+def get_pool():
+    """Returns the connection pool shared by all the transactions
+
+    Returns
+    -------
+    ConnectionPool
+        The pool, created on first use from the LabControl configuration
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ConnectionPool(
+                settings.labcontrol_settings.max_connections,
+                user=settings.labcontrol_settings.user,
+                password=settings.labcontrol_settings.password,
+                database=settings.labcontrol_settings.database,
+                host=settings.labcontrol_settings.host,
+                port=settings.labcontrol_settings.port)
+    return _POOL
+
+
+_READ_POOL = None
+
+
+def get_read_pool():
+    """Returns the connection pool shared by all the read-only transactions
+
+    Returns
+    -------
+    ConnectionPool
+        The pool of connections to the read host (e.g. a streaming replica).
+        If the read host is the same as the main host, the main pool
+    """
+    global _READ_POOL
+    lc_settings = settings.labcontrol_settings
+    if (lc_settings.read_host, lc_settings.read_port) == (
+            lc_settings.host, lc_settings.port):
+        return get_pool()
+    with _POOL_LOCK:
+        if _READ_POOL is None:
+            _READ_POOL = ConnectionPool(
+                lc_settings.max_connections,
+                user=lc_settings.user,
+                password=lc_settings.password,
+                database=lc_settings.database,
+                host=lc_settings.read_host,
+                port=lc_settings.read_port)
+    return _READ_POOL
+
+
+class LocalTransaction(object):
+    """Dispatches every operation to the Transaction of the calling thread
+
+    Each thread gets its own Transaction, which checks out a connection from
+    the shared pool when its outermost context is entered and gives it back
+    when that context is left. This keeps the `TRN.add`/`TRN.execute_*` API
+    while allowing several threads to talk to the database at the same time.
+
+    Notes
+    -----
+    A thread-local (rather than a context-local) transaction is used because
+    the DB layer is fully synchronous: a `with TRN` block never yields to the
+    IOLoop, so within a thread a request owns the transaction for as long as
+    it is using it.
+    """
+    def __init__(self):
+        object.__setattr__(self, '_local', local())
+
+    def _get_transaction(self, attr, pool_getter, read_only):
+        trn = getattr(self._local, attr, None)
+        if trn is None:
+            trn = Transaction(
+                pool=pool_getter(),
+                statement_cache_size=(
+                    settings.labcontrol_settings.statement_cache_size),
+                read_only=read_only)
+            # The read-write and read-only transactions of a thread record
+            # their queries in the same profiling scopes, so the scopes
+            # attached to one of them also profile the other
+            if not hasattr(self._local, 'scopes'):
+                self._local.scopes = []
+            trn._scopes = self._local.scopes
+            setattr(self._local, attr, trn)
+        return trn
+
+    @property
+    def transaction(self):
+        """The Transaction owned by the calling thread
+
+        Inside a `read_only` block this is the read-only transaction of the
+        thread, unless the read-write transaction was already in use when
+        the block started, so its uncommitted changes remain visible.
+        """
+        trn = self._get_transaction('transaction', get_pool, False)
+        if (getattr(self._local, 'read_only_depth', 0) and
+                trn._contexts_entered == 0):
+            trn = self._get_transaction(
+                'read_only_transaction', get_read_pool, True)
+        return trn
+
+    @contextmanager
+    def read_only(self):
+        """Routes the calling thread's queries to a read-only transaction
+
+        The read-only transactions use connections to the configured read
+        host (READ_HOST/READ_PORT), which may be a streaming replica, so
+        they are meant for reporting queries that can tolerate some lag.
+        """
+        self._local.read_only_depth = getattr(
+            self._local, 'read_only_depth', 0) + 1
+        try:
+            yield
+        finally:
+            self._local.read_only_depth -= 1
+
+    def __enter__(self):
+        return self.transaction.__enter__()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self.transaction.__exit__(exc_type, exc_value, traceback)
+
+    def __getattr__(self, name):
+        return getattr(self.transaction, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.transaction, name, value)
+
+
+# Singleton pattern, create the transaction entry point for the entire system
+TRN = LocalTransaction()
+
+
+def read_only_transaction(func):
+    """Decorator that runs `func` in a read-only transaction
+
+    See Also
+    --------
+    LocalTransaction.read_only
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with TRN.read_only():
+            return func(*args, **kwargs)
+    return wrapper
@@ -183,6 +183,85 @@ class Study(base.LabControlObject):
                 raise ValueError('Could not find "%s"' % sample_id)
             return res.pop()
 
+    def sample_ids_to_specimen_ids(self, sample_ids):
+        """Retrieves the specimen identifiers of several sample identifiers
+
+        Parameters
+        ----------
+        sample_ids: iterable of str
+            The sample identifiers
+
+        Returns
+        -------
+        dict of {str: str}
+            The specimen identifier of each sample identifier. Samples that
+            are not found are not included.
+
+        Notes
+        -----
+        If a specimen identifier column hasn't been set, each sample
+        identifier is its own specimen identifier.
+        """
+        sample_ids = list(sample_ids)
+        specimen_id_column = self.specimen_id_column
+        if specimen_id_column is None:
+            return {sid: sid for sid in sample_ids}
+
+        with sql_connection.TRN as TRN:
+            sql = """SELECT sample_id, sample_values->'{0}'
+                     FROM qiita.sample_{1}
+                     WHERE sample_id = ANY(%s)
+                     """.format(specimen_id_column, self.id)
+            TRN.add(sql, [sample_ids])
+            return dict(TRN.execute_fetchindex(row_type='tuple'))
+
+    def specimen_ids_to_sample_ids(self, specimens):
+        """Retrieves the sample identifiers of several specimens
+
+        Parameters
+        ----------
+        specimens: iterable of str
+            The names of the specimens
+
+        Returns
+        -------
+        dict of {str: str}
+            The sample identifier of each specimen. Specimens that are not
+            found are not included.
+
+        Raises
+        ------
+        RuntimeError
+            If more than one match is found for any of the specimens.
+
+        See Also
+        --------
+        specimen_id_to_sample_id
+        """
+        specimens = list(specimens)
+        specimen_id_column = self.specimen_id_column
+
+        with sql_connection.TRN as TRN:
+            if specimen_id_column is None:
+                sql = """SELECT sample_id, sample_id
+                         FROM qiita.study_sample
+                         WHERE sample_id = ANY(%s)"""
+            else:
+                sql = """SELECT sample_values->>'{1}', sample_id
+                         FROM qiita.sample_{0}
+                         WHERE sample_values->>'{1}' = ANY(%s)
+                         """.format(self._id, specimen_id_column)
+            TRN.add(sql, [specimens])
+            res = {}
+            for specimen, sample_id in TRN.execute_fetchindex(
+                    row_type='tuple'):
+                if specimen in res:
+                    raise RuntimeError(
+                        'There are several matches found for "%s"; there is '
+                        'a problem with the specimen id column' % specimen)
+                res[specimen] = sample_id
+        return res
+
     def samples(self, term=None, limit=None):
         """The study samples
 
@@ -269,6 +348,7 @@ class Study(base.LabControlObject):
             return TRN.execute_fetchlast()
 
     @property
+    @sql_connection.read_only_transaction
     def sample_numbers_summary(self):
         """Retrieves a summary of the status of the samples"""
         with sql_connection.TRN as TRN:
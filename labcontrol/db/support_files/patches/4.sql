@@ -0,0 +1,262 @@
+-- October 16, 2026
+-- Keep a denormalized summary of each plate, so the plate listings don't
+-- have to work out the same facts from the plate/well/composition joins on
+-- every request.
+
+-- Most of the lookups of the summary refresh start from the plate
+CREATE INDEX idx_well_plate ON labcontrol.well ( plate_id );
+
+CREATE TABLE labcontrol.plate_summary (
+    plate_id                    bigint  NOT NULL,
+    -- The type of the compositions in the wells of the plate, NULL if the
+    -- plate doesn't hold any composition
+    composition_type_id         bigint  ,
+    num_wells                   integer  NOT NULL DEFAULT 0,
+    quantified                  bool  NOT NULL DEFAULT FALSE,
+    -- The process that generated the plate
+    process_id                  bigint  ,
+    -- The studies of the samples the compositions of the plate derive from
+    study_ids                   bigint[]  NOT NULL DEFAULT '{}',
+    -- The transaction that last refreshed the summary from a trigger
+    refreshed_txid              bigint  ,
+    CONSTRAINT pk_plate_summary PRIMARY KEY ( plate_id ),
+    CONSTRAINT fk_plate_summary_plate FOREIGN KEY ( plate_id ) REFERENCES labcontrol.plate( plate_id ) ON DELETE CASCADE,
+    CONSTRAINT fk_plate_summary_composition_type FOREIGN KEY ( composition_type_id ) REFERENCES labcontrol.composition_type( composition_type_id ),
+    CONSTRAINT fk_plate_summary_process FOREIGN KEY ( process_id ) REFERENCES labcontrol.process( process_id )
+ );
+
+CREATE INDEX idx_plate_summary_composition_type ON labcontrol.plate_summary ( composition_type_id );
+
+COMMENT ON TABLE labcontrol.plate_summary IS 'Maintained by triggers, do not modify. The triggers are deferred, so the summary of a plate is only current once the transaction that modified it commits';
+
+-- Recomputes the summary of a plate from scratch
+CREATE OR REPLACE FUNCTION labcontrol.refresh_plate_summary(in_plate_id BIGINT) RETURNS void AS $$
+BEGIN
+    INSERT INTO labcontrol.plate_summary
+            (plate_id, composition_type_id, num_wells, quantified,
+             process_id, study_ids, refreshed_txid)
+        SELECT p.plate_id,
+               (SELECT min(c.composition_type_id)
+                FROM labcontrol.well w
+                    JOIN labcontrol.composition c USING (container_id)
+                WHERE w.plate_id = p.plate_id),
+               (SELECT count(*)
+                FROM labcontrol.well w
+                WHERE w.plate_id = p.plate_id),
+               EXISTS (SELECT 1
+                       FROM labcontrol.well w
+                            JOIN labcontrol.composition c USING (container_id)
+                            JOIN labcontrol.concentration_calculation cc
+                                ON cc.quantitated_composition_id = c.composition_id
+                       WHERE w.plate_id = p.plate_id),
+               (SELECT max(ct.latest_upstream_process_id)
+                FROM labcontrol.well w
+                    JOIN labcontrol.container ct USING (container_id)
+                WHERE w.plate_id = p.plate_id),
+               -- Resolve every composition to the sample composition it
+               -- derives from: gDNA and 16S library preps go through gDNA,
+               -- shotgun library preps go through normalized and compressed
+               -- gDNA
+               COALESCE(
+                (SELECT array_agg(DISTINCT ss.study_id ORDER BY ss.study_id)
+                 FROM labcontrol.well w
+                    JOIN labcontrol.composition c USING (container_id)
+                    LEFT JOIN labcontrol.sample_composition sc0
+                        ON sc0.composition_id = c.composition_id
+                    LEFT JOIN labcontrol.gdna_composition g0
+                        ON g0.composition_id = c.composition_id
+                    LEFT JOIN labcontrol.library_prep_16s_composition l16
+                        ON l16.composition_id = c.composition_id
+                    LEFT JOIN labcontrol.compressed_gdna_composition cg0
+                        ON cg0.composition_id = c.composition_id
+                    LEFT JOIN labcontrol.normalized_gdna_composition ng0
+                        ON ng0.composition_id = c.composition_id
+                    LEFT JOIN labcontrol.library_prep_shotgun_composition ls
+                        ON ls.composition_id = c.composition_id
+                    LEFT JOIN labcontrol.normalized_gdna_composition ng
+                        ON ng.normalized_gdna_composition_id = ls.normalized_gdna_composition_id
+                    LEFT JOIN labcontrol.compressed_gdna_composition cg
+                        ON cg.compressed_gdna_composition_id = COALESCE(
+                            cg0.compressed_gdna_composition_id,
+                            ng0.compressed_gdna_composition_id,
+                            ng.compressed_gdna_composition_id)
+                    LEFT JOIN labcontrol.gdna_composition g
+                        ON g.gdna_composition_id = COALESCE(
+                            g0.gdna_composition_id, l16.gdna_composition_id,
+                            cg.gdna_composition_id)
+                    JOIN labcontrol.sample_composition sc
+                        ON sc.sample_composition_id = COALESCE(
+                            sc0.sample_composition_id, g.sample_composition_id)
+                    JOIN qiita.study_sample ss ON ss.sample_id = sc.sample_id
+                 WHERE w.plate_id = p.plate_id), '{}'),
+               NULL
+        FROM labcontrol.plate p
+        WHERE p.plate_id = in_plate_id
+    ON CONFLICT (plate_id) DO UPDATE
+        SET composition_type_id = EXCLUDED.composition_type_id,
+            num_wells = EXCLUDED.num_wells,
+            quantified = EXCLUDED.quantified,
+            process_id = EXCLUDED.process_id,
+            study_ids = EXCLUDED.study_ids,
+            refreshed_txid = EXCLUDED.refreshed_txid;
+END
+$$ LANGUAGE plpgsql;
+
+-- Refreshes the summary of a plate once per transaction. It is only called
+-- from the deferred triggers, which run when the transaction commits: by
+-- then all the changes to the plate have been made, so a single refresh
+-- covers all of them, instead of one per modified row
+CREATE OR REPLACE FUNCTION labcontrol.refresh_plate_summary_once(in_plate_id BIGINT) RETURNS void AS $$
+BEGIN
+    IF NOT EXISTS (SELECT 1
+                   FROM labcontrol.plate_summary
+                   WHERE plate_id = in_plate_id
+                        AND refreshed_txid = txid_current()) THEN
+        PERFORM labcontrol.refresh_plate_summary(in_plate_id);
+        UPDATE labcontrol.plate_summary
+            SET refreshed_txid = txid_current()
+            WHERE plate_id = in_plate_id;
+    END IF;
+END
+$$ LANGUAGE plpgsql;
+
+-- Plates are created empty, so they have a summary right away
+CREATE OR REPLACE FUNCTION labcontrol.plate_summary_plate_trg() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO labcontrol.plate_summary (plate_id) VALUES (NEW.plate_id);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER plate_summary_plate
+    AFTER INSERT ON labcontrol.plate
+    FOR EACH ROW EXECUTE PROCEDURE labcontrol.plate_summary_plate_trg();
+
+CREATE OR REPLACE FUNCTION labcontrol.plate_summary_well_trg() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM labcontrol.refresh_plate_summary_once(NEW.plate_id);
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM labcontrol.refresh_plate_summary_once(OLD.plate_id);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER plate_summary_well
+    AFTER INSERT OR UPDATE OR DELETE ON labcontrol.well
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE PROCEDURE labcontrol.plate_summary_well_trg();
+
+CREATE OR REPLACE FUNCTION labcontrol.plate_summary_composition_trg() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM labcontrol.refresh_plate_summary_once(plate_id)
+            FROM labcontrol.well
+            WHERE container_id = NEW.container_id;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM labcontrol.refresh_plate_summary_once(plate_id)
+            FROM labcontrol.well
+            WHERE container_id = OLD.container_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER plate_summary_composition
+    AFTER INSERT OR UPDATE OR DELETE ON labcontrol.composition
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE PROCEDURE labcontrol.plate_summary_composition_trg();
+
+-- The plates holding a sample composition or any composition derived from it
+CREATE OR REPLACE FUNCTION labcontrol.sample_composition_plates(in_sample_composition_id BIGINT, in_composition_id BIGINT) RETURNS SETOF bigint AS $$
+    SELECT DISTINCT w.plate_id
+    FROM labcontrol.well w
+        JOIN labcontrol.composition c USING (container_id)
+    WHERE c.composition_id = in_composition_id
+        OR c.composition_id IN (
+            SELECT g.composition_id
+            FROM labcontrol.gdna_composition g
+            WHERE g.sample_composition_id = in_sample_composition_id
+            UNION
+            SELECT l16.composition_id
+            FROM labcontrol.library_prep_16s_composition l16
+                JOIN labcontrol.gdna_composition g
+                    ON g.gdna_composition_id = l16.gdna_composition_id
+            WHERE g.sample_composition_id = in_sample_composition_id
+            UNION
+            SELECT cg.composition_id
+            FROM labcontrol.compressed_gdna_composition cg
+                JOIN labcontrol.gdna_composition g
+                    ON g.gdna_composition_id = cg.gdna_composition_id
+            WHERE g.sample_composition_id = in_sample_composition_id
+            UNION
+            SELECT ng.composition_id
+            FROM labcontrol.normalized_gdna_composition ng
+                JOIN labcontrol.compressed_gdna_composition cg
+                    ON cg.compressed_gdna_composition_id = ng.compressed_gdna_composition_id
+                JOIN labcontrol.gdna_composition g
+                    ON g.gdna_composition_id = cg.gdna_composition_id
+            WHERE g.sample_composition_id = in_sample_composition_id
+            UNION
+            SELECT ls.composition_id
+            FROM labcontrol.library_prep_shotgun_composition ls
+                JOIN labcontrol.normalized_gdna_composition ng
+                    ON ng.normalized_gdna_composition_id = ls.normalized_gdna_composition_id
+                JOIN labcontrol.compressed_gdna_composition cg
+                    ON cg.compressed_gdna_composition_id = ng.compressed_gdna_composition_id
+                JOIN labcontrol.gdna_composition g
+                    ON g.gdna_composition_id = cg.gdna_composition_id
+            WHERE g.sample_composition_id = in_sample_composition_id);
+$$ LANGUAGE sql;
+
+-- Changing the sample of a well changes the studies of its plate and of all
+-- the plates derived from it
+CREATE OR REPLACE FUNCTION labcontrol.plate_summary_sample_composition_trg() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM labcontrol.refresh_plate_summary_once(plate_id)
+            FROM labcontrol.sample_composition_plates(
+                NEW.sample_composition_id, NEW.composition_id) AS plate_id;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM labcontrol.refresh_plate_summary_once(plate_id)
+            FROM labcontrol.sample_composition_plates(
+                OLD.sample_composition_id, OLD.composition_id) AS plate_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER plate_summary_sample_composition
+    AFTER INSERT OR UPDATE OR DELETE ON labcontrol.sample_composition
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE PROCEDURE labcontrol.plate_summary_sample_composition_trg();
+
+CREATE OR REPLACE FUNCTION labcontrol.plate_summary_concentration_trg() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM labcontrol.refresh_plate_summary_once(w.plate_id)
+            FROM labcontrol.composition c
+                JOIN labcontrol.well w USING (container_id)
+            WHERE c.composition_id = NEW.quantitated_composition_id;
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM labcontrol.refresh_plate_summary_once(w.plate_id)
+            FROM labcontrol.composition c
+                JOIN labcontrol.well w USING (container_id)
+            WHERE c.composition_id = OLD.quantitated_composition_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER plate_summary_concentration
+    AFTER INSERT OR UPDATE OR DELETE ON labcontrol.concentration_calculation
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE PROCEDURE labcontrol.plate_summary_concentration_trg();
+
+-- Backfill the summary of the existing plates
+SELECT labcontrol.refresh_plate_summary(plate_id) FROM labcontrol.plate;
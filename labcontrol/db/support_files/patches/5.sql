@@ -0,0 +1,32 @@
+-- October 16, 2026
+-- Index the columns used by the plate search, so it doesn't scan the
+-- composition table.
+
+-- Full-text search on the plate and well notes. The queries must use the
+-- same 'english' configuration for the indexes to be used
+CREATE INDEX idx_plate_notes_fts ON labcontrol.plate USING gin ( to_tsvector('english', notes) );
+CREATE INDEX idx_composition_notes_fts ON labcontrol.composition USING gin ( to_tsvector('english', notes) );
+
+CREATE INDEX idx_sample_composition_sample_id ON labcontrol.sample_composition ( sample_id );
+
+-- Substring searches on the plate names and the sample contents use
+-- trigram indexes. pg_trgm is a contrib module that may not be installed.
+-- Installing it needs superuser privileges on PostgreSQL 9.5, which the
+-- application user usually doesn't have. In that case the indexes are
+-- skipped, and can be added once a superuser creates the extension (see the
+-- README). The searches work either way, only slower without the indexes
+DO $do$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')
+            AND EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        BEGIN
+            CREATE EXTENSION pg_trgm;
+        EXCEPTION WHEN insufficient_privilege THEN
+            RAISE NOTICE 'Not allowed to create the pg_trgm extension, skipping the trigram indexes';
+        END;
+    END IF;
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        CREATE INDEX IF NOT EXISTS idx_plate_external_id_trgm ON labcontrol.plate USING gin ( external_id gin_trgm_ops );
+        CREATE INDEX IF NOT EXISTS idx_sample_composition_content_trgm ON labcontrol.sample_composition USING gin ( content gin_trgm_ops );
+    END IF;
+END $do$;
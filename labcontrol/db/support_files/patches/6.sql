@@ -0,0 +1,60 @@
+-- October 16, 2026
+-- Sample plates can be created without their wells. The positions without a
+-- well read as blanks, and the wells are only stored when they are edited or
+-- when the plate is extracted.
+
+CREATE TABLE labcontrol.implicit_blank_plate (
+    plate_id                    bigint  NOT NULL,
+    -- The sample plating process that created the plate
+    process_id                  bigint  NOT NULL,
+    -- The volume of the wells, once they are stored
+    well_volume                 real  NOT NULL DEFAULT 0,
+    CONSTRAINT pk_implicit_blank_plate PRIMARY KEY ( plate_id ),
+    CONSTRAINT fk_implicit_blank_plate_plate FOREIGN KEY ( plate_id ) REFERENCES labcontrol.plate( plate_id ) ON DELETE CASCADE,
+    CONSTRAINT fk_implicit_blank_plate_process FOREIGN KEY ( process_id ) REFERENCES labcontrol.process( process_id )
+ );
+
+CREATE INDEX idx_implicit_blank_plate_process ON labcontrol.implicit_blank_plate ( process_id );
+
+COMMENT ON TABLE labcontrol.implicit_blank_plate IS 'Plates whose missing wells hold implicit blanks. The row is removed once all the wells of the plate are stored';
+
+-- The summary of a plate with implicit blanks counts all its positions, and
+-- takes its composition type and generating process from the plating, as
+-- the plate may not have any stored well yet
+ALTER FUNCTION labcontrol.refresh_plate_summary(BIGINT) RENAME TO refresh_plate_summary_from_wells;
+
+CREATE OR REPLACE FUNCTION labcontrol.refresh_plate_summary(in_plate_id BIGINT) RETURNS void AS $$
+BEGIN
+    PERFORM labcontrol.refresh_plate_summary_from_wells(in_plate_id);
+    UPDATE labcontrol.plate_summary ps
+        SET composition_type_id = COALESCE(
+                ps.composition_type_id,
+                (SELECT composition_type_id
+                 FROM labcontrol.composition_type
+                 WHERE description = 'sample')),
+            num_wells = pc.num_rows * pc.num_columns,
+            process_id = COALESCE(ps.process_id, ibp.process_id)
+        FROM labcontrol.implicit_blank_plate ibp
+            JOIN labcontrol.plate p USING (plate_id)
+            JOIN labcontrol.plate_configuration pc
+                USING (plate_configuration_id)
+        WHERE ps.plate_id = in_plate_id AND ibp.plate_id = ps.plate_id;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION labcontrol.plate_summary_implicit_blank_trg() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP <> 'DELETE' THEN
+        PERFORM labcontrol.refresh_plate_summary_once(NEW.plate_id);
+    END IF;
+    IF TG_OP <> 'INSERT' THEN
+        PERFORM labcontrol.refresh_plate_summary_once(OLD.plate_id);
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER plate_summary_implicit_blank
+    AFTER INSERT OR UPDATE OR DELETE ON labcontrol.implicit_blank_plate
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE PROCEDURE labcontrol.plate_summary_implicit_blank_trg();
@@ -0,0 +1,127 @@
+-- October 16, 2026
+-- Update the content of a sample composition in a single round-trip. The
+-- logic used to live in SampleComposition.update, which took up to eight
+-- queries per well edit.
+
+-- The name of a well, e.g. A1 or AF48. Matches well_coordinates.well_name
+CREATE OR REPLACE FUNCTION labcontrol.well_name(in_row_num INTEGER, in_col_num INTEGER) RETURNS VARCHAR AS $$
+DECLARE
+    letters VARCHAR := '';
+    remaining INTEGER := in_row_num;
+BEGIN
+    WHILE remaining > 0 LOOP
+        letters := chr(ascii('A') + (remaining - 1) % 26) || letters;
+        remaining := (remaining - 1) / 26;
+    END LOOP;
+    RETURN letters || in_col_num;
+END
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+-- The sample name qualified with the plate name and the well, e.g.
+-- blank.Test.plate.1.H1. Matches SampleComposition.generate_content
+CREATE OR REPLACE FUNCTION labcontrol.generate_sample_content(in_sample_name VARCHAR, in_well_id BIGINT) RETURNS VARCHAR AS $$
+    SELECT in_sample_name || '.' ||
+           regexp_replace(p.external_id, '[\s,_]+', '.', 'g') || '.' ||
+           labcontrol.well_name(w.row_num, w.col_num)
+    FROM labcontrol.well w
+        JOIN labcontrol.plate p USING (plate_id)
+    WHERE w.well_id = in_well_id
+$$ LANGUAGE sql STABLE;
+
+-- Updates the content of a sample composition, see SampleComposition.update.
+-- Returns the new content and whether it is ok, i.e. it is a control or a
+-- known sample
+CREATE OR REPLACE FUNCTION labcontrol.update_sample_composition(
+        in_sample_composition_id BIGINT, in_content VARCHAR,
+        OUT out_content VARCHAR, OUT out_content_ok BOOLEAN) AS $$
+DECLARE
+    old_type VARCHAR;
+    old_content VARCHAR;
+    old_sample_id VARCHAR;
+    sc_plate_id BIGINT;
+    sc_well_id BIGINT;
+    new_type_id BIGINT;
+    new_sample_id VARCHAR;
+    old_sample_sc_ids BIGINT[];
+BEGIN
+    SELECT sct.external_id, sc.content, sc.sample_id, w.plate_id, w.well_id
+        INTO old_type, old_content, old_sample_id, sc_plate_id, sc_well_id
+        FROM labcontrol.sample_composition sc
+            JOIN labcontrol.sample_composition_type sct
+                USING (sample_composition_type_id)
+            JOIN labcontrol.composition c USING (composition_id)
+            JOIN labcontrol.well w USING (container_id)
+        WHERE sc.sample_composition_id = in_sample_composition_id;
+    IF NOT FOUND THEN
+        RAISE EXCEPTION 'Sample composition % does not exist', in_sample_composition_id;
+    END IF;
+
+    out_content_ok := TRUE;
+    -- If the previous content is an experimental sample, the content is the
+    -- same if it matches. Otherwise the sample composition type must match
+    IF (old_type = 'experimental sample' AND old_content = in_content)
+            OR old_type = in_content THEN
+        out_content := old_content;
+        RETURN;
+    END IF;
+
+    SELECT sample_composition_type_id INTO new_type_id
+        FROM labcontrol.sample_composition_type
+        WHERE external_id = in_content;
+    IF FOUND THEN
+        -- The content is one of the fixed vocabulary words, so it is a
+        -- control
+        new_sample_id := NULL;
+        out_content := labcontrol.generate_sample_content(in_content, sc_well_id);
+    ELSE
+        SELECT sample_composition_type_id INTO new_type_id
+            FROM labcontrol.sample_composition_type
+            WHERE external_id = 'experimental sample';
+        IF EXISTS (SELECT 1 FROM qiita.study_sample
+                   WHERE sample_id = in_content) THEN
+            new_sample_id := in_content;
+            out_content := in_content;
+            -- A sample plated more than once in the plate is qualified with
+            -- the plate and well in all of its wells
+            UPDATE labcontrol.sample_composition sc
+                SET content = labcontrol.generate_sample_content(
+                    sc.sample_id, w.well_id)
+                FROM labcontrol.composition c
+                    JOIN labcontrol.well w USING (container_id)
+                WHERE c.composition_id = sc.composition_id
+                    AND w.plate_id = sc_plate_id
+                    AND sc.sample_id = in_content;
+            IF FOUND THEN
+                out_content := labcontrol.generate_sample_content(
+                    in_content, sc_well_id);
+            END IF;
+        ELSE
+            -- Unknown samples keep the content, but not the sample id
+            new_sample_id := NULL;
+            out_content := in_content;
+            out_content_ok := FALSE;
+        END IF;
+    END IF;
+
+    UPDATE labcontrol.sample_composition
+        SET sample_composition_type_id = new_type_id,
+            sample_id = new_sample_id,
+            content = out_content
+        WHERE sample_composition_id = in_sample_composition_id;
+
+    IF old_sample_id IS NOT NULL THEN
+        -- If the previous sample is left in a single well of the plate, that
+        -- well doesn't need to be qualified anymore
+        SELECT array_agg(sc.sample_composition_id) INTO old_sample_sc_ids
+            FROM labcontrol.sample_composition sc
+                JOIN labcontrol.composition c USING (composition_id)
+                JOIN labcontrol.well w USING (container_id)
+            WHERE w.plate_id = sc_plate_id AND sc.sample_id = old_sample_id;
+        IF array_length(old_sample_sc_ids, 1) = 1 THEN
+            UPDATE labcontrol.sample_composition
+                SET content = sample_id
+                WHERE sample_composition_id = old_sample_sc_ids[1];
+        END IF;
+    END IF;
+END
+$$ LANGUAGE plpgsql;
@@ -14,6 +14,7 @@ from qiita_client import QiitaClient
 
 import labcontrol
 from labcontrol.db.environment import patch_database
+from labcontrol.db import reference
 
 
 def reset_test_db():
@@ -54,6 +55,8 @@ def reset_test_db():
         TRN.execute()
 
     patch_database(verbose=False)
+    # The reference tables have been recreated
+    reference.invalidate_all()
 
 
 class LabControlTestCase(TestCase):
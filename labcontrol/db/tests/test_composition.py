@@ -44,6 +44,16 @@ class TestsComposition(LabControlTestCase):
                          LibraryPrepShotgunComposition(1))
         self.assertEqual(Composition.factory(3079), PoolComposition(1))
 
+    def test_composition_factory_many(self):
+        self.assertEqual(
+            Composition.factory_many([3082, 3074, 1, 3082, 3079]),
+            [SampleComposition(1), ReagentComposition(2),
+             PrimerSetComposition(1), SampleComposition(1),
+             PoolComposition(1)])
+        self.assertEqual(Composition.factory_many([]), [])
+        with self.assertRaises(LabControlUnknownIdError):
+            Composition.factory_many([3082, 1000000])
+
     def test_reagent_composition_list_reagents(self):
         obs = ReagentComposition.list_reagents()
         exp = ['157022406', '443912', 'KHP1', 'Not applicable',
@@ -179,6 +189,14 @@ class TestsComposition(LabControlTestCase):
                             'Mock community.'}]
         self.assertEqual(obs, exp)
 
+    def test_sample_composition_generate_contents(self):
+        plate = Well(3073).plate
+        obs = SampleComposition.generate_contents(
+            'blank', plate, [1, 8, 2], [1, 1, 12])
+        self.assertEqual(obs.tolist(), ['blank.Test.plate.1.A1',
+                                        'blank.Test.plate.1.H1',
+                                        'blank.Test.plate.1.B12'])
+
     def test_sample_composition_attributes(self):
         # Test a sample
         obs = SampleComposition(1)
@@ -297,6 +315,25 @@ class TestsComposition(LabControlTestCase):
         self.assertIsNone(tester.sample_id)
         self.assertEqual(tester.content, 'blank.Test.plate.1.H1')
 
+    def test_sample_composition_update_round_trips(self):
+        tester = SampleComposition(8)  # H1
+        t2 = SampleComposition(9)  # A2
+        with sql_connection.TRN as TRN:
+            with TRN.profile('sample composition update') as scope:
+                self.assertEqual(tester.update('1.SKM8.640201'),
+                                 ('1.SKM8.640201', True))
+                self.assertEqual(t2.update('1.SKM8.640201'),
+                                 ('1.SKM8.640201.Test.plate.1.A2', True))
+                self.assertEqual(t2.update('blank'),
+                                 ('blank.Test.plate.1.A2', True))
+                self.assertEqual(t2.update('blank'),
+                                 ('blank.Test.plate.1.A2', True))
+        # A single query per update, whatever the wells it modifies
+        self.assertEqual(scope.query_count, 4)
+        # The attributes read after the update are current
+        self.assertEqual(tester.content, '1.SKM8.640201')
+        self.assertEqual(t2.sample_composition_type, 'blank')
+
     def test_gDNA_composition_attributes(self):
         obs = GDNAComposition(1)
         self.assertEqual(obs.sample_composition, SampleComposition(1))
@@ -51,6 +51,48 @@ class TestConfigurationManager(TestCase):
             # when the test is run
             self.assertEqual(obs[1:], exp)
 
+    def test_create_max_connections(self):
+        with NamedTemporaryFile() as tmp_f:
+            ConfigurationManager.create(
+                tmp_f.name, True, '/path/to/server.cert',
+                '/path/to/server.key', '/path/to/cookie_secret.bla', 'db_host',
+                'db_port', 'db_name', 'db_user', 'db_password',
+                'db_admin_user', 'db_admin_password', '/path/to/logdir', '',
+                db_max_connections=25)
+
+            with open(tmp_f.name) as obs_f:
+                obs = obs_f.read()
+
+            self.assertIn('\nMAX_CONNECTIONS=25\n', obs)
+
+    def test_create_statement_cache_size(self):
+        with NamedTemporaryFile() as tmp_f:
+            ConfigurationManager.create(
+                tmp_f.name, True, '/path/to/server.cert',
+                '/path/to/server.key', '/path/to/cookie_secret.bla', 'db_host',
+                'db_port', 'db_name', 'db_user', 'db_password',
+                'db_admin_user', 'db_admin_password', '/path/to/logdir', '',
+                db_statement_cache_size=100)
+
+            with open(tmp_f.name) as obs_f:
+                obs = obs_f.read()
+
+            self.assertIn('\nSTATEMENT_CACHE_SIZE=100\n', obs)
+
+    def test_create_read_host(self):
+        with NamedTemporaryFile() as tmp_f:
+            ConfigurationManager.create(
+                tmp_f.name, True, '/path/to/server.cert',
+                '/path/to/server.key', '/path/to/cookie_secret.bla', 'db_host',
+                'db_port', 'db_name', 'db_user', 'db_password',
+                'db_admin_user', 'db_admin_password', '/path/to/logdir', '',
+                db_read_host='replica_host', db_read_port=5433)
+
+            with open(tmp_f.name) as obs_f:
+                obs = obs_f.read()
+
+            self.assertIn('\nREAD_HOST=replica_host\nREAD_PORT=5433\n', obs)
+
 
 EXP_CONFIG_FILE = """
 # ------------------------- MAIN SETTINGS ----------------------------------
@@ -70,6 +112,10 @@ ADMIN_PASSWORD=db_admin_password
 DATABASE=db_name
 HOST=db_host
 PORT=db_port
+READ_HOST=
+READ_PORT=
+MAX_CONNECTIONS=10
+STATEMENT_CACHE_SIZE=0
 
 # ------------------------- QIITA SETTINGS ----------------------------------
 [qiita]
@@ -94,6 +140,10 @@ ADMIN_PASSWORD=db_admin_password
 DATABASE=db_name
 HOST=db_host
 PORT=db_port
+READ_HOST=
+READ_PORT=
+MAX_CONNECTIONS=10
+STATEMENT_CACHE_SIZE=0
 
 # ------------------------- QIITA SETTINGS ----------------------------------
 [qiita]
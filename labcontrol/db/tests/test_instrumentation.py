@@ -0,0 +1,87 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2017-, LabControl development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+import json
+from unittest import main, TestCase
+
+from labcontrol.db.instrumentation import fingerprint, QueryScope
+
+
+class TestFingerprint(TestCase):
+    def test_fingerprint(self):
+        self.assertEqual(
+            fingerprint("""SELECT plate_id  -- the id
+                           FROM labcontrol.plate
+                           WHERE external_id = 'Test plate 1' AND
+                                 plate_id IN (1, 2, 3.5)"""),
+            "SELECT plate_id FROM labcontrol.plate WHERE external_id = ? "
+            "AND plate_id IN (?)")
+        self.assertEqual(
+            fingerprint("SELECT * FROM t2 WHERE a = %s AND b = %(b)s "
+                        "AND c = $1 /* comment */;"),
+            "SELECT * FROM t2 WHERE a = ? AND b = ? AND c = ?")
+        self.assertEqual(
+            fingerprint("INSERT INTO t (a, b) VALUES (1, 'it''s'), (2, 'x')"),
+            "INSERT INTO t (a, b) VALUES (?)")
+        self.assertEqual(fingerprint("SELECT * FROM t WHERE a = 1"),
+                         fingerprint("SELECT *\n FROM t WHERE a = 42"))
+
+
+class TestQueryScope(TestCase):
+    def test_record(self):
+        scope = QueryScope('test')
+        scope.record("SELECT a FROM t WHERE b = 1", 0.5, 1)
+        scope.record("SELECT a FROM t WHERE b = 2", 0.25, 3)
+        scope.record("UPDATE t SET a = 1", 1.0, -1)
+
+        self.assertEqual(scope.query_count, 3)
+        self.assertEqual(scope.query_time, 1.75)
+        stats = scope.stats["SELECT a FROM t WHERE b = ?"]
+        self.assertEqual((stats.count, stats.total_time, stats.max_time,
+                          stats.rows), (2, 0.75, 0.5, 4))
+        self.assertEqual(scope.stats["UPDATE t SET a = ?"].rows, 0)
+
+    def test_n_plus_one(self):
+        scope = QueryScope('test', n_plus_one_threshold=2)
+        for i in range(3):
+            scope.record("SELECT a FROM t WHERE b = %s", 0.1, 1)
+        for i in range(4):
+            scope.record("SELECT c FROM t WHERE b = %s", 0.1, 1)
+        scope.record("SELECT d FROM t", 0.1, 1)
+        self.assertEqual([s.fingerprint for s in scope.n_plus_one()],
+                         ["SELECT c FROM t WHERE b = ?",
+                          "SELECT a FROM t WHERE b = ?"])
+
+        with self.assertLogs(level='DEBUG') as logs:
+            scope.log()
+        self.assertEqual(len(logs.records), 3)
+        self.assertEqual(logs.records[0].levelname, 'WARNING')
+        self.assertIn('executed 4 times', logs.output[0])
+        self.assertEqual(logs.records[2].levelname, 'DEBUG')
+
+    def test_report(self):
+        scope = QueryScope('GET /plate/1/')
+        scope.record("SELECT a FROM t WHERE b = 1", 0.5, 1)
+        scope.record("SELECT c FROM s", 1.5, 10)
+        scope.close()
+
+        obs = json.loads(scope.to_json())
+        self.assertEqual(obs['scope'], 'GET /plate/1/')
+        self.assertEqual(obs['query_count'], 2)
+        self.assertEqual(obs['query_time'], 2.0)
+        self.assertEqual(obs['n_plus_one'], [])
+        self.assertGreaterEqual(obs['elapsed'], 0)
+        self.assertEqual(obs['queries'], [
+            {'fingerprint': 'SELECT c FROM s', 'count': 1,
+             'total_time': 1.5, 'max_time': 1.5, 'rows': 10},
+            {'fingerprint': 'SELECT a FROM t WHERE b = ?', 'count': 1,
+             'total_time': 0.5, 'max_time': 0.5, 'rows': 1}])
+
+
+if __name__ == '__main__':
+    main()
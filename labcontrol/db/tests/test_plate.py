@@ -10,10 +10,15 @@ from unittest import main
 from types import GeneratorType
 import datetime
 
+import numpy as np
+import numpy.testing as npt
+
+from labcontrol.db import sql_connection
 from labcontrol.db.testing import LabControlTestCase
 from labcontrol.db.plate import PlateConfiguration, Plate
 from labcontrol.db.container import Well
-from labcontrol.db.exceptions import LabControlError
+from labcontrol.db.exceptions import (
+    LabControlError, LabControlUnknownIdError)
 from labcontrol.db.study import Study
 from labcontrol.db.user import User
 from labcontrol.db.process import (QuantificationProcess, SamplePlatingProcess,
@@ -93,6 +98,46 @@ class TestPlate(LabControlTestCase):
             Plate.search(plate_notes='interesting', well_notes='write',
                          query_type='UNION'), [plate22, plate23])
 
+    def test_search_page(self):
+        with self.assertRaises(ValueError):
+            Plate.search_page()
+
+        with self.assertRaises(ValueError):
+            Plate.search_page(plate_name='Test', query_type='WRONG')
+
+        # The plates whose name is mostly made of the search term go first
+        obs = Plate.search_page(plate_name='gdna PLATE')
+        self.assertEqual(obs['total'], 6)
+        self.assertEqual([p['plate_id'] for p in obs['plates']],
+                         [22, 28, 31, 34, 24, 25])
+        self.assertEqual(obs['plates'][0]['external_id'], 'Test gDNA plate 1')
+        self.assertGreater(obs['plates'][3]['rank'],
+                           obs['plates'][4]['rank'])
+
+        obs = Plate.search_page(plate_name='gdna PLATE', offset=2, limit=3)
+        self.assertEqual(obs['total'], 6)
+        self.assertEqual([p['plate_id'] for p in obs['plates']],
+                         [31, 34, 24])
+
+        obs = Plate.search_page(plate_name='gdna PLATE', offset=10)
+        self.assertEqual(obs, {'total': 6, 'plates': []})
+
+        obs = Plate.search_page(plate_name='no such plate')
+        self.assertEqual(obs, {'total': 0, 'plates': []})
+
+        # Only the sample plates hold the sample contents
+        obs = Plate.search_page(sample_content='SKB1.640202',
+                                plate_name='Test plate')
+        self.assertEqual([p['plate_id'] for p in obs['plates']],
+                         [21, 27, 30, 33])
+        obs = Plate.search_page(sample_content='SKB1.640202',
+                                plate_name='Test 16S', query_type='UNION')
+        self.assertEqual(obs['total'], 8)
+
+        # Empty restrictions don't match anything
+        self.assertEqual(Plate.search_page(samples=[], plate_notes=''),
+                         {'total': 0, 'plates': []})
+
     def strip_out_creation_timestamp(self, plates):
         """Kludge to remove creation_timestamp from plate list results"""
         obs_ = []
@@ -201,6 +246,57 @@ class TestPlate(LabControlTestCase):
                    'studies': ['Identification of the Microbiomes '
                                'for Cannabis Soils']}])
 
+    def test_list_plates_page(self):
+        obs = Plate.list_plates_page(['sample'], limit=2)
+        self.assertGreaterEqual(obs['total'], 4)
+        self.assertEqual(obs['filtered'], obs['total'])
+        self.assertEqual(
+            self.strip_out_creation_timestamp(obs['plates']),
+            [{'plate_id': 21, 'external_id': 'Test plate 1'},
+             {'plate_id': 27, 'external_id': 'Test plate 2'}])
+
+        # Next page, with an offset or after the last plate of the page
+        exp = [{'plate_id': 30, 'external_id': 'Test plate 3'},
+               {'plate_id': 33, 'external_id': 'Test plate 4'}]
+        obs = Plate.list_plates_page(['sample'], offset=2, limit=2)
+        self.assertEqual(self.strip_out_creation_timestamp(obs['plates']),
+                         exp)
+        obs = Plate.list_plates_page(['sample'], limit=2, after=(27, 27))
+        self.assertEqual(self.strip_out_creation_timestamp(obs['plates']),
+                         exp)
+
+        # Sorting
+        obs = Plate.list_plates_page(
+            ['gDNA'], sort_column='external_id', sort_descending=True,
+            include_study_titles=True)
+        self.assertEqual(
+            self.strip_out_creation_timestamp(obs['plates']),
+            [{'plate_id': pid, 'external_id': 'Test gDNA plate %s' % i,
+              'studies': ['Identification of the Microbiomes for Cannabis '
+                          'Soils']}
+             for pid, i in [(34, 4), (31, 3), (28, 2), (22, 1)]])
+        obs = Plate.list_plates_page(
+            ['gDNA'], sort_column='external_id', sort_descending=True,
+            after=('Test gDNA plate 3', 31))
+        self.assertEqual([p['plate_id'] for p in obs['plates']], [28, 22])
+
+        # Searching
+        obs = Plate.list_plates_page(['gDNA', 'sample'], search='plate 2')
+        self.assertGreaterEqual(obs['total'], 8)
+        self.assertEqual(obs['filtered'], 2)
+        self.assertEqual([p['plate_id'] for p in obs['plates']], [27, 28])
+        obs = Plate.list_plates_page(['gDNA', 'sample'], search='22')
+        self.assertEqual([p['plate_id'] for p in obs['plates']], [22])
+
+        # The counts are returned even if the page is empty
+        obs = Plate.list_plates_page(['sample'], search='Not a plate')
+        self.assertGreaterEqual(obs['total'], 4)
+        self.assertEqual(obs['filtered'], 0)
+        self.assertEqual(obs['plates'], [])
+
+        with self.assertRaises(ValueError):
+            Plate.list_plates_page(sort_column='notes')
+
     def test_plate_list_include_timestamp(self):
         # ...limit pathological failures by testing within an hour of creation
         exp = datetime.datetime.now()
@@ -277,6 +373,146 @@ class TestPlate(LabControlTestCase):
         Plate(12).discarded = False
         Plate(13).discarded = False
 
+    def test_from_ids(self):
+        self.assertEqual(Plate.from_ids([22, 21, 22]),
+                         [Plate(22), Plate(21), Plate(22)])
+        self.assertEqual(Plate.from_ids([]), [])
+        with self.assertRaises(LabControlUnknownIdError):
+            Plate.from_ids([21, 1000000])
+
+    def test_attribute_cache(self):
+        tester = Plate(21)
+        with sql_connection.TRN as TRN:
+            with TRN.profile('plate attributes') as scope:
+                self.assertEqual(tester.external_id, 'Test plate 1')
+                self.assertIsNone(tester.notes)
+                self.assertFalse(tester.discarded)
+        self.assertEqual(scope.query_count, 1)
+
+        # Setting an attribute invalidates the cached row
+        tester.notes = 'Some notes'
+        self.assertEqual(tester.notes, 'Some notes')
+        # And so does rolling back the change
+        with sql_connection.TRN as TRN:
+            tester.notes = 'Rolled back notes'
+            self.assertEqual(tester.notes, 'Rolled back notes')
+            TRN.rollback()
+        self.assertEqual(tester.notes, 'Some notes')
+        tester.notes = None
+
+        # A missing row reads as None, as it did before the rows were cached
+        missing = Plate._from_trusted_id(1000)
+        self.assertIsNone(missing.external_id)
+
+    def test_snapshot(self):
+        tester = Plate(21)
+        with sql_connection.TRN as TRN:
+            tester.plate_configuration
+            with TRN.profile('snapshot') as scope:
+                obs = tester.snapshot()
+        # One query for the plate and one for the specimen id column of the
+        # study, which is not set
+        self.assertEqual(scope.query_count, 2)
+        self.assertEqual(obs.plate_id, 21)
+        self.assertEqual(obs.shape, (8, 12))
+        self.assertIsNone(obs.raw_concentrations)
+        self.assertEqual(obs.well_ids[0, 0], 3073)
+        self.assertEqual(obs.composition_types[0, 0], 'sample')
+        self.assertEqual(obs.sample_ids[0, 0], '1.SKB1.640202')
+        self.assertEqual(obs.contents[0, 0], '1.SKB1.640202.Test.plate.1.A1')
+        self.assertEqual(obs.sample_composition_types[0, 0],
+                         'experimental sample')
+        self.assertEqual(obs.study_ids[0, 0], 1)
+        self.assertEqual(obs.specimen_ids[0, 0], '1.SKB1.640202')
+        self.assertIsNone(obs.sample_ids[7, 0])
+        self.assertIsNone(obs.study_ids[7, 0])
+        self.assertEqual(obs.sample_composition_types[7, 0], 'blank')
+        self.assertEqual(obs.specimen_ids[7, 0], 'blank.Test.plate.1.H1')
+
+        # The snapshot matches the objects in the layout
+        for plate_id in (22, 26):
+            plate = Plate(plate_id)
+            obs = plate.snapshot()
+            for i, row in enumerate(plate.layout):
+                for j, well in enumerate(row):
+                    if well is None:
+                        self.assertEqual(obs.well_ids[i, j], 0)
+                        self.assertIsNone(obs.sample_ids[i, j])
+                        continue
+                    comp = well.composition
+                    self.assertEqual(obs.well_ids[i, j], well.id)
+                    self.assertEqual(obs.composition_ids[i, j],
+                                     comp.composition_id)
+                    self.assertEqual(obs.notes[i, j], comp.notes)
+                    while not hasattr(comp, 'sample_id'):
+                        comp = getattr(comp, next(
+                            a for a in ('sample_composition',
+                                        'gdna_composition',
+                                        'compressed_gdna_composition',
+                                        'normalized_gdna_composition')
+                            if hasattr(comp, a)))
+                    self.assertEqual(obs.sample_ids[i, j], comp.sample_id)
+                    self.assertEqual(obs.contents[i, j], comp.content)
+                    self.assertEqual(obs.sample_composition_types[i, j],
+                                     comp.sample_composition_type)
+
+        # Snapshot with the concentrations of a quantification process
+        quant = QuantificationProcess(1)
+        obs = Plate(23).snapshot(quant)
+        exp = {comp.composition_id: (raw, computed)
+               for comp, raw, computed in quant.concentrations}
+        # The process quantified the four 16S plates, only the 95 wells of
+        # this plate are in the snapshot
+        self.assertEqual(obs.quantified.sum(), 95)
+        for (i, j), comp_id in np.ndenumerate(obs.composition_ids):
+            if comp_id in exp:
+                self.assertTrue(obs.quantified[i, j])
+                npt.assert_almost_equal(
+                    [obs.raw_concentrations[i, j],
+                     obs.computed_concentrations[i, j]],
+                    exp[comp_id])
+            else:
+                self.assertFalse(obs.quantified[i, j])
+                self.assertEqual(obs.raw_concentrations[i, j], 0)
+
+        # An empty plate
+        pc = PlateConfiguration(1)
+        obs = Plate.create('New snapshot plate', pc).snapshot()
+        self.assertEqual(obs.shape, (8, 12))
+        self.assertFalse(obs.well_ids.any())
+        self.assertTrue((obs.specimen_ids == None).all())  # noqa
+
+    def test_summaries(self):
+        obs = Plate.summaries([21, 26])
+        self.assertEqual(obs[21], {'plate_id': 21, 'content_type': 'sample',
+                                   'num_wells': 96, 'quantified': False,
+                                   'process_id': 11, 'study_ids': [1]})
+        self.assertEqual(obs[26], {'plate_id': 26,
+                                   'content_type': 'shotgun library prep',
+                                   'num_wells': 380, 'quantified': True,
+                                   'process_id': 22, 'study_ids': [1]})
+        self.assertEqual(Plate(11).summary['study_ids'], [])
+        with self.assertRaises(LabControlUnknownIdError):
+            Plate.summaries([21, 1000000])
+
+        # The summary is kept current
+        obs = Plate.create('New summary plate', PlateConfiguration(1))
+        self.assertEqual(obs.summary, {'plate_id': obs.id,
+                                       'content_type': None, 'num_wells': 0,
+                                       'quantified': False,
+                                       'process_id': None, 'study_ids': []})
+        spp = SamplePlatingProcess.create(
+            User('test@foo.bar'), PlateConfiguration(1), 'New summary plate 2')
+        obs = spp.plate.summary
+        self.assertEqual(obs['content_type'], 'sample')
+        self.assertEqual(obs['num_wells'], 96)
+        self.assertEqual(obs['process_id'], spp.id)
+        self.assertEqual(obs['study_ids'], [])
+        spp.update_well(1, 1, '1.SKM1.640183')
+        self.assertEqual(spp.plate.summary['study_ids'], [1])
+        spp.update_well(1, 1, 'blank')
+        self.assertEqual(spp.plate.summary['study_ids'], [])
+
     def test_external_id_exists(self):
         self.assertTrue(Plate.external_id_exists('Test plate 1'))
         self.assertFalse(Plate.external_id_exists('This is a new name'))
@@ -316,7 +552,16 @@ class TestPlate(LabControlTestCase):
         self.assertEqual(len(obs_layout), 8)
         for row in obs_layout:
             self.assertEqual(len(row), 12)
-        self.assertEqual(tester.studies, {Study(1)})
+        exp = {Study(1)}
+        with sql_connection.TRN as TRN:
+            with TRN.profile('studies') as scope:
+                self.assertEqual(tester.studies, exp)
+        self.assertEqual(scope.query_count, 1)
+        # The studies of the plates derived from the sample plates
+        self.assertEqual(Plate(23).studies, {Study(1)})
+        self.assertEqual(Plate(26).studies, {Study(1)})
+        # Plates without samples don't have studies
+        self.assertEqual(Plate(11).studies, set())
         self.assertListEqual(tester.quantification_processes, [])
         self.assertEqual(tester.process, SamplePlatingProcess(11))
 
@@ -457,6 +702,16 @@ class TestPlate(LabControlTestCase):
         self.assertEqual(tester.get_wells_by_sample('1.SKB1.640202'), exp)
         self.assertEqual(tester.get_wells_by_sample('1.SKM1.640183'), [])
 
+    def test_get_other_plates_by_sample(self):
+        tester = Plate(21)
+        obs = tester.get_other_plates_by_sample(['1.SKB1.640202', 'Unknown'])
+        self.assertEqual(list(obs), ['1.SKB1.640202'])
+        self.assertEqual(
+            obs['1.SKB1.640202'],
+            [{'plate_id': p.id, 'external_id': p.external_id}
+             for p in [Plate(27), Plate(30), Plate(33)]])
+        self.assertEqual(tester.get_other_plates_by_sample([]), {})
+
     def test_get_previously_plated_wells(self):
         tester = Plate(21)
         three_plates_list = [Plate(27), Plate(30), Plate(33)]
@@ -496,7 +751,10 @@ class TestPlate(LabControlTestCase):
                Well(3601): three_plates_list, Well(3607): three_plates_list,
                Well(3613): three_plates_list, Well(3619): three_plates_list,
                Well(3625): three_plates_list}
-        obs = tester.get_previously_plated_wells()
+        with sql_connection.TRN as TRN:
+            with TRN.profile('previously plated') as scope:
+                obs = tester.get_previously_plated_wells()
+        self.assertEqual(scope.query_count, 1)
         self.assertEqual(obs, exp)
 
         # Create another plate and put a sample on it that isn't anywhere else
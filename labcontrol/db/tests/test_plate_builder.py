@@ -0,0 +1,97 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2017-, LabControl development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import main
+
+import numpy as np
+import numpy.testing as npt
+
+from labcontrol.db import sql_connection
+from labcontrol.db.testing import LabControlTestCase
+from labcontrol.db.container import Well
+from labcontrol.db.composition import (
+    SampleComposition, GDNAComposition, PrimerComposition)
+from labcontrol.db.plate import Plate, PlateConfiguration
+from labcontrol.db.process import SamplePlatingProcess
+from labcontrol.db.plate_builder import create_wells, subtype_ids
+
+
+class TestPlateBuilder(LabControlTestCase):
+    def test_create_wells(self):
+        process = SamplePlatingProcess(11)
+        plate = Plate.create('unittest plate builder', PlateConfiguration(1))
+        with sql_connection.TRN as TRN:
+            scope = TRN.start_profile('create_wells')
+            well_ids, comp_ids = create_wells(
+                process, plate, GDNAComposition, [1, 2, 8], [1, 1, 12],
+                [10, 20, 30],
+                {'sample_composition_id': [1, 8, 1]})
+            TRN.stop_profile(scope)
+        # One COPY per table
+        self.assertEqual(scope.query_count, 4)
+        self.assertEqual(len(well_ids), 3)
+        self.assertEqual(len(comp_ids), 3)
+
+        wells = [Well(w) for w in well_ids]
+        self.assertEqual([(w.row, w.column) for w in wells],
+                         [(1, 1), (2, 1), (8, 12)])
+        self.assertEqual([w.plate for w in wells], [plate] * 3)
+        self.assertEqual([w.remaining_volume for w in wells], [10, 20, 30])
+        self.assertEqual([w.latest_process for w in wells], [process] * 3)
+
+        comps = [GDNAComposition(c) for c in comp_ids]
+        self.assertEqual([w.composition for w in wells], comps)
+        self.assertEqual([c.total_volume for c in comps], [10, 20, 30])
+        self.assertEqual([c.upstream_process for c in comps], [process] * 3)
+        self.assertEqual([c.sample_composition for c in comps],
+                         [SampleComposition(1), SampleComposition(8),
+                          SampleComposition(1)])
+
+    def test_create_wells_scalars(self):
+        process = SamplePlatingProcess(11)
+        plate = Plate.create('unittest plate builder', PlateConfiguration(1))
+        rows, cols = np.indices((2, 3)) + 1
+        well_ids, comp_ids = create_wells(
+            process, plate, GDNAComposition, rows, cols, 5,
+            {'sample_composition_id': 1})
+        self.assertEqual(len(well_ids), 6)
+        comps = [GDNAComposition(c) for c in comp_ids]
+        self.assertEqual([c.total_volume for c in comps], [5] * 6)
+        self.assertEqual([c.sample_composition for c in comps],
+                         [SampleComposition(1)] * 6)
+
+    def test_create_wells_empty(self):
+        process = SamplePlatingProcess(11)
+        plate = Plate.create('unittest plate builder', PlateConfiguration(1))
+        well_ids, comp_ids = create_wells(
+            process, plate, GDNAComposition, [], [], 5,
+            {'sample_composition_id': []})
+        self.assertEqual(well_ids.size, 0)
+        self.assertEqual(comp_ids.size, 0)
+
+    def test_create_wells_error(self):
+        process = SamplePlatingProcess(11)
+        plate = Plate(21)
+        with self.assertRaisesRegex(ValueError, 'Found 2 rows but 1 columns'):
+            create_wells(process, plate, GDNAComposition, [1, 2], [1], 5,
+                         {'sample_composition_id': 1})
+        with self.assertRaisesRegex(ValueError, 'Found 1 values for 2 wells'):
+            create_wells(process, plate, GDNAComposition, [1, 2], [1, 1],
+                         [5], {'sample_composition_id': 1})
+
+    def test_subtype_ids(self):
+        # 3082 is the composition of SampleComposition(1)
+        obs = subtype_ids(SampleComposition, [[3082, 3082], [999999, 3082]])
+        npt.assert_array_equal(obs, [[1, 1], [0, 1]])
+        obs = subtype_ids(PrimerComposition, [3082])
+        npt.assert_array_equal(obs, [0])
+        self.assertEqual(subtype_ids(SampleComposition, []).size, 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2017-, LabControl development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import main, TestCase
+
+import numpy as np
+import numpy.testing as npt
+
+from labcontrol.db import plate_reader
+from labcontrol.db.well_coordinates import plate_well_names
+
+
+MINIPICO = ('Results\t\t\t\t\t\r\n'
+            '\t\t\t\t\t\r\n'
+            'Well ID\tWell\t[Blanked-RFU]\t[Concentration]\t\t\r\n'
+            'SPL1\tA1\t5243.000\t3.432\t\t\r\n'
+            'SPL2\tA2\t4949.000\t<0.000\t\t\r\n'
+            'SPL3\tB1\t15302.000\t>10.016\t\t\r\n'
+            'SPL4\tB2\t\t?????\t\t\r\n'
+            '\t\t\t\t\t\r\n'
+            'Curve2 Fitting Results\t\t\t\t\t\r\n'
+            '\t\t\t\t\t\r\n'
+            'Curve Name\tCurve Formula\tA\tB\tR2\tFit F Prob\r\n'
+            'Curve2\tY=A*X+B\t1.53E+003\t0\t0.995\t?????')
+
+
+class TestPlateReader(TestCase):
+    def _expected(self, rows=8, cols=12):
+        exp = np.full((rows, cols), np.nan)
+        exp[0, :2] = [3.432, 0.0]
+        exp[1, :2] = [10.016, 10.016]
+        return exp
+
+    def test_read_minipico(self):
+        fmt, wells, concs = plate_reader.read(MINIPICO.encode(), 'minipico')
+        self.assertEqual(fmt, 'minipico')
+        npt.assert_array_equal(wells, ['A1', 'A2', 'B1', 'B2'])
+        npt.assert_allclose(concs, [3.432, 0.0, 10.016, 10.016])
+
+        # Files with \r line endings and str contents are read too
+        fmt, wells, concs = plate_reader.read(
+            MINIPICO.replace('\r\n', '\r'), 'minipico')
+        npt.assert_array_equal(wells, ['A1', 'A2', 'B1', 'B2'])
+        npt.assert_allclose(concs, [3.432, 0.0, 10.016, 10.016])
+
+    def test_read_errors(self):
+        with self.assertRaisesRegex(ValueError, 'File format xls not'):
+            plate_reader.read(MINIPICO, 'xls')
+        with self.assertRaisesRegex(ValueError, 'not a minipico file'):
+            plate_reader.read('Well,Concentration\nA1,1.0\n', 'minipico')
+        with self.assertRaisesRegex(ValueError, 'format of the file is not'):
+            plate_reader.read('Some\ntext\n')
+        with self.assertRaisesRegex(ValueError, 'B2: "fail"'):
+            plate_reader.read(MINIPICO.replace('?????\t\t', 'fail\t\t', 1))
+
+    def test_read_empty_table(self):
+        with self.assertRaisesRegex(ValueError,
+                                    'well_table file does not have any'):
+            plate_reader.read('Well,Concentration\n\nA1,1.0\n')
+        with self.assertRaisesRegex(ValueError,
+                                    'minipico file does not have any'):
+            plate_reader.read(MINIPICO.split('SPL1')[0])
+
+    def test_read_duplicate_wells(self):
+        with self.assertRaisesRegex(ValueError,
+                                    'Wells A1 are in the file more than'):
+            plate_reader.read('Well,Concentration\nA1,1.0\nB1,2\na01,3\n')
+
+    def test_parse(self):
+        obs = plate_reader.parse(MINIPICO)
+        self.assertEqual(obs.file_format, 'minipico')
+        npt.assert_allclose(obs.concentrations, self._expected())
+        self.assertGreaterEqual(obs.elapsed, 0)
+
+        obs = plate_reader.parse(MINIPICO, 'minipico', rows=16, cols=24)
+        npt.assert_allclose(obs.concentrations, self._expected(16, 24))
+
+        with self.assertRaisesRegex(ValueError, 'B1, B2 are outside'):
+            plate_reader.parse(MINIPICO, rows=1, cols=12)
+
+    def test_parse_well_table(self):
+        contents = (b'Plate,Plate 1\n'
+                    b'\n'
+                    b'Well,Sample,Concentration (ng/uL)\n'
+                    b'A1,S1,3.432\n'
+                    b'A02,S2,0\n'
+                    b'B1,S3,10.016\n'
+                    b'B2,S4,10.016\n')
+        obs = plate_reader.parse(contents)
+        self.assertEqual(obs.file_format, 'well_table')
+        npt.assert_allclose(obs.concentrations, self._expected())
+
+    def test_parse_plate_grid(self):
+        contents = (b'Plate 1\tpicogreen\n'
+                    b'\t1\t2\t3\n'
+                    b'A\t3.432\t0.000\t\n'
+                    b'B\t10.016\t10.016\t\n'
+                    b'\n'
+                    b'Read at 485/530 nm\n')
+        obs = plate_reader.parse(contents, rows=2, cols=3)
+        self.assertEqual(obs.file_format, 'plate_grid')
+        npt.assert_allclose(obs.concentrations, self._expected(2, 3))
+
+    def test_parse_1536(self):
+        wells = plate_well_names(32, 48).ravel()
+        values = np.arange(wells.size) / 10
+        contents = 'Well,Concentration\n' + '\n'.join(
+            '%s,%s' % (w, v) for w, v in zip(wells, values))
+        obs = plate_reader.parse(contents, rows=32, cols=48)
+        npt.assert_allclose(obs.concentrations, values.reshape(32, 48))
+
+
+if __name__ == '__main__':
+    main()
@@ -18,7 +18,8 @@ from datetime import datetime
 
 from labcontrol.db import sql_connection
 from labcontrol.db.testing import LabControlTestCase
-from labcontrol.db.container import Tube, Well
+from labcontrol.db.exceptions import LabControlError
+from labcontrol.db.container import Tube, Well, ImplicitBlankWell
 from labcontrol.db.composition import (
     ReagentComposition, SampleComposition, GDNAComposition,
     LibraryPrep16SComposition, Composition, PoolComposition,
@@ -97,6 +98,12 @@ class TestProcess(LabControlTestCase):
         self.assertEqual(Process.factory(16), PoolingProcess(1))
         self.assertEqual(Process.factory(18), SequencingProcess(1))
 
+    def test_factory_many(self):
+        self.assertEqual(
+            Process.factory_many([18, 11, 4, 15]),
+            [SequencingProcess(1), SamplePlatingProcess(11),
+             PrimerWorkingPlateCreationProcess(1), QuantificationProcess(2)])
+
 
 class TestSamplePlatingProcess(LabControlTestCase):
     def test_attributes(self):
@@ -146,6 +153,76 @@ class TestSamplePlatingProcess(LabControlTestCase):
                 self.assertEqual(obs_composition.container, well)
                 self.assertEqual(obs_composition.total_volume, 10)
 
+    def test_create_implicit_blanks(self):
+        user = User('test@foo.bar')
+        plate_config = PlateConfiguration(1)
+        obs = SamplePlatingProcess.create(
+            user, plate_config, 'unittest Plate 1', 10, implicit_blanks=True)
+
+        # No well is stored, but the plate reads as blanks
+        obs_plate = obs.plate
+        self.assertEqual(obs_plate.external_id, 'unittest Plate 1')
+        self.assertTrue(obs_plate.implicit_blanks)
+        snapshot = obs_plate.snapshot()
+        npt.assert_array_equal(snapshot.well_ids, 0)
+        self.assertTrue(
+            (snapshot.sample_composition_types == 'blank').all())
+        self.assertEqual(snapshot.contents[0, 0], 'blank.unittest.Plate.1.A1')
+        self.assertEqual(snapshot.specimen_ids[7, 11],
+                         'blank.unittest.Plate.1.H12')
+        self.assertEqual(obs_plate.process, obs)
+
+        # The layout holds the blanks in memory, without storing them
+        plate_layout = obs_plate.layout
+        self.assertTrue(obs_plate.implicit_blanks)
+        self.assertIsInstance(plate_layout[7][11], ImplicitBlankWell)
+        self.assertEqual(plate_layout[7][11].well_id, 'H12')
+        self.assertEqual(plate_layout[7][11].latest_process, obs)
+        obs_composition = plate_layout[7][11].composition
+        self.assertEqual(obs_composition.sample_composition_type, 'blank')
+        self.assertEqual(obs_composition.content,
+                         'blank.unittest.Plate.1.H12')
+        self.assertEqual(obs_composition.total_volume, 10)
+        self.assertEqual(obs_plate.snapshot().well_ids.max(), 0)
+
+        # Editing a well stores it
+        self.assertEqual(obs.update_well(1, 1, '1.SKB1.640202'),
+                         ('1.SKB1.640202', True))
+        obs.comment_well(2, 1, 'A comment')
+        with self.assertRaises(LabControlError):
+            obs.update_well(9, 1, '1.SKB1.640202')
+        snapshot = obs_plate.snapshot()
+        self.assertEqual(np.count_nonzero(snapshot.well_ids), 2)
+        self.assertEqual(snapshot.sample_ids[0, 0], '1.SKB1.640202')
+        self.assertEqual(snapshot.notes[1, 0], 'A comment')
+        self.assertEqual(snapshot.sample_composition_types[1, 0], 'blank')
+        self.assertEqual(snapshot.sample_composition_types[0, 1], 'blank')
+        well = obs_plate.get_well(2, 1)
+        self.assertEqual(well.latest_process, obs)
+        self.assertEqual(well.remaining_volume, 10)
+
+        # The rest of the wells are stored in bulk
+        obs_plate.materialize_blanks()
+        self.assertFalse(obs_plate.implicit_blanks)
+        plate_layout = obs_plate.layout
+        for i, row in enumerate(plate_layout):
+            for j, well in enumerate(row):
+                self.assertIsInstance(well, Well)
+                self.assertEqual((well.row, well.column), (i + 1, j + 1))
+                self.assertEqual(well.latest_process, obs)
+                self.assertEqual(well.remaining_volume, 10)
+        self.assertEqual(plate_layout[0][0].composition.sample_id,
+                         '1.SKB1.640202')
+        obs_composition = plate_layout[7][11].composition
+        self.assertEqual(obs_composition.sample_composition_type, 'blank')
+        self.assertEqual(obs_composition.content,
+                         'blank.unittest.Plate.1.H12')
+        self.assertEqual(obs_composition.total_volume, 10)
+        # Nothing left to store
+        obs_plate.materialize_blanks()
+        self.assertEqual(
+            sum(w is not None for row in obs_plate.layout for w in row), 96)
+
     def test_update_well(self):
         tester = SamplePlatingProcess(11)
         obs = SampleComposition(8)
@@ -185,6 +262,78 @@ class TestSamplePlatingProcess(LabControlTestCase):
         self.assertIsNone(obs.sample_id)
         self.assertEqual(obs.content, 'blank.Test.plate.1.H1')
 
+    def test_update_wells(self):
+        tester = SamplePlatingProcess(11)
+        h1 = SampleComposition(8)
+        a2 = SampleComposition(9)
+
+        self.assertEqual(tester.update_wells([]), [])
+
+        # Plating a sample twice qualifies both wells
+        obs = tester.update_wells([(8, 1, '1.SKM8.640201'),
+                                   (1, 2, '1.SKM8.640201')])
+        self.assertEqual(obs, [('1.SKM8.640201.Test.plate.1.H1', True),
+                               ('1.SKM8.640201.Test.plate.1.A2', True)])
+        self.assertEqual(h1.sample_composition_type, 'experimental sample')
+        self.assertEqual(h1.sample_id, '1.SKM8.640201')
+        self.assertEqual(h1.content, '1.SKM8.640201.Test.plate.1.H1')
+        self.assertEqual(a2.sample_id, '1.SKM8.640201')
+        self.assertEqual(a2.content, '1.SKM8.640201.Test.plate.1.A2')
+
+        # Removing one of them reverts the other one, and the last update
+        # of a well wins
+        obs = tester.update_wells([(1, 2, 'Unknown'),
+                                   (1, 2, 'vibrio.positive.control')])
+        self.assertEqual(
+            obs, [('vibrio.positive.control.Test.plate.1.A2', True),
+                  ('vibrio.positive.control.Test.plate.1.A2', True)])
+        self.assertEqual(a2.sample_composition_type,
+                         'vibrio.positive.control')
+        self.assertIsNone(a2.sample_id)
+        self.assertEqual(h1.content, '1.SKM8.640201')
+
+        # Same outcome as update_well
+        obs = tester.update_wells([('8', '1', '1.SKB6.640176'),
+                                   (1, 2, 'Unknown')])
+        self.assertEqual(obs, [('1.SKB6.640176.Test.plate.1.H1', True),
+                               ('Unknown', False)])
+        self.assertEqual(h1.sample_id, '1.SKB6.640176')
+        self.assertEqual(a2.sample_composition_type, 'experimental sample')
+        self.assertIsNone(a2.sample_id)
+        self.assertEqual(a2.content, 'Unknown')
+
+        # Unchanged contents report the stored contents
+        obs = tester.update_wells([(8, 1, 'blank'), (8, 1, 'blank'),
+                                   (1, 2, 'Unknown')])
+        self.assertEqual(obs, [('blank.Test.plate.1.H1', True),
+                               ('blank.Test.plate.1.H1', True),
+                               ('Unknown', True)])
+        self.assertEqual(h1.content, 'blank.Test.plate.1.H1')
+
+        regex = r"Well \(9, 1\) doesn't exist in plate 21"
+        with self.assertRaisesRegex(LabControlError, regex):
+            tester.update_wells([(8, 1, 'blank'), (9, 1, 'blank')])
+
+    def test_update_wells_implicit_blanks(self):
+        user = User('test@foo.bar')
+        tester = SamplePlatingProcess.create(
+            user, PlateConfiguration(1), 'New implicit plate', 10,
+            implicit_blanks=True)
+        plate = tester.plate
+
+        obs = tester.update_wells([(1, 1, '1.SKM8.640201'), (2, 1, 'blank')])
+        self.assertEqual(obs, [('1.SKM8.640201', True),
+                               ('blank.New.implicit.plate.B1', True)])
+        comp = plate.get_well(1, 1).composition
+        self.assertEqual(comp.sample_id, '1.SKM8.640201')
+        self.assertEqual(comp.total_volume, 10)
+        self.assertEqual(plate.get_well(2, 1).composition.content,
+                         'blank.New.implicit.plate.B1')
+        self.assertTrue(plate.implicit_blanks)
+
+        with self.assertRaisesRegex(LabControlError, "doesn't exist"):
+            tester.update_wells([(9, 1, 'blank')])
+
     def test_comment_well(self):
         tester = SamplePlatingProcess(11)
         obs = SampleComposition(8)
@@ -427,6 +576,52 @@ class TestGDNAPlateCompressionProcess(LabControlTestCase):
             .get_interleaved_quarters_position_generator(4, 16, 24)
         self.assertListEqual(list(x), INTERLEAVED_POSITIONS)
 
+    def test_get_interleaved_quarters_maps(self):
+        exp_err = "Expected number of quarters to be an integer between 1 " \
+                  "and 4 but received 5"
+        with self.assertRaisesRegex(ValueError, exp_err):
+            GDNAPlateCompressionProcess.get_interleaved_quarters_maps(5, 2, 2)
+
+        exp_err = "Expected number of rows and columns to be positive " \
+                  "integers evenly divisible by two but received 3 rows and " \
+                  "2 columns"
+        with self.assertRaisesRegex(ValueError, exp_err):
+            GDNAPlateCompressionProcess.get_interleaved_quarters_maps(4, 3, 2)
+
+        for num_quarters in range(1, 5):
+            obs = GDNAPlateCompressionProcess.get_interleaved_quarters_maps(
+                num_quarters, 16, 24)
+            exp = INTERLEAVED_POSITIONS[:96 * num_quarters]
+            for i, field in enumerate(obs._fields[:5]):
+                npt.assert_array_equal(getattr(obs, field),
+                                       [p[i] for p in exp])
+            self.assertFalse(obs.output_row_index.flags.writeable)
+
+        # The decompression maps give back the input positions
+        obs = GDNAPlateCompressionProcess.get_interleaved_quarters_maps(
+            2, 16, 24)
+        self.assertEqual(obs.input_plate_order_map.shape, (16, 24))
+        self.assertEqual(obs.input_plate_order_map[0, 1], 1)
+        self.assertEqual(obs.input_row_map[2, 1], 1)
+        self.assertEqual(obs.input_col_map[2, 1], 0)
+        # Positions of the quarters that are not used map to -1
+        self.assertEqual(obs.input_plate_order_map[1, 0], -1)
+        self.assertEqual(obs.input_row_map[1, 1], -1)
+        self.assertEqual(obs.input_col_map[1, 1], -1)
+
+        # 4 384-well plates onto a 1536-well plate
+        obs = GDNAPlateCompressionProcess.get_interleaved_quarters_maps(
+            4, 32, 48)
+        self.assertEqual(len(obs.output_row_index), 1536)
+        self.assertEqual(obs.input_plate_order_map.min(), 0)
+        self.assertEqual(
+            (obs.output_row_index[-1], obs.output_col_index[-1],
+             obs.input_plate_order_index[-1], obs.input_row_index[-1],
+             obs.input_col_index[-1]), (31, 47, 3, 15, 23))
+        npt.assert_array_equal(
+            obs.input_row_map[obs.output_row_index, obs.output_col_index],
+            obs.input_row_index)
+
     def test_attributes(self):
         tester = GDNAPlateCompressionProcess(1)
         self.assertEqual(tester.date,
@@ -628,6 +823,19 @@ class TestNormalizationProcess(LabControlTestCase):
         obs_vols = NormalizationProcess._calculate_norm_vol(dna_concs)
         np.testing.assert_allclose(exp_vols, obs_vols)
 
+    def test_get_reformat_maps(self):
+        row_map, col_map = NormalizationProcess._get_reformat_maps()
+        self.assertEqual(row_map.shape, (16, 24))
+        self.assertFalse(row_map.flags.writeable)
+        for row in range(16):
+            for column in range(24):
+                roffset = row % 2
+                exp_row = int(row - roffset + np.floor(column / 12)) + 1
+                coffset = column % 2 + (exp_row % 2) * 2
+                exp_col = int(coffset * 6 + (column / 2) % 6) + 1
+                self.assertEqual(row_map[row, column] + 1, exp_row)
+                self.assertEqual(col_map[row, column] + 1, exp_col)
+
     def test_attributes(self):
         tester = NormalizationProcess(1)
         self.assertEqual(tester.date,
@@ -756,71 +964,6 @@ class TestQuantificationProcess(LabControlTestCase):
                         [46.5530303, 28.9393939, 27.7272727, 52.0454545]])
         npt.assert_allclose(obs, exp)
 
-    def test_make_2D_array(self):
-        example_qpcr_df = pd.DataFrame(
-            {'Sample DNA Concentration': [12, 0, 5, np.nan],
-             'Well': ['A1', 'A2', 'A3', 'A4']})
-        exp_cp_array = np.array([[12.0, 0.0, 5.0, np.nan]])
-        obs = QuantificationProcess._make_2D_array(
-            example_qpcr_df, rows=1, cols=4).astype(float)
-        np.testing.assert_allclose(obs, exp_cp_array)
-
-        example2_qpcr_df = pd.DataFrame({'Cp': [12, 0, 1, np.nan,
-                                                12, 0, 5, np.nan],
-                                        'Pos': ['A1', 'A2', 'A3', 'A4',
-                                                'B1', 'B2', 'B3', 'B4']})
-        exp2_cp_array = np.array([[12.0, 0.0, 1.0, np.nan],
-                                  [12.0, 0.0, 5.0, np.nan]])
-        obs = QuantificationProcess._make_2D_array(
-            example2_qpcr_df, data_col='Cp', well_col='Pos', rows=2,
-            cols=4).astype(float)
-        np.testing.assert_allclose(obs, exp2_cp_array)
-
-    def test_rationalize_pico_csv_string(self):
-        pico_csv1 = ('Results					\r'
-                     '					\r'
-                     'Well ID\tWell\t[Blanked-RFU]\t[Concentration]		\r'
-                     'SPL1\tA1\t<0.000\t3.432		\r'
-                     'SPL2\tA2\t4949.000\t3.239		\r'
-                     'SPL3\tB1\t>15302.000\t10.016		\r'
-                     'SPL4\tB2\t4039.000\t2.644		\r'
-                     '					\r'
-                     'Curve2 Fitting Results					\r'
-                     '					\r'
-                     'Curve Name\tCurve Formula\tA\tB\tR2\tFit F Prob\r'
-                     'Curve2\tY=A*X+B\t1.53E+003\t0\t0.995\t?????')
-
-        expected_output = (
-            'Results					\n'
-            '					\n'
-            'Well ID\tWell\t[Blanked-RFU]\t[Concentration]		\n'
-            'SPL1\tA1\t0.000\t3.432		\n'
-            'SPL2\tA2\t4949.000\t3.239		\n'
-            'SPL3\tB1\t15302.000\t10.016		\n'
-            'SPL4\tB2\t4039.000\t2.644		\n'
-            '					\n'
-            'Curve2 Fitting Results					\n'
-            '					\n'
-            'Curve Name\tCurve Formula\tA\tB\tR2\tFit F Prob\n'
-            'Curve2\tY=A*X+B\t1.53E+003\t0\t0.995\t?????')
-        output1 = QuantificationProcess._rationalize_pico_csv_string(pico_csv1)
-        self.assertEqual(output1, expected_output)
-
-        pico_csv2 = ('Results					\r\n'
-                     '					\r\n'
-                     'Well ID\tWell\t[Blanked-RFU]\t[Concentration]		\r\n'
-                     'SPL1\tA1\t<0.000\t3.432		\r\n'
-                     'SPL2\tA2\t4949.000\t3.239		\r\n'
-                     'SPL3\tB1\t>15302.000\t10.016		\r\n'
-                     'SPL4\tB2\t4039.000\t2.644		\r\n'
-                     '					\r\n'
-                     'Curve2 Fitting Results					\r\n'
-                     '					\r\n'
-                     'Curve Name\tCurve Formula\tA\tB\tR2\tFit F Prob\r\n'
-                     'Curve2\tY=A*X+B\t1.53E+003\t0\t0.995\t?????')
-        output2 = QuantificationProcess._rationalize_pico_csv_string(pico_csv2)
-        self.assertEqual(output2, expected_output)
-
     def test_parse_pico_csv(self):
         # Test a normal sheet
         pico_csv1 = '''Results
@@ -1443,14 +1586,20 @@ class TestPoolingProcess(LabControlTestCase):
             PoolingProcess._format_picklist(vol_sample, max_vol_per_well=7,
                                             dest_plate_shape=[3, 2])
 
-    def test_format_picklist_error_too_many_rows(self):
-        # input volumes from a hypothetical 32x48 plate
+    def test_format_picklist_1536_well_plate(self):
+        # input volumes from a hypothetical 32x48 plate, whose rows go
+        # past 'Z'
         vol_sample = np.ones((32, 48))
 
-        exp_err = "Row letter generation for >26 wells is not supported"
-        with self.assertRaisesRegex(ValueError, exp_err):
-            PoolingProcess._format_picklist(vol_sample, max_vol_per_well=7,
-                                            dest_plate_shape=[32, 48])
+        obs = PoolingProcess._format_picklist(vol_sample, max_vol_per_well=7,
+                                              dest_plate_shape=[32, 48])
+        obs = obs.split('\n')
+        self.assertEqual(len(obs), 32 * 48 + 1)
+        self.assertEqual(obs[1], '1,384LDV_AQ_B2_HT,A1,,1.00,NormalizedDNA,A1')
+        self.assertEqual(obs[26 * 48 + 1],
+                         '1,384LDV_AQ_B2_HT,AA1,,1.00,NormalizedDNA,D35')
+        self.assertEqual(obs[-1],
+                         '1,384LDV_AQ_B2_HT,AF48,,1.00,NormalizedDNA,E28')
 
     def test_generate_echo_picklist_default(self):
         # With the default max_vol_per_well value of 30000 nL
@@ -0,0 +1,128 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2017-, LabControl development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import main
+
+from labcontrol.db import sql_connection
+from labcontrol.db.testing import LabControlTestCase
+from labcontrol.db.reference import (
+    ReferenceTable, PROCESS_TYPES, SAMPLE_COMPOSITION_TYPES,
+    PLATE_CONFIGURATIONS, invalidate_all)
+from labcontrol.db.composition import SampleComposition
+from labcontrol.db.process import SamplePlatingProcess
+
+
+class TestReferenceTable(LabControlTestCase):
+    def setUp(self):
+        invalidate_all()
+
+    def test_get_id(self):
+        with sql_connection.TRN as TRN:
+            sql = """SELECT process_type_id
+                     FROM labcontrol.process_type
+                     WHERE description = 'sample plating'"""
+            TRN.add(sql)
+            exp = TRN.execute_fetchlast()
+
+        self.assertEqual(PROCESS_TYPES.get_id('sample plating'), exp)
+        self.assertIsNone(PROCESS_TYPES.get_id('not a process type'))
+
+        # Once loaded, the lookups don't query the database
+        with sql_connection.TRN as TRN:
+            with TRN.profile('lookups') as scope:
+                for _ in range(10):
+                    PROCESS_TYPES.get_id('sample plating')
+        self.assertEqual(scope.query_count, 0)
+
+    def test_get_row(self):
+        obs = PLATE_CONFIGURATIONS.get_row(1)
+        self.assertEqual(obs['num_rows'], 8)
+        self.assertEqual(obs['num_columns'], 12)
+        self.assertIsNone(PLATE_CONFIGURATIONS.get_row(1000000))
+
+    def test_max_age(self):
+        table = ReferenceTable('labcontrol.process_type', 'process_type_id',
+                               'description', max_age=0)
+        table.get_id('sample plating')
+        with sql_connection.TRN as TRN:
+            with TRN.profile('lookups') as scope:
+                table.get_id('sample plating')
+        self.assertEqual(scope.query_count, 1)
+
+    def test_get_id_reload(self):
+        self.assertIsNotNone(SAMPLE_COMPOSITION_TYPES.get_id('blank'))
+        # Rows added by another process don't invalidate the cache
+        with sql_connection.TRN as TRN:
+            sql = """INSERT INTO labcontrol.sample_composition_type
+                        (external_id, description)
+                     VALUES ('test.control', 'A test control')
+                     RETURNING sample_composition_type_id"""
+            TRN.add(sql)
+            exp = TRN.execute_fetchlast()
+        self.assertEqual(SAMPLE_COMPOSITION_TYPES.get_id('test.control'), exp)
+
+    def test_get_id_missing(self):
+        # A missing key reloads the rows once, and the miss is remembered
+        self.assertIsNone(PROCESS_TYPES.get_id('not a process type'))
+        self.assertIsNone(PLATE_CONFIGURATIONS.get_row(1000000))
+        with sql_connection.TRN as TRN:
+            with TRN.profile('lookups') as scope:
+                for _ in range(10):
+                    PROCESS_TYPES.get_id('not a process type')
+                    PLATE_CONFIGURATIONS.get_row(1000000)
+        self.assertEqual(scope.query_count, 0)
+
+        # Until the rows are reloaded
+        PROCESS_TYPES.invalidate()
+        with sql_connection.TRN as TRN:
+            with TRN.profile('lookups') as scope:
+                PROCESS_TYPES.get_id('not a process type')
+        self.assertEqual(scope.query_count, 2)
+
+    def test_get_ids(self):
+        obs = SAMPLE_COMPOSITION_TYPES.get_ids(['blank', 'not a type'])
+        self.assertEqual(obs, {'blank': SAMPLE_COMPOSITION_TYPES.get_id(
+            'blank'), 'not a type': None})
+        self.assertIsNotNone(obs['blank'])
+
+        # Missing keys don't reload the rows
+        with sql_connection.TRN as TRN:
+            with TRN.profile('lookups') as scope:
+                SAMPLE_COMPOSITION_TYPES.get_ids(
+                    ['blank', 'missing 1', 'missing 2', 'missing 3'])
+        self.assertEqual(scope.query_count, 0)
+
+    def test_update_wells_lookups(self):
+        tester = SamplePlatingProcess(11)
+        tester.update_wells([(8, 1, 'blank')])
+        with sql_connection.TRN as TRN:
+            with TRN.profile('update wells') as scope:
+                tester.update_wells([(8, 1, '1.SKM8.640201'),
+                                     (1, 2, '1.SKB6.640176'),
+                                     (1, 3, 'Unknown')])
+        self.assertEqual(
+            [fp for fp in scope.stats
+             if 'FROM labcontrol.sample_composition_type ' in fp], [])
+
+    def test_invalidate_on_end(self):
+        self.assertIsNone(SAMPLE_COMPOSITION_TYPES.get_id('test.control'))
+        SampleComposition.create_control_sample_type(
+            'test.control', 'A test control')
+        self.assertIsNotNone(SAMPLE_COMPOSITION_TYPES.get_id('test.control'))
+
+        with sql_connection.TRN as TRN:
+            SampleComposition.create_control_sample_type(
+                'test.control.2', 'A rolled back control')
+            self.assertIsNotNone(
+                SAMPLE_COMPOSITION_TYPES.get_id('test.control.2'))
+            TRN.rollback()
+        self.assertIsNone(SAMPLE_COMPOSITION_TYPES.get_id('test.control.2'))
+
+
+if __name__ == '__main__':
+    main()
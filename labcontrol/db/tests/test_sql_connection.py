@@ -10,6 +10,8 @@ from unittest import TestCase, main
 from os import remove, close
 from os.path import exists
 from tempfile import mkstemp
+from threading import Thread
+from datetime import date
 
 from psycopg2._psycopg import connection
 from psycopg2.extras import DictCursor
@@ -18,7 +20,11 @@ from psycopg2.extensions import TRANSACTION_STATUS_IDLE
 
 
 from labcontrol.db.settings import labcontrol_settings
-from labcontrol.db.sql_connection import SQLConnectionHandler, Transaction, TRN
+from labcontrol.db.sql_connection import (
+    SQLConnectionHandler, Transaction, TRN, ConnectionPool, LocalTransaction,
+    get_pool, get_read_pool, read_only_transaction, StatementCache,
+    data_version,
+    _is_batchable, _split_values_insert, _to_prepared_sql)
 
 
 DB_CREATE_TEST_TABLE = """CREATE TABLE labcontrol.test_table (
@@ -79,6 +85,80 @@ class TestBase(TestCase):
         self.assertEqual(obs, exp)
 
 
+class TestBatchHelpers(TestCase):
+    def test_is_batchable(self):
+        self.assertTrue(_is_batchable(
+            "INSERT INTO t (a) VALUES (%s)"))
+        self.assertTrue(_is_batchable(
+            "  update t SET a = %s WHERE b = %s;"))
+        self.assertTrue(_is_batchable("DELETE FROM t WHERE a = %s"))
+        self.assertFalse(_is_batchable("SELECT a FROM t"))
+        self.assertFalse(_is_batchable(
+            "INSERT INTO t (a) VALUES (%s) RETURNING a"))
+        self.assertFalse(_is_batchable(
+            "DELETE FROM t; DELETE FROM s"))
+        self.assertFalse(_is_batchable(
+            "WITH x AS (SELECT 1) INSERT INTO t SELECT * FROM x"))
+
+    def test_split_values_insert(self):
+        self.assertEqual(
+            _split_values_insert("INSERT INTO t (a, b) VALUES (%s, f(%s))"),
+            ("INSERT INTO t (a, b) VALUES ", "(%s, f(%s))"))
+        self.assertEqual(
+            _split_values_insert("INSERT INTO t (a)\n VALUES (%s);"),
+            ("INSERT INTO t (a)\n VALUES ", "(%s)"))
+        self.assertIsNone(_split_values_insert(
+            "INSERT INTO t (a) VALUES (%s) ON CONFLICT (a) DO NOTHING"))
+        self.assertIsNone(_split_values_insert(
+            "INSERT INTO t (a) VALUES (%s) ON CONFLICT (a) DO UPDATE "
+            "SET a = (1)"))
+        self.assertIsNone(_split_values_insert(
+            "INSERT INTO t (a) SELECT a FROM s"))
+        self.assertIsNone(_split_values_insert("UPDATE t SET a = 1"))
+
+
+class TestStatementCache(TestCase):
+    def test_get_put(self):
+        cache = StatementCache(2)
+        self.assertIsNone(cache.get('SELECT 1'))
+        self.assertEqual(cache.new_name(), 'labcontrol_stmt_1')
+        self.assertEqual(cache.new_name(), 'labcontrol_stmt_2')
+        self.assertIsNone(cache.put('SELECT 1', 'stmt_1'))
+        self.assertIsNone(cache.put('SELECT 2', 'stmt_2'))
+        self.assertEqual(cache.get('SELECT 1'), 'stmt_1')
+        # SELECT 2 is now the least recently used
+        self.assertEqual(cache.put('SELECT 3', 'stmt_3'), 'stmt_2')
+        self.assertEqual(len(cache), 2)
+        self.assertIn('SELECT 1', cache)
+        self.assertNotIn('SELECT 2', cache)
+        self.assertEqual((cache.hits, cache.misses, cache.evictions),
+                         (1, 1, 1))
+
+        cache.discard('SELECT 1')
+        cache.discard('SELECT 1')
+        self.assertEqual(len(cache), 1)
+
+    def test_to_prepared_sql(self):
+        self.assertEqual(
+            _to_prepared_sql("SELECT a FROM t WHERE b = %s AND c = %s;",
+                             [1, 2]),
+            "SELECT a FROM t WHERE b = $1 AND c = $2")
+        self.assertEqual(
+            _to_prepared_sql("UPDATE t SET a = %s WHERE b LIKE '%%x'",
+                             ['y']),
+            "UPDATE t SET a = $1 WHERE b LIKE '%x'")
+        self.assertEqual(
+            _to_prepared_sql("SELECT a FROM t WHERE b LIKE '%%x'", None),
+            "SELECT a FROM t WHERE b LIKE '%%x'")
+        self.assertIsNone(_to_prepared_sql(
+            "SELECT a FROM t WHERE b = %(b)s", {'b': 1}))
+        self.assertIsNone(_to_prepared_sql(
+            "SELECT a FROM t WHERE b IN %s", [(1, 2)]))
+        self.assertIsNone(_to_prepared_sql("SELECT 1; SELECT 2", None))
+        self.assertIsNone(_to_prepared_sql("CREATE TABLE t (a int)", None))
+        self.assertIsNone(_to_prepared_sql("SELECT %s", [1, 2]))
+
+
 class TestConnHandler(TestBase):
     def test_init(self):
         obs = SQLConnectionHandler()
@@ -221,6 +301,198 @@ class TestConnHandler(TestBase):
         self.assertEqual(obs, [['test1', True, 1], ['test2', True, 2]])
 
 
+class TestConnectionPool(TestBase):
+    def _create_pool(self, maxconn, timeout=None):
+        return ConnectionPool(maxconn, timeout=timeout,
+                              user=labcontrol_settings.user,
+                              password=labcontrol_settings.password,
+                              host=labcontrol_settings.host,
+                              port=labcontrol_settings.port,
+                              database=labcontrol_settings.database)
+
+    def test_init_error(self):
+        with self.assertRaises(ValueError):
+            ConnectionPool(0)
+
+    def test_getconn_putconn(self):
+        pool = self._create_pool(2)
+        conn = pool.getconn()
+        self.assertTrue(isinstance(conn, connection))
+        self.assertEqual(conn.closed, 0)
+        pool.putconn(conn)
+        # The idle connection is reused
+        self.assertIs(pool.getconn(), conn)
+        pool.putconn(conn)
+        pool.closeall()
+        self.assertNotEqual(conn.closed, 0)
+
+    def test_getconn_bounded(self):
+        pool = self._create_pool(1, timeout=0.1)
+        conn = pool.getconn()
+        with self.assertRaises(RuntimeError):
+            pool.getconn()
+        pool.putconn(conn)
+        conn2 = pool.getconn()
+        self.assertIs(conn2, conn)
+        pool.putconn(conn2)
+        pool.closeall()
+
+    def test_putconn_rollback(self):
+        pool = self._create_pool(1)
+        conn = pool.getconn()
+        with conn.cursor() as cur:
+            cur.execute(
+                "INSERT INTO labcontrol.test_table (int_column) VALUES (1)")
+        pool.putconn(conn)
+        self.assertEqual(conn.get_transaction_status(),
+                         TRANSACTION_STATUS_IDLE)
+        self._assert_sql_equal([])
+        pool.closeall()
+
+    def test_putconn_closed(self):
+        pool = self._create_pool(1, timeout=0.1)
+        conn = pool.getconn()
+        conn.close()
+        pool.putconn(conn)
+        # The slot has been freed and a new connection is opened
+        conn2 = pool.getconn()
+        self.assertIsNot(conn2, conn)
+        self.assertEqual(conn2.closed, 0)
+        pool.putconn(conn2)
+        pool.closeall()
+
+
+class TestLocalTransaction(TestBase):
+    def test_transaction(self):
+        obs = LocalTransaction()
+        self.assertTrue(isinstance(obs.transaction, Transaction))
+        self.assertIs(obs.transaction, obs.transaction)
+        self.assertIs(obs.transaction._pool, get_pool())
+
+    def test_transaction_per_thread(self):
+        obs = LocalTransaction()
+        results = []
+
+        def worker():
+            results.append(obs.transaction)
+
+        thread = Thread(target=worker)
+        thread.start()
+        thread.join()
+        self.assertEqual(len(results), 1)
+        self.assertIsNot(results[0], obs.transaction)
+
+    def test_connection_released(self):
+        obs = LocalTransaction()
+        with obs as trn:
+            self.assertIs(trn, obs.transaction)
+            self.assertTrue(trn._checked_out)
+            trn.add("SELECT 42")
+            self.assertEqual(trn.execute_fetchlast(), 42)
+        self.assertFalse(obs.transaction._checked_out)
+
+    def test_concurrent_transactions(self):
+        obs = LocalTransaction()
+        results = []
+
+        def worker():
+            with obs:
+                obs.add("SELECT 42")
+                results.append(obs.execute_fetchlast())
+
+        with obs:
+            sql = "INSERT INTO labcontrol.test_table (int_column) VALUES (1)"
+            obs.add(sql)
+            obs.execute()
+            # Another thread can query the database while this transaction
+            # is still open
+            thread = Thread(target=worker)
+            thread.start()
+            thread.join()
+            self.assertEqual(results, [42])
+
+        self._assert_sql_equal([('foo', True, 1)])
+
+    def test_read_only(self):
+        self.assertIs(get_read_pool(), get_pool())
+        write_trn = TRN.transaction
+        with TRN.read_only():
+            read_trn = TRN.transaction
+            self.assertIsNot(read_trn, write_trn)
+            self.assertTrue(read_trn._read_only)
+            with TRN:
+                TRN.add("SELECT 42")
+                self.assertEqual(TRN.execute_fetchlast(), 42)
+                TRN.add("INSERT INTO labcontrol.test_table (int_column) "
+                        "VALUES (1)")
+                with self.assertRaisesRegex(ValueError, 'read-only'):
+                    TRN.execute()
+            # Nested blocks keep using the read-only transaction
+            with TRN.read_only():
+                self.assertIs(TRN.transaction, read_trn)
+            self.assertIs(TRN.transaction, read_trn)
+        self.assertIs(TRN.transaction, write_trn)
+
+        # The connection goes back to the pool in read-write mode
+        conn = read_trn._connection
+        self.assertIsNone(conn.readonly)
+        with TRN:
+            TRN.add("INSERT INTO labcontrol.test_table (int_column) "
+                    "VALUES (2)")
+            TRN.execute()
+        self._assert_sql_equal([('foo', True, 2)])
+
+    def test_read_only_profile(self):
+        # The queries routed to the read-only transaction are profiled in
+        # the scopes started on the read-write one
+        with TRN.profile('outer') as outer:
+            with TRN.read_only(), TRN:
+                TRN.add("SELECT 42")
+                TRN.execute_fetchlast()
+            with TRN:
+                TRN.add("SELECT 43")
+                TRN.execute_fetchlast()
+        self.assertEqual(outer.query_count, 2)
+
+    def test_read_only_inside_transaction(self):
+        # If the read-write transaction is in use, keep using it so the
+        # uncommitted changes are visible
+        @read_only_transaction
+        def count():
+            self.assertFalse(TRN.transaction._read_only)
+            with TRN:
+                TRN.add("SELECT COUNT(*) FROM labcontrol.test_table")
+                return TRN.execute_fetchlast()
+
+        with TRN:
+            TRN.add("INSERT INTO labcontrol.test_table (int_column) "
+                    "VALUES (1)")
+            self.assertEqual(count(), 1)
+            TRN.rollback()
+
+    def test_read_only_transaction(self):
+        trn = Transaction(read_only=True)
+        with trn:
+            trn.add("SELECT 42")
+            self.assertEqual(trn.execute_fetchlast(), 42)
+            trn.add("UPDATE labcontrol.test_table SET int_column = 1")
+            with self.assertRaisesRegex(ValueError, 'read-only'):
+                trn.execute()
+            # The next transaction is read only as well
+            trn.add("DELETE FROM labcontrol.test_table")
+            with self.assertRaisesRegex(ValueError, 'read-only'):
+                trn.execute()
+        trn.close()
+
+    def test_attribute_dispatch(self):
+        obs = LocalTransaction()
+        with obs:
+            obs.add("SELECT 42")
+            self.assertEqual(obs.transaction._queries, [("SELECT 42", None)])
+            obs._queries = []
+            self.assertEqual(obs.transaction._queries, [])
+
+
 class TestTransaction(TestBase):
     def test_init(self):
         obs = Transaction()
@@ -365,6 +637,291 @@ class TestTransaction(TestBase):
             # make sure rollback correctly
             self._assert_sql_equal([])
 
+    def test_execute_batched(self):
+        with TRN:
+            sql = "INSERT INTO labcontrol.test_table (int_column) VALUES (%s)"
+            TRN.add(sql, [[i] for i in range(1200)], many=True)
+            sql = """UPDATE labcontrol.test_table SET str_column = %s
+                     WHERE int_column = %s"""
+            TRN.add(sql, ['50%', 5])
+            sql = "DELETE FROM labcontrol.test_table WHERE int_column > %s"
+            TRN.add(sql, [9])
+            sql = "SELECT COUNT(*) FROM labcontrol.test_table"
+            TRN.add(sql)
+            obs = TRN.execute()
+            self.assertEqual(obs[:-1], [None] * 1202)
+            self.assertEqual(obs[-1], [[10]])
+            self.assertEqual(TRN.index, 1203)
+            self.assertEqual(TRN._queries, [])
+
+        exp = [('foo', True, i) for i in range(10) if i != 5]
+        exp.append(('50%', True, 5))
+        self._assert_sql_equal(exp)
+
+    def test_execute_batched_order(self):
+        # The queries that are not batched should see the changes made by the
+        # batched ones and vice versa
+        with TRN:
+            sql = "INSERT INTO labcontrol.test_table (int_column) VALUES (%s)"
+            TRN.add(sql, [[1], [2]], many=True)
+            TRN.add("SELECT SUM(int_column) FROM labcontrol.test_table")
+            sql = """INSERT INTO labcontrol.test_table (int_column)
+                     SELECT SUM(int_column) FROM labcontrol.test_table"""
+            TRN.add(sql)
+            TRN.add("INSERT INTO labcontrol.test_table (int_column) "
+                    "VALUES (%s) RETURNING int_column", [7])
+            TRN.add("UPDATE labcontrol.test_table SET bool_column = %s "
+                    "WHERE int_column = %s", [False, 3])
+            obs = TRN.execute()
+            self.assertEqual(obs, [None, None, [[3]], None, [[7]], None])
+
+        self._assert_sql_equal([('foo', True, 1), ('foo', True, 2),
+                                ('foo', True, 7), ('foo', False, 3)])
+
+    def test_execute_batched_error(self):
+        with TRN:
+            sql = "INSERT INTO labcontrol.test_table (int_column) VALUES (%s)"
+            TRN.add(sql, [[1], [2], [None], [4]], many=True)
+
+            with self.assertRaisesRegex(ValueError, 'Error running SQL'):
+                TRN.execute()
+
+            # make sure rollback correctly
+            self._assert_sql_equal([])
+
+    def test_execute_stream(self):
+        self._populate_test_table()
+        with TRN:
+            sql = "INSERT INTO labcontrol.test_table (int_column) VALUES (%s)"
+            TRN.add(sql, [5])
+            sql = """SELECT str_column, int_column FROM labcontrol.test_table
+                     WHERE int_column > %s ORDER BY int_column"""
+            obs = list(TRN.execute_stream(sql, [1], batch_size=2))
+            self.assertEqual(obs, [[['test2', 2], ['test3', 3]],
+                                   [['test4', 4], ['foo', 5]]])
+            self.assertEqual(obs[0][0]['int_column'], 2)
+            # The pending queries are executed, but the streamed results are
+            # not stored in the transaction
+            self.assertEqual(TRN._queries, [])
+            self.assertEqual(TRN.index, 1)
+
+            obs = list(TRN.execute_stream(sql, [10]))
+            self.assertEqual(obs, [])
+
+            # The transaction can keep being used while streaming
+            stream = TRN.execute_stream(sql, [0], batch_size=3)
+            self.assertEqual(len(next(stream)), 3)
+            TRN.add("SELECT COUNT(*) FROM labcontrol.test_table")
+            self.assertEqual(TRN.execute_fetchlast(), 5)
+            self.assertEqual(next(stream), [['test4', 4], ['foo', 5]])
+            stream.close()
+
+        self._assert_sql_equal([('test1', True, 1), ('test2', True, 2),
+                                ('test3', False, 3), ('test4', False, 4),
+                                ('foo', True, 5)])
+
+    def test_execute_stream_error(self):
+        with TRN:
+            TRN.add("INSERT INTO labcontrol.test_table (int_column) "
+                    "VALUES (%s)", [1])
+            with self.assertRaisesRegex(ValueError, 'Error running SQL'):
+                list(TRN.execute_stream("SELECT * FROM labcontrol.no_table"))
+
+            self._assert_sql_equal([])
+
+        with self.assertRaises(RuntimeError):
+            TRN.execute_stream("SELECT 42")
+
+    def test_execute_stream_transaction_end(self):
+        self._populate_test_table()
+        sql = "SELECT int_column FROM labcontrol.test_table"
+        # The cursor is closed when the transaction ends, so the stream can't
+        # read from a connection that went back to the pool
+        with TRN:
+            stream = TRN.execute_stream(sql, batch_size=1)
+            self.assertEqual(len(next(stream)), 1)
+        with self.assertRaisesRegex(RuntimeError, 'within the transaction'):
+            next(stream)
+
+        # Committing or rolling back ends the stream as well
+        with TRN:
+            stream = TRN.execute_stream(sql, batch_size=1)
+            self.assertEqual(len(next(stream)), 1)
+            TRN.commit()
+            self.assertEqual(TRN._streams, [])
+            with self.assertRaisesRegex(RuntimeError,
+                                        'within the transaction'):
+                next(stream)
+            # The transaction is still usable
+            TRN.add("SELECT COUNT(*) FROM labcontrol.test_table")
+            self.assertEqual(TRN.execute_fetchlast(), 4)
+
+        # A stream that was never started can't start outside the
+        # transaction either
+        with TRN:
+            stream = TRN.execute_stream(sql)
+        with self.assertRaisesRegex(RuntimeError, 'within the transaction'):
+            next(stream)
+
+    def test_copy_rows(self):
+        with TRN:
+            TRN.add("INSERT INTO labcontrol.test_table (int_column) "
+                    "VALUES (%s)", [0])
+            rows = [['tab\there', False, 3], ['new\nline', True, 1],
+                    ['back\\slash', False, 2], ['\\N', True, 4]]
+            obs = TRN.copy_rows(
+                'labcontrol.test_table',
+                ['str_column', 'bool_column', 'int_column'], rows,
+                returning='int_column')
+            self.assertEqual(obs, [3, 1, 2, 4])
+            self.assertEqual(TRN.index, 2)
+            self.assertEqual(TRN._queries, [])
+
+        self._assert_sql_equal([('foo', True, 0),
+                                ('tab\there', False, 3),
+                                ('new\nline', True, 1),
+                                ('back\\slash', False, 2),
+                                ('\\N', True, 4)])
+
+    def test_copy_rows_serial(self):
+        with TRN:
+            TRN.add("CREATE TEMP TABLE copy_test (id SERIAL PRIMARY KEY, "
+                    "value varchar, created date)")
+            TRN.add("INSERT INTO copy_test (value) VALUES ('first')")
+            rows = [[str(i), None] for i in range(2000)]
+            rows[10][1] = date(2017, 10, 25)
+            obs = TRN.copy_rows('copy_test', ['value', 'created'], rows,
+                                returning='id')
+            self.assertEqual(obs, list(range(2, 2002)))
+
+            # Each id is the one of the row in its position
+            TRN.add("SELECT id, value FROM copy_test WHERE id > 1")
+            self.assertEqual(
+                {i: v for i, v in TRN.execute_fetchindex()},
+                {i: r[0] for i, r in zip(obs, rows)})
+
+            TRN.add("SELECT value, created FROM copy_test WHERE id = ANY(%s) "
+                    "ORDER BY id", [[2, 12, 13]])
+            self.assertEqual(TRN.execute_fetchindex(),
+                             [['0', None], ['10', date(2017, 10, 25)],
+                              ['11', None]])
+            # The rows can be copied more than once in the same transaction
+            obs = TRN.copy_rows('copy_test', ['value'], [['last']])
+            self.assertIsNone(obs)
+            TRN.add("SELECT COUNT(*) FROM copy_test")
+            self.assertEqual(TRN.execute_fetchlast(), 2002)
+
+    def test_copy_rows_empty(self):
+        with TRN:
+            obs = TRN.copy_rows('labcontrol.test_table', ['int_column'], [],
+                                returning='int_column')
+            self.assertEqual(obs, [])
+            self.assertEqual(TRN.index, 1)
+
+    def test_copy_rows_error(self):
+        with TRN:
+            TRN.add("INSERT INTO labcontrol.test_table (int_column) "
+                    "VALUES (%s)", [0])
+            with self.assertRaisesRegex(ValueError, 'Error running SQL'):
+                TRN.copy_rows('labcontrol.test_table', ['int_column'],
+                              [[1], [None]])
+            self._assert_sql_equal([])
+
+            with self.assertRaisesRegex(ValueError, 'Row 2 has 2 values'):
+                TRN.copy_rows('labcontrol.test_table', ['int_column'],
+                              [[1], [2, 3]])
+
+    def test_statement_cache(self):
+        trn = Transaction(statement_cache_size=2)
+        sql_ins = """INSERT INTO labcontrol.test_table (str_column, int_column)
+                     VALUES (%s, %s) RETURNING int_column"""
+        sql_sel = """SELECT str_column FROM labcontrol.test_table
+                     WHERE int_column = ANY(%s) AND str_column LIKE '%%s%%'
+                     ORDER BY int_column"""
+        with trn:
+            self.assertEqual(trn.statement_cache.maxsize, 2)
+            for i in range(3):
+                trn.add(sql_ins, ['s%d' % i, i])
+                self.assertEqual(trn.execute_fetchlast(), i)
+            trn.add(sql_sel, [[0, 2]])
+            self.assertEqual(trn.execute_fetchflatten(), ['s0', 's2'])
+            trn.add(sql_sel, [[1]])
+            self.assertEqual(trn.execute_fetchflatten(), ['s1'])
+
+            cache = trn.statement_cache
+            self.assertEqual((cache.hits, cache.misses, cache.evictions),
+                             (3, 2, 0))
+
+            # An unparameterized query that can't be prepared
+            trn.add("SELECT %s IS NULL", [None])
+            self.assertTrue(trn.execute_fetchlast())
+            self.assertIn("SELECT %s IS NULL", cache.unpreparable)
+            self.assertEqual(len(cache), 2)
+
+            trn.add("SELECT COUNT(*) FROM labcontrol.test_table")
+            self.assertEqual(trn.execute_fetchlast(), 3)
+            self.assertEqual(cache.evictions, 1)
+            self.assertNotIn(sql_ins, cache)
+            trn.add("SELECT COUNT(*) FROM pg_prepared_statements")
+            self.assertEqual(trn.execute_fetchlast(), 2)
+
+            # The prepared statements survive a rollback
+            trn.rollback()
+            trn.add("SELECT COUNT(*) FROM labcontrol.test_table")
+            self.assertEqual(trn.execute_fetchlast(), 0)
+            self.assertEqual(cache.hits, 4)
+
+        trn.close()
+        self._assert_sql_equal([])
+
+    def test_statement_cache_disabled(self):
+        trn = Transaction()
+        with trn:
+            self.assertIsNone(trn.statement_cache)
+            trn.add("SELECT 42")
+            self.assertEqual(trn.execute_fetchlast(), 42)
+            trn.add("SELECT COUNT(*) FROM pg_prepared_statements")
+            self.assertEqual(trn.execute_fetchlast(), 0)
+        trn.close()
+
+    def test_profile(self):
+        with self.assertLogs(level='WARNING') as logs, \
+                TRN.profile('outer', n_plus_one_threshold=3) as outer:
+            with TRN:
+                sql = """INSERT INTO labcontrol.test_table (int_column)
+                         VALUES (%s)"""
+                TRN.add(sql, [[i] for i in range(5)], many=True)
+                TRN.execute()
+                with TRN.profile('inner') as inner:
+                    for i in range(5):
+                        TRN.add("SELECT int_column FROM labcontrol.test_table "
+                                "WHERE int_column = %s", [i])
+                        TRN.execute_fetchlast()
+                    TRN.copy_rows('labcontrol.test_table', ['int_column'],
+                                  [[10], [11]])
+                rows = list(TRN.execute_stream(
+                    "SELECT * FROM labcontrol.test_table", batch_size=3))
+
+        self.assertEqual(outer.query_count, 12)
+        self.assertEqual(inner.query_count, 6)
+        self.assertIsNotNone(outer.elapsed)
+        self.assertEqual(len(rows), 3)
+        obs = {s.fingerprint: (s.count, s.rows)
+               for s in outer.stats.values()}
+        self.assertEqual(obs, {
+            "INSERT INTO labcontrol.test_table (int_column) VALUES (?)":
+                (5, 0),
+            "SELECT int_column FROM labcontrol.test_table "
+            "WHERE int_column = ?": (5, 5),
+            'INSERT INTO "labcontrol"."test_table" ("int_column") '
+            'SELECT "int_column" FROM "copy_rows_tmp" '
+            'ORDER BY copy_row_number': (1, 2),
+            "SELECT * FROM labcontrol.test_table": (1, 7)})
+        self.assertEqual([s.count for s in outer.n_plus_one()], [5, 5])
+        self.assertEqual(len(logs.records), 2)
+        self.assertEqual(inner.n_plus_one(), [])
+        self.assertEqual(TRN._scopes, [])
+
     def test_execute_commit_false(self):
         with TRN:
             sql = """INSERT INTO labcontrol.test_table (str_column, int_column)
@@ -463,6 +1020,34 @@ class TestTransaction(TestBase):
             self.assertEqual(TRN.execute_fetchindex(3),
                              [['insert4', 4]])
 
+    def test_execute_fetchindex_row_type(self):
+        self._populate_test_table()
+        with TRN:
+            sql = """SELECT str_column, int_column FROM labcontrol.test_table
+                     WHERE int_column < %s ORDER BY int_column"""
+            TRN.add(sql, [3])
+            TRN.add(sql, [2])
+            obs = TRN.execute_fetchindex(0, row_type='namedtuple')
+            self.assertEqual(obs, [('test1', 1), ('test2', 2)])
+            self.assertEqual(obs[1].str_column, 'test2')
+            # Only the rows of the requested query change their type
+            obs = TRN.execute_fetchindex(1)
+            self.assertEqual(obs[0]['str_column'], 'test1')
+
+            TRN.add(sql, [2])
+            obs = TRN.execute_fetchindex(row_type='tuple')
+            self.assertEqual(obs, [('test1', 1)])
+            self.assertIs(type(obs[0]), tuple)
+
+            TRN.add(sql, [2])
+            TRN.add("SELECT 42")
+            self.assertEqual(TRN.execute_fetchlast(), 42)
+            self.assertEqual(TRN.execute_fetchindex(3)[0]['int_column'], 1)
+
+            TRN.add(sql, [2])
+            with self.assertRaisesRegex(ValueError, "Unknown row type"):
+                TRN.execute_fetchindex(row_type='list')
+
     def test_execute_fetchflatten(self):
         with TRN:
             sql = """INSERT INTO labcontrol.test_table (str_column, int_column)
@@ -643,6 +1228,47 @@ class TestTransaction(TestBase):
                 TRN.add_post_rollback_func(func)
                 TRN.rollback()
 
+    def test_data_version(self):
+        version = data_version()
+        with TRN:
+            TRN.add("SELECT 42")
+            TRN.add("  select * FROM labcontrol.test_table")
+            TRN.execute()
+        self.assertEqual(data_version(), version)
+
+        # CTEs may modify the database
+        with TRN:
+            TRN.add("WITH x AS (SELECT 1) SELECT * FROM x")
+            self.assertNotEqual(data_version(), version)
+            TRN.rollback()
+
+        # So do the functions that modify the database
+        version = data_version()
+        with TRN:
+            TRN.add("SELECT * FROM labcontrol.update_sample_composition("
+                    "%s, %s)", [8, 'blank'])
+            self.assertNotEqual(data_version(), version)
+            TRN.rollback()
+        version = data_version()
+
+        with TRN:
+            TRN.add("INSERT INTO labcontrol.test_table (int_column) "
+                    "VALUES (%s)", [1])
+            after_add = data_version()
+            self.assertNotEqual(after_add, version)
+            TRN.execute()
+            self.assertEqual(data_version(), after_add)
+        # The commit of the write changes the version again
+        self.assertNotEqual(data_version(), after_add)
+
+        version = data_version()
+        with TRN:
+            TRN.copy_rows('labcontrol.test_table', ['int_column'], [[2]])
+            after_copy = data_version()
+            self.assertNotEqual(after_copy, version)
+            TRN.rollback()
+            self.assertNotEqual(data_version(), after_copy)
+
     def test_context_manager_checker(self):
         with self.assertRaises(RuntimeError):
             TRN.add("SELECT 42")
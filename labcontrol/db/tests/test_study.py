@@ -228,12 +228,20 @@ class TestStudy(LabControlTestCase):
         obs = s.sample_id_to_specimen_id('SKM3')
         self.assertEqual(obs, 'SKM3')
 
+        obs = s.sample_ids_to_specimen_ids(['1.SKM4.640180', 'SKM3'])
+        self.assertEqual(obs, {'1.SKM4.640180': '1.SKM4.640180',
+                               'SKM3': 'SKM3'})
+
         with self.assertRaisesRegex(ValueError, 'Could not find "SKM4"'):
             s.specimen_id_to_sample_id('SKM4')
 
         with self.assertRaisesRegex(ValueError, 'Could not find "SSSS"'):
             s.specimen_id_to_sample_id('SSSS')
 
+        # specimens that are not found are left out
+        obs = s.specimen_ids_to_sample_ids(['1.SKM4.640180', 'SKM4'])
+        self.assertEqual(obs, {'1.SKM4.640180': '1.SKM4.640180'})
+
     def test_translate_ids_with_specimen_id(self):
         s = Study(1)
         # HACK: the Study object in labcontrol can't modify specimen_id_column
@@ -251,6 +259,16 @@ class TestStudy(LabControlTestCase):
             obs = s.specimen_id_to_sample_id('SKM4')
             self.assertEqual(obs, '1.SKM4.640180')
 
+            obs = s.specimen_ids_to_sample_ids(['SKM4', 'SKB1', 'skm4'])
+            self.assertEqual(obs, {'SKM4': '1.SKM4.640180',
+                                   'SKB1': '1.SKB1.640202'})
+
+            # samples that are not found are left out
+            obs = s.sample_ids_to_specimen_ids(
+                ['1.SKM4.640180', '1.SKB1.640202', '1.skm4.640180'])
+            self.assertEqual(obs, {'1.SKM4.640180': 'SKM4',
+                                   '1.SKB1.640202': 'SKB1'})
+
             # should be an exact match
             with self.assertRaisesRegex(ValueError,
                                         'Could not find \"1\.skm4\.640180\"'):
@@ -268,6 +286,9 @@ class TestStudy(LabControlTestCase):
                                         ' a problem with the specimen id '
                                         'column'):
                 s.specimen_id_to_sample_id('1118232')
+            with self.assertRaisesRegex(RuntimeError, 'There are several '
+                                        'matches found for "1118232"'):
+                s.specimen_ids_to_sample_ids(['1118232'])
 
             TRN.add(sql, [None])
 
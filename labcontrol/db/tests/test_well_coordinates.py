@@ -0,0 +1,90 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2017-, LabControl development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+from unittest import main, TestCase
+
+import numpy as np
+import numpy.testing as npt
+
+from labcontrol.db.well_coordinates import (
+    plate_shape, row_letters, row_number, well_name, well_names,
+    plate_well_names, parse_well_names)
+
+
+class TestWellCoordinates(TestCase):
+    def test_plate_shape(self):
+        self.assertEqual(plate_shape(96), (8, 12))
+        self.assertEqual(plate_shape(384), (16, 24))
+        self.assertEqual(plate_shape(1536), (32, 48))
+        with self.assertRaisesRegex(ValueError, 'Unsupported plate format'):
+            plate_shape(48)
+
+    def test_row_letters(self):
+        self.assertEqual(row_letters(1), 'A')
+        self.assertEqual(row_letters(26), 'Z')
+        self.assertEqual(row_letters(27), 'AA')
+        self.assertEqual(row_letters(32), 'AF')
+        self.assertEqual(row_letters(703), 'AAA')
+        with self.assertRaises(ValueError):
+            row_letters(0)
+
+    def test_row_number(self):
+        for row in (1, 26, 27, 32, 703):
+            self.assertEqual(row_number(row_letters(row)), row)
+
+    def test_well_name(self):
+        self.assertEqual(well_name(1, 1), 'A1')
+        self.assertEqual(well_name(8, 12), 'H12')
+        self.assertEqual(well_name(32, 48), 'AF48')
+        self.assertEqual(well_name(40, 100), 'AN100')
+        with self.assertRaises(ValueError):
+            well_name(0, 1)
+
+    def test_well_names(self):
+        obs = well_names([1, 16, 27], [1, 24, 3])
+        npt.assert_array_equal(obs, ['A1', 'P24', 'AA3'])
+        # The columns are broadcast against the rows
+        obs = well_names([[1], [2]], [1, 2])
+        npt.assert_array_equal(obs, [['A1', 'A2'], ['B1', 'B2']])
+        self.assertEqual(well_names([], []).shape, (0,))
+        with self.assertRaises(ValueError):
+            well_names([1, 2], [0, 1])
+
+    def test_plate_well_names(self):
+        obs = plate_well_names(32, 48)
+        self.assertEqual(obs.shape, (32, 48))
+        self.assertEqual(obs[0, 0], 'A1')
+        self.assertEqual(obs[7, 11], 'H12')
+        self.assertEqual(obs[26, 0], 'AA1')
+        self.assertEqual(obs[31, 47], 'AF48')
+        self.assertFalse(obs.flags.writeable)
+
+    def test_parse_well_names(self):
+        rows, cols = parse_well_names(['A1', 'h12', ' A01 ', 'AF48', 'AN100'])
+        npt.assert_array_equal(rows, [1, 8, 1, 32, 40])
+        npt.assert_array_equal(cols, [1, 12, 1, 48, 100])
+
+        rows, cols = parse_well_names(np.array([['A1', 'B2'], ['C3', 'A1']]))
+        npt.assert_array_equal(rows, [[1, 2], [3, 1]])
+        npt.assert_array_equal(cols, [[1, 2], [3, 1]])
+
+        rows, cols = parse_well_names([])
+        self.assertEqual(rows.shape, (0,))
+
+        with self.assertRaisesRegex(ValueError, 'Invalid well name'):
+            parse_well_names(['A1', '1A'])
+
+    def test_round_trip(self):
+        for num_wells in (96, 384, 1536):
+            names = plate_well_names(*plate_shape(num_wells))
+            rows, cols = parse_well_names(names)
+            npt.assert_array_equal(well_names(rows, cols), names)
+
+
+if __name__ == '__main__':
+    main()
@@ -55,14 +55,9 @@ def get_pools_listing(is_plate_pool_limits, is_amplicon_plate_pool_limits):
                  ORDER BY pool_composition_id""".format(
             pool_composition_desc, amplicon_composition_desc)
         TRN.add(sql)
-
-        # if you are looking for a way to improve performance, you would
-        # need to:
-        # 1. Create a database table with all the process.Process.factory
-        # factory_classes
-        # 2. retrieve the table names that correspond to each object
-        # 3. reproduce what process.Process.factory does but in the database
-        return [[pid, eid, ipp, iap, process.Process.factory(upi).id]
-                for pid, eid, ipp, iap, upi in TRN.execute_fetchindex()
-                if ipp in is_plate_pool_limits and
-                iap in is_amplicon_plate_pool_limits]
+        res = [r for r in TRN.execute_fetchindex(row_type='tuple')
+               if r[2] in is_plate_pool_limits and
+               r[3] in is_amplicon_plate_pool_limits]
+        procs = process.Process.factory_many(r[4] for r in res)
+        return [[pid, eid, ipp, iap, proc.id]
+                for (pid, eid, ipp, iap, _), proc in zip(res, procs)]
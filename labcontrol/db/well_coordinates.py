@@ -0,0 +1,255 @@
+# ----------------------------------------------------------------------------
+# Copyright (c) 2017-, LabControl development team.
+#
+# Distributed under the terms of the Modified BSD License.
+#
+# The full license is in the file LICENSE, distributed with this software.
+# ----------------------------------------------------------------------------
+
+"""Conversion between well coordinates and well names
+
+Wells are named with their row letters followed by their column number, e.g.
+"A1" or "H12". Rows past "Z" continue with two letters, as spreadsheet
+columns do ("AA", "AB", ...), so the 32 rows of a 1536-well plate go from "A"
+to "AF". Rows and columns are 1-based, as they are stored in the database.
+
+The names of the wells of the supported plate formats are precomputed, so
+converting whole plates is an array lookup rather than a per-well loop.
+"""
+
+from functools import lru_cache
+import re
+
+import numpy as np
+
+
+LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# Number of wells: (number of rows, number of columns)
+PLATE_FORMATS = {96: (8, 12), 384: (16, 24), 1536: (32, 48)}
+
+# The lookup tables cover the largest plate format, so all the formats share
+# them. Larger coordinates are still supported, but computed on demand
+_MAX_ROWS, _MAX_COLUMNS = PLATE_FORMATS[1536]
+
+_WELL_NAME_RE = re.compile(r'^([A-Z]+)0*([1-9][0-9]*)$')
+
+
+def plate_shape(num_wells):
+    """Returns the shape of a plate format
+
+    Parameters
+    ----------
+    num_wells : int
+        The number of wells of the plate format: 96, 384 or 1536
+
+    Returns
+    -------
+    (int, int)
+        The number of rows and columns of the plate format
+
+    Raises
+    ------
+    ValueError
+        If `num_wells` is not a supported plate format
+    """
+    try:
+        return PLATE_FORMATS[num_wells]
+    except KeyError:
+        raise ValueError('Unsupported plate format: %s wells. Supported '
+                         'formats: %s' % (num_wells,
+                                          ', '.join(map(str,
+                                                        PLATE_FORMATS))))
+
+
+def row_letters(row):
+    """Returns the letters naming a plate row
+
+    Parameters
+    ----------
+    row : int
+        The 1-based row number
+
+    Returns
+    -------
+    str
+        The row letters, e.g. "A" for 1, "Z" for 26 and "AA" for 27
+    """
+    if row < 1:
+        raise ValueError('Row numbers start at 1. Found: %s' % row)
+    # Adapted from https://stackoverflow.com/a/19169180/3746629
+    result = []
+    while row:
+        row, rem = divmod(row - 1, 26)
+        result[:0] = LETTERS[rem]
+    return ''.join(result)
+
+
+def row_number(letters):
+    """Returns the plate row named by some letters
+
+    Parameters
+    ----------
+    letters : str
+        The row letters, e.g. "A" or "AF"
+
+    Returns
+    -------
+    int
+        The 1-based row number
+    """
+    row = 0
+    for letter in letters:
+        row = row * 26 + LETTERS.index(letter) + 1
+    return row
+
+
+def well_name(row, column):
+    """Returns the name of a well
+
+    Parameters
+    ----------
+    row : int
+        The 1-based row of the well
+    column : int
+        The 1-based column of the well
+
+    Returns
+    -------
+    str
+        The well name in the "A1", "H12" form
+    """
+    if row < 1 or column < 1:
+        raise ValueError('Row and column numbers start at 1')
+    return _row_labels(max(row, _MAX_ROWS))[row - 1] + str(column)
+
+
+@lru_cache(maxsize=None)
+def _row_labels(num_rows):
+    """Read-only array with the letters of the first `num_rows` rows"""
+    labels = np.array([row_letters(r) for r in range(1, num_rows + 1)],
+                      dtype=object)
+    labels.setflags(write=False)
+    return labels
+
+
+@lru_cache(maxsize=None)
+def _column_labels(num_columns):
+    """Read-only array with the numbers of the first `num_columns` columns"""
+    labels = np.array([str(c) for c in range(1, num_columns + 1)],
+                      dtype=object)
+    labels.setflags(write=False)
+    return labels
+
+
+@lru_cache(maxsize=None)
+def _name_coordinates():
+    """Maps the well names of the largest plate format to their coordinates
+
+    The zero-padded column form used by some instruments (e.g. "A01") is
+    also included.
+    """
+    lookup = {}
+    for row in range(1, _MAX_ROWS + 1):
+        letters = row_letters(row)
+        for column in range(1, _MAX_COLUMNS + 1):
+            lookup[letters + str(column)] = (row, column)
+            lookup['%s%02d' % (letters, column)] = (row, column)
+    return lookup
+
+
+def well_names(rows, columns):
+    """Returns the names of the wells at the given coordinates
+
+    Parameters
+    ----------
+    rows : array_like of int
+        The 1-based rows of the wells
+    columns : array_like of int
+        The 1-based columns of the wells, broadcastable against `rows`
+
+    Returns
+    -------
+    np.ndarray of str
+        Object array, with the broadcast shape of `rows` and `columns`, with
+        the names of the wells
+
+    Raises
+    ------
+    ValueError
+        If any row or column is smaller than 1
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    columns = np.asarray(columns, dtype=np.int64)
+    if rows.size == 0 or columns.size == 0:
+        return np.empty(np.broadcast(rows, columns).shape, dtype=object)
+    if rows.min() < 1 or columns.min() < 1:
+        raise ValueError('Row and column numbers start at 1')
+    row_labels = _row_labels(max(int(rows.max()), _MAX_ROWS))
+    column_labels = _column_labels(max(int(columns.max()), _MAX_COLUMNS))
+    return row_labels[rows - 1] + column_labels[columns - 1]
+
+
+@lru_cache(maxsize=None)
+def plate_well_names(num_rows, num_columns):
+    """Returns the names of all the wells of a plate
+
+    Parameters
+    ----------
+    num_rows : int
+        The number of rows of the plate
+    num_columns : int
+        The number of columns of the plate
+
+    Returns
+    -------
+    np.ndarray of str
+        Read-only object array, of shape (num_rows, num_columns), with the
+        well names. Position [i, j] holds the name of the well in row i + 1
+        and column j + 1
+    """
+    names = well_names(np.arange(1, num_rows + 1)[:, np.newaxis],
+                       np.arange(1, num_columns + 1)[np.newaxis, :])
+    names.setflags(write=False)
+    return names
+
+
+def parse_well_names(names):
+    """Returns the coordinates of the wells with the given names
+
+    Parameters
+    ----------
+    names : array_like of str
+        The well names, e.g. "A1" or "h12". Zero-padded columns ("A01") and
+        surrounding whitespace are accepted
+
+    Returns
+    -------
+    (np.ndarray of int, np.ndarray of int)
+        The 1-based rows and columns of the wells, with the shape of `names`
+
+    Raises
+    ------
+    ValueError
+        If any of the names is not a well name
+    """
+    names = np.char.upper(np.char.strip(np.asarray(names, dtype=str)))
+    if names.size == 0:
+        return (np.empty(names.shape, dtype=np.int64),
+                np.empty(names.shape, dtype=np.int64))
+    # A plate has at most a few thousand distinct names, so only those are
+    # looked up, however many times they are repeated
+    unique_names, inverse = np.unique(names, return_inverse=True)
+    lookup = _name_coordinates()
+    coordinates = np.empty((len(unique_names), 2), dtype=np.int64)
+    for i, name in enumerate(unique_names):
+        coords = lookup.get(name)
+        if coords is None:
+            # Not a well of the precomputed formats, parse it
+            match = _WELL_NAME_RE.match(name)
+            if match is None:
+                raise ValueError('Invalid well name: %r' % name)
+            coords = (row_number(match.group(1)), int(match.group(2)))
+        coordinates[i] = coords
+    coordinates = coordinates[inverse.reshape(names.shape)]
+    return coordinates[..., 0], coordinates[..., 1]
@@ -6,17 +6,103 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import logging
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from threading import Lock
 from traceback import format_exception
 
+from tornado import gen
 from tornado.web import RequestHandler, authenticated
 
+from labcontrol.db import sql_connection
 from labcontrol.db.user import User
 
 
+# Thread pool in which the handlers run their (blocking) database work so it
+# doesn't stall the IOLoop, created on first use (see get_db_executor)
+_DB_EXECUTOR = None
+_DB_EXECUTOR_LOCK = Lock()
+
+
+def get_db_executor():
+    """Returns the thread pool in which the handlers run their DB work
+
+    The pool is created on first use, sized from the connection pool. Each
+    worker thread uses its own transaction, so one connection is kept free
+    for the queries run from the IOLoop thread.
+
+    Returns
+    -------
+    concurrent.futures.ThreadPoolExecutor
+    """
+    global _DB_EXECUTOR
+    with _DB_EXECUTOR_LOCK:
+        if _DB_EXECUTOR is None:
+            _DB_EXECUTOR = ThreadPoolExecutor(
+                max_workers=max(1, sql_connection.get_pool().maxconn - 1))
+    return _DB_EXECUTOR
+
+
 class BaseHandler(RequestHandler):
     """Base class for all LabControl's handlers"""
+    _query_scope = None
+
+    def prepare(self):
+        """Profiles the DB queries of the request if debugging is enabled"""
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            self._query_scope = sql_connection.TRN.start_profile(
+                '%s %s' % (self.request.method, self.request.uri))
+
+    def on_finish(self):
+        """Logs the DB queries report of the request, if it was profiled"""
+        if self._query_scope is not None:
+            sql_connection.TRN.stop_profile(self._query_scope)
+            self._query_scope = None
+
+    def _run_profiled(self, scope, func, args, kwargs):
+        """Runs `func` recording its queries in the scope of the request"""
+        if scope is None:
+            return func(*args, **kwargs)
+        sql_connection.TRN.attach_profile(scope)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sql_connection.TRN.detach_profile(scope)
+
+    @gen.coroutine
+    def run_in_db_executor(self, func, *args, **kwargs):
+        """Runs `func` in the DB thread pool without blocking the IOLoop
+
+        Parameters
+        ----------
+        func : callable
+            The function to run. It should not write to the response, as it
+            is run outside the IOLoop thread
+        args : tuple
+            The positional arguments of `func`
+        kwargs : dict
+            The keyword arguments of `func`
+
+        Returns
+        -------
+        tornado.concurrent.Future
+            The future resolving to the value returned by `func`. Exceptions
+            raised by `func` (e.g. HTTPError) are raised when yielded
+        """
+        scope = self._query_scope
+        if scope is not None:
+            # Other requests run in the IOLoop thread while this one waits,
+            # so don't record their queries in this request's scope
+            sql_connection.TRN.detach_profile(scope)
+        try:
+            result = yield get_db_executor().submit(
+                self._run_profiled, scope, func, args, kwargs)
+        finally:
+            if scope is not None:
+                sql_connection.TRN.attach_profile(scope)
+        return result
 
     def get_current_user(self):
         """Get the current connected user"""
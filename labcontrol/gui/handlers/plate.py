@@ -8,6 +8,7 @@
 
 from itertools import chain
 
+from tornado import gen
 from tornado.web import authenticated, HTTPError
 from tornado.escape import json_encode, json_decode
 
@@ -15,7 +16,6 @@ from labcontrol.gui.handlers.base import BaseHandler
 from labcontrol.db.exceptions import LabControlUnknownIdError
 from labcontrol.db.plate import PlateConfiguration, Plate
 from labcontrol.db.composition import SampleComposition
-from labcontrol.db.container import Well
 from labcontrol.db.process import (
     SamplePlatingProcess, GDNAExtractionProcess, LibraryPrep16SProcess,
     LibraryPrepShotgunProcess, NormalizationProcess,
@@ -57,11 +57,14 @@ class PlateSearchHandler(BaseHandler):
         operation = self.get_argument("operation")
         sample_names = json_decode(self.get_argument('sample_names'))
 
-        res = {"data": [[p.id, p.external_id]
-               for p in Plate.search(samples=sample_names,
-                                     plate_notes=plate_comment_keywords,
-                                     well_notes=well_comment_keywords,
-                                     query_type=operation)]}
+        # The plate names are retrieved by the search query itself, and the
+        # plates come sorted from best to worst match
+        page = Plate.search_page(samples=sample_names,
+                                 plate_notes=plate_comment_keywords,
+                                 well_notes=well_comment_keywords,
+                                 query_type=operation)
+        res = {"data": [[p['plate_id'], p['external_id']]
+                        for p in page['plates']]}
 
         self.write(res)
 
@@ -81,18 +84,95 @@ class PlateListHandler(BaseHandler):
                       if plate_type is not None else None)
         only_quantified = True if only_quantified == 'true' else False
 
-        rows_list = [[p['plate_id'],
-                      p['external_id'],
-                      p['creation_timestamp'],
-                      p['studies'] if p['studies'] is not None else []]
-                     for p in Plate.list_plates(
-                            plate_type, only_quantified=only_quantified,
-                            include_study_titles=True)]
-        res = {"data": rows_list}
+        # DataTables sends 'draw' when using server-side processing, in
+        # which case only the requested page of plates is returned
+        draw = self.get_argument('draw', None)
+        if draw is None:
+            plates = Plate.list_plates(
+                plate_type, only_quantified=only_quantified,
+                include_study_titles=True)
+            res = {"data": _plate_list_rows(plates)}
+        else:
+            # The sorted column is sent as an index, its name is set in
+            # the column definitions of the table
+            sort_column = None
+            order_column = self.get_argument('order[0][column]', None)
+            if order_column is not None:
+                sort_column = self.get_argument(
+                    'columns[%s][name]' % order_column, None) or None
+            res = plate_list_handler_get_page(
+                plate_type, only_quantified, draw,
+                self.get_argument('start', 0),
+                self.get_argument('length', -1),
+                self.get_argument('search[value]', ''), sort_column,
+                self.get_argument('order[0][dir]', 'asc'))
 
         self.write(res)
 
 
+def _plate_list_rows(plates):
+    """Formats the plates returned by Plate.list_plates as table rows"""
+    return [[p['plate_id'],
+             p['external_id'],
+             p['creation_timestamp'],
+             p['studies'] if p['studies'] is not None else []]
+            for p in plates]
+
+
+def plate_list_handler_get_page(plate_type, only_quantified, draw, start,
+                                length, search, sort_column, sort_dir):
+    """Returns a page of the plate list in the DataTables server-side format
+
+    Parameters
+    ----------
+    plate_type : list of str or None
+        The plate types to list
+    only_quantified : bool
+        Whether to list only the plates that have been quantified
+    draw : str
+        The DataTables draw counter
+    start : str
+        The index of the first plate of the page
+    length : str
+        The number of plates of the page, -1 for all of them
+    search : str
+        The search term, empty for no search
+    sort_column : str or None
+        The column to sort by, one of the columns accepted by
+        Plate.list_plates_page. If None, the plates are sorted by id
+    sort_dir : {'asc', 'desc'}
+        The direction of the sort
+
+    Returns
+    -------
+    dict
+        {'draw': int, 'recordsTotal': int, 'recordsFiltered': int,
+         'data': list of [int, str, str, list of str]}
+
+    Raises
+    ------
+    HTTPError
+        400, if the paging or sorting arguments are not valid
+    """
+    try:
+        draw = int(draw)
+        start = int(start)
+        length = int(length)
+        page = Plate.list_plates_page(
+            plate_type, only_quantified=only_quantified,
+            include_study_titles=True, search=search or None,
+            sort_column=sort_column or 'plate_id',
+            sort_descending=sort_dir == 'desc', offset=start,
+            limit=length if length >= 0 else None)
+    except ValueError as e:
+        raise HTTPError(400, reason=str(e))
+
+    return {'draw': draw,
+            'recordsTotal': page['total'],
+            'recordsFiltered': page['filtered'],
+            'data': _plate_list_rows(page['plates'])}
+
+
 def plate_map_handler_get_request(process_id):
     plate_id = None
     if process_id is not None:
@@ -172,52 +252,72 @@ def plate_handler_patch_request(user, plate_id, req_op, req_path,
                              'operations: replace' % req_op)
 
 
+def _get_plate_info(plate_id):
+    """Gathers the information of a plate displayed in the plate editor
+
+    Parameters
+    ----------
+    plate_id : str
+        The plate id
+
+    Returns
+    -------
+    dict
+        The plate information
+
+    Raises
+    ------
+    HTTPError
+        404, if the plate doesn't exist
+    """
+    plate = _get_plate(plate_id)
+    # sorting is done in plate.duplicates
+    duplicates = [
+        [sample_info[0].row, sample_info[0].column, sample_info[1]]
+        for sample_info in chain.from_iterable(plate.duplicates.values())]
+
+    # sorting of wells has to be done here as they are in a dictionary
+    previous_plates = []
+    prev_plated = plate.get_previously_plated_wells()
+    for curr_well in sorted(prev_plated, key=lambda w: w.id):
+        curr_plates = prev_plated[curr_well]
+        # plates are sorted in plate id order in
+        # get_previously_plated_wells
+        previous_plates.append([
+            [curr_well.row, curr_well.column],
+            [{'plate_id': p.id, 'plate_name': p.external_id} for p in
+             curr_plates]])
+
+    # sorting is done in plate.unknown_samples
+    unknowns = [[well.row, well.column] for well in plate.unknown_samples]
+
+    # sorting is done in plate.quantification processes
+    quantitation_processes = [
+        [q.id, q.personnel.name, q.date.strftime(q.get_date_format()),
+         q.notes] for q in plate.quantification_processes]
+
+    plate_config = plate.plate_configuration
+    result = {'plate_id': plate.id,
+              'plate_name': plate.external_id,
+              'discarded': plate.discarded,
+              'plate_configuration': [
+                  plate_config.id, plate_config.description,
+                  plate_config.num_rows, plate_config.num_columns],
+              'notes': plate.notes,
+              'process_notes': plate.process.notes,
+              'studies': sorted(s.id for s in plate.studies),
+              'duplicates': duplicates,
+              'previous_plates': previous_plates,
+              'unknowns': unknowns,
+              'quantitation_processes': quantitation_processes}
+    return result
+
+
 class PlateHandler(BaseHandler):
     @authenticated
+    @gen.coroutine
     def get(self, plate_id):
-        plate = _get_plate(plate_id)
-        # sorting is done in plate.duplicates
-        duplicates = [
-            [sample_info[0].row, sample_info[0].column, sample_info[1]]
-            for sample_info in chain.from_iterable(plate.duplicates.values())]
-
-        # sorting of wells has to be done here as they are in a dictionary
-        previous_plates = []
-        prev_plated = plate.get_previously_plated_wells()
-        well_ids = sorted([w.id for w in prev_plated.keys()])
-        for curr_well_id in well_ids:
-            curr_well = Well(curr_well_id)
-            curr_plates = prev_plated[curr_well]
-            # plates are sorted in plate id order in
-            # get_previously_plated_wells
-            previous_plates.append([
-                [curr_well.row, curr_well.column],
-                [{'plate_id': p.id, 'plate_name': p.external_id} for p in
-                 curr_plates]])
-
-        # sorting is done in plate.unknown_samples
-        unknowns = [[well.row, well.column] for well in plate.unknown_samples]
-
-        # sorting is done in plate.quantification processes
-        quantitation_processes = [[q.id, q.personnel.name, q.date.strftime(
-            q.get_date_format()), q.notes] for q in
-                                  plate.quantification_processes]
-
-        plate_config = plate.plate_configuration
-        result = {'plate_id': plate.id,
-                  'plate_name': plate.external_id,
-                  'discarded': plate.discarded,
-                  'plate_configuration': [
-                        plate_config.id, plate_config.description,
-                        plate_config.num_rows, plate_config.num_columns],
-                  'notes': plate.notes,
-                  'process_notes': plate.process.notes,
-                  'studies': sorted(s.id for s in plate.studies),
-                  'duplicates': duplicates,
-                  'previous_plates': previous_plates,
-                  'unknowns': unknowns,
-                  'quantitation_processes': quantitation_processes}
-
+        result = yield self.run_in_db_executor(_get_plate_info, plate_id)
         self.write(result)
         self.finish()
 
@@ -247,18 +347,11 @@ def plate_layout_handler_get_request(plate_id):
     list of lists of {'sample': str, 'notes': str}
     """
     plate = _get_plate(plate_id)
-    plate_layout = plate.layout
-    result = []
-    for l_row in plate_layout:
-        row = []
-        for l_well in l_row:
-            composition = l_well.composition
-            sample = composition.specimen_id
-            row.append({'sample': sample, 'notes': composition.notes})
-
-        result.append(row)
-
-    return result
+    snapshot = plate.snapshot()
+    return [[{'sample': sample, 'notes': notes}
+             for sample, notes in zip(specimen_row, notes_row)]
+            for specimen_row, notes_row in zip(
+                snapshot.specimen_ids.tolist(), snapshot.notes.tolist())]
 
 
 class PlateLayoutHandler(BaseHandler):
@@ -277,5 +370,12 @@ class PlateProcessHandler(BaseHandler):
             LibraryPrepShotgunProcess: '/process/library_prep_shotgun',
             NormalizationProcess: '/process/normalize',
             GDNAPlateCompressionProcess: '/process/gdna_compression'}
-        process = Plate(plate_id).process
+        # plate_summary is refreshed when the transaction commits, so the
+        # process is read from the wells of the plate
+        plate = _get_plate(plate_id)
+        try:
+            process = plate.process
+        except LabControlUnknownIdError:
+            raise HTTPError(404, 'Plate %s doesn\'t have a process'
+                            % plate.id)
         self.redirect(urls[process.__class__] + '?process_id=%s' % process.id)
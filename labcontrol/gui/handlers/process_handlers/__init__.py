@@ -8,7 +8,8 @@
 
 from .sample_plating_process import (SamplePlatingProcessNotes,
                                      SamplePlatingProcessListHandler,
-                                     SamplePlatingProcessHandler)
+                                     SamplePlatingProcessHandler,
+                                     SamplePlatingProcessWellsHandler)
 from .gdna_extraction_process import GDNAExtractionProcessHandler
 from .gdna_compression_process import GDNAPlateCompressionProcessHandler
 from .library_prep_16s_process import LibraryPrep16SProcessHandler
@@ -31,7 +32,7 @@ from .primer_working_plate_creation_process import (
 from .equipment_creation_process import EquipmentCreationProcessHandler
 
 __all__ = ['SamplePlatingProcessListHandler', 'SamplePlatingProcessHandler',
-           'SamplePlatingProcessNotes',
+           'SamplePlatingProcessNotes', 'SamplePlatingProcessWellsHandler',
            'GDNAExtractionProcessHandler', 'LibraryPrep16SProcessHandler',
            'QuantificationProcessParseHandler', 'QuantificationProcessHandler',
            'QuantificationViewHandler',
@@ -46,6 +47,8 @@ __all__ = ['SamplePlatingProcessListHandler', 'SamplePlatingProcessHandler',
 
 PROCESS_ENDPOINTS = [
     (r"/process/sample_plating/([0-9]+)$", SamplePlatingProcessHandler),
+    (r"/process/sample_plating/([0-9]+)/wells$",
+     SamplePlatingProcessWellsHandler),
     (r"/process/sample_plating$", SamplePlatingProcessListHandler),
     (r"/process/sample_plating/notes$", SamplePlatingProcessNotes),
     (r"/process/gdna_extraction$", GDNAExtractionProcessHandler),
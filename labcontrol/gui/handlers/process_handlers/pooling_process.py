@@ -8,6 +8,7 @@
 
 from datetime import datetime
 
+from tornado import gen
 from tornado.web import authenticated, HTTPError
 from tornado.escape import json_decode, json_encode
 import numpy as np
@@ -16,9 +17,7 @@ from labcontrol.gui.handlers.base import BaseHandler, BaseDownloadHandler
 from labcontrol.db.process import PoolingProcess, QuantificationProcess
 from labcontrol.db.plate import Plate
 from labcontrol.db.equipment import Equipment
-from labcontrol.db.composition import (PoolComposition,
-                                       LibraryPrep16SComposition,
-                                       LibraryPrepShotgunComposition)
+from labcontrol.db.composition import PoolComposition
 from labcontrol.db.exceptions import LabControlUnknownIdError
 
 
@@ -112,9 +111,6 @@ HTML_POOL_PARAMS_16S = {
 HTML_POOL_PARAMS = {'16S library prep': HTML_POOL_PARAMS_16S,
                     'shotgun library prep': HTML_POOL_PARAMS_SHOTGUN}
 
-PLATE_TYPES = {LibraryPrep16SComposition: '16S library prep',
-               LibraryPrepShotgunComposition: 'shotgun library prep'}
-
 PLATE_TYPE_TO_POOL_TYPE = {'16S library prep': 'amplicon_sequencing',
                            'shotgun library prep': 'shotgun_plate'}
 
@@ -147,31 +143,12 @@ def make_2D_arrays(plate, quant_process):
         each well is a blank, and an array of str with the name of the sample
         in each well.
     """
-    layout = plate.layout
-    raw_concs = np.zeros_like(layout, dtype=float)
-    comp_concs = np.zeros_like(layout, dtype=float)
-    comp_is_blank = np.zeros_like(layout, dtype=bool)
-    plate_names = np.empty_like(layout, dtype='object')
-    for comp, raw_conc, conc in quant_process.concentrations:
-        well = comp.container
-        row = well.row - 1
-        column = well.column - 1
-        raw_concs[row][column] = raw_conc
-        comp_concs[row][column] = conc
-
-        # cache the sample compositions to avoid extra intermediate queries
-        if isinstance(comp, LibraryPrep16SComposition):
-            smp = comp.gdna_composition.sample_composition
-
-            comp_is_blank[row][column] = smp.sample_composition_type == 'blank'
-            plate_names[row][column] = smp.sample_id
-        elif isinstance(comp, LibraryPrepShotgunComposition):
-            smp = comp.normalized_gdna_composition \
-                .compressed_gdna_composition\
-                .gdna_composition.sample_composition
-
-            comp_is_blank[row][column] = smp.sample_composition_type == 'blank'
-            plate_names[row][column] = smp.sample_id
+    snapshot = plate.snapshot(quant_process)
+    quantified = snapshot.quantified
+    raw_concs = snapshot.raw_concentrations
+    comp_concs = snapshot.computed_concentrations
+    comp_is_blank = quantified & (snapshot.sample_composition_types == 'blank')
+    plate_names = np.where(quantified, snapshot.sample_ids, None)
 
     return raw_concs, comp_concs, comp_is_blank, plate_names
 
@@ -276,8 +253,7 @@ class LibraryPool16SProcessHandler(BasePoolHandler):
             plate = process.components[0][0].container.plate
             input_plate = plate.id
             pool_func_data = process.pooling_function_data
-            content_type = type(plate.get_well(1, 1).composition)
-            id_plate_type = PLATE_TYPES[content_type]
+            id_plate_type = plate.summary['content_type']
             plate_type_mapped = PLATE_TYPE_TO_POOL_TYPE[id_plate_type]
             if plate_type_mapped != pool_type:
                 raise HTTPError(400, reason='Pooling process type does not '
@@ -291,8 +267,8 @@ class LibraryPool16SProcessHandler(BasePoolHandler):
             plate_names = plate_names.tolist()
 
         elif len(plate_ids) > 0:
-            content_types = {type(Plate(pid).get_well(1, 1).composition)
-                             for pid in plate_ids}
+            content_types = {summary['content_type'] for summary in
+                             Plate.summaries(plate_ids).values()}
 
             if len(content_types) > 1:
                 raise HTTPError(400, reason='Plates contain different types '
@@ -300,8 +276,7 @@ class LibraryPool16SProcessHandler(BasePoolHandler):
 
             # check if the observed plates are the same type as the pooling
             # type (i.e., no shotgun plates for 16S pooling)
-            content_type = content_types.pop()
-            id_plate_type = PLATE_TYPES[content_type]
+            id_plate_type = content_types.pop()
             plate_type_mapped = PLATE_TYPE_TO_POOL_TYPE[id_plate_type]
             if plate_type_mapped != pool_type:
                 raise HTTPError(400, reason='Plate type does not match '
@@ -424,8 +399,7 @@ class LibraryPoolShotgunProcessHandler(BasePoolHandler):
             plate = process.components[0][0].container.plate
             input_plate = plate.id
             pool_func_data = process.pooling_function_data
-            content_type = type(plate.get_well(1, 1).composition)
-            id_plate_type = PLATE_TYPES[content_type]
+            id_plate_type = plate.summary['content_type']
             plate_type_mapped = PLATE_TYPE_TO_POOL_TYPE[id_plate_type]
             if plate_type_mapped != pool_type:
                 raise HTTPError(400, reason='Pooling process type does not '
@@ -439,8 +413,8 @@ class LibraryPoolShotgunProcessHandler(BasePoolHandler):
             plate_names = plate_names.tolist()
 
         elif len(plate_ids) > 0:
-            content_types = {type(Plate(pid).get_well(1, 1).composition)
-                             for pid in plate_ids}
+            content_types = {summary['content_type'] for summary in
+                             Plate.summaries(plate_ids).values()}
 
             if len(content_types) > 1:
                 raise HTTPError(400, reason='Plates contain different types '
@@ -448,8 +422,7 @@ class LibraryPoolShotgunProcessHandler(BasePoolHandler):
 
             # check if the observed plates are the same type as the pooling
             # type (i.e., no shotgun plates for 16S pooling)
-            content_type = content_types.pop()
-            id_plate_type = PLATE_TYPES[content_type]
+            id_plate_type = content_types.pop()
             plate_type_mapped = PLATE_TYPE_TO_POOL_TYPE[id_plate_type]
             if plate_type_mapped != pool_type:
                 raise HTTPError(400, reason='Plate type does not match '
@@ -516,9 +489,21 @@ class LibraryPoolShotgunProcessHandler(BasePoolHandler):
 
         return output
 
-    @authenticated
-    def post(self):
-        plates_info = json_decode(self.get_argument('plates-info'))
+    def _create_pools(self, user, plates_info):
+        """Creates a pooling process for each plate
+
+        Parameters
+        ----------
+        user : labcontrol.db.user.User
+            The user creating the pools
+        plates_info : list of dict
+            The pooling parameters of each plate
+
+        Returns
+        -------
+        list of dict
+            The plate and the new pooling process ids for each plate
+        """
         results = []
         for pinfo in plates_info:
 
@@ -546,12 +531,20 @@ class LibraryPoolShotgunProcessHandler(BasePoolHandler):
             robot = (Equipment(plate_result['robot'])
                      if plate_result['robot'] is not None else None)
             process = PoolingProcess.create(
-                self.current_user, quant_process, pool_name,
+                user, quant_process, pool_name,
                 plate_result['pool_vals'].sum(), input_compositions,
                 plate_result['func_data'], robot=robot,
                 destination=plate_result['destination'])
             results.append({'plate-id': plate.id, 'process-id': process.id})
 
+        return results
+
+    @authenticated
+    @gen.coroutine
+    def post(self):
+        plates_info = json_decode(self.get_argument('plates-info'))
+        results = yield self.run_in_db_executor(
+            self._create_pools, self.current_user, plates_info)
         self.write(json_encode(results))
 
 
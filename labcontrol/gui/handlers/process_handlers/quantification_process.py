@@ -6,12 +6,15 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
+import logging
+
 from tornado.web import authenticated
-from tornado.escape import json_decode
+from tornado.escape import json_decode, json_encode
 
 import numpy as np
 
 from labcontrol.gui.handlers.base import BaseHandler
+from labcontrol.db import plate_reader
 from labcontrol.db.plate import Plate
 from labcontrol.db.process import QuantificationProcess
 from labcontrol.db.composition import (LibraryPrepShotgunComposition,
@@ -20,11 +23,19 @@ from labcontrol.db.composition import (LibraryPrepShotgunComposition,
                                        CompressedGDNAComposition)
 
 
+# The composition types whose sample can be shown next to the concentrations
+QUANTIFIABLE_COMPOSITION_TYPES = {
+    comp._composition_type for comp in (
+        GDNAComposition, CompressedGDNAComposition, LibraryPrep16SComposition,
+        LibraryPrepShotgunComposition)}
+
+
 class QuantificationProcessParseHandler(BaseHandler):
     @authenticated
     def get(self):
         plate_ids = self.get_arguments('plate_id')
-        self.render('parse_quantification.html', plate_ids=plate_ids)
+        self.render('parse_quantification.html', plate_ids=plate_ids,
+                    file_formats=json_encode(list(plate_reader.PARSERS)))
 
     @authenticated
     def post(self):
@@ -35,43 +46,29 @@ class QuantificationProcessParseHandler(BaseHandler):
         plates = []
         for key in self.request.files:
             plate_id = key.rsplit('-', 1)[1]
-            # The 0 is because for each key we have a single file
-            file_content = self.request.files[key][0]['body'].decode('utf-8')
+            # The 0 is because for each key we have a single file. The raw
+            # bytes are parsed, there's no need to decode them
+            upload = self.request.files[key][0]
+            # An empty format means that it is detected from the file
+            file_format = self.get_argument(
+                'plate-format-%s' % plate_id, None) or None
             plate = Plate(plate_id)
             pc = plate.plate_configuration
-            concentrations = QuantificationProcess.parse(
-                file_content, rows=pc.num_rows, cols=pc.num_columns)
-
-            names = np.empty_like(plate.layout, dtype='object')
-            blanks = np.zeros_like(plate.layout, dtype=bool)
-
-            # fetch the sample names and whether or not the samples are blanks
-            # by default these are set to be None and False.
-            for i, full_row in enumerate(plate.layout):
-                for j, well in enumerate(full_row):
-
-                    # some wells have no compositions at all so skip those
-                    if well is None:
-                        continue
-                    comp = well.composition
-
-                    # cache the sample compositions to avoid extra intermediate
-                    # queries
-                    if isinstance(comp, GDNAComposition):
-                        smp = comp.sample_composition
-                    elif isinstance(comp, (CompressedGDNAComposition,
-                                           LibraryPrep16SComposition)):
-                        smp = comp.gdna_composition.sample_composition
-                    elif isinstance(comp, LibraryPrepShotgunComposition):
-                        smp = comp.normalized_gdna_composition\
-                            .compressed_gdna_composition.gdna_composition\
-                            .sample_composition
-                    else:
-                        raise ValueError('This composition type is not '
-                                         'supported')
-
-                    blanks[i][j] = smp.sample_composition_type == 'blank'
-                    names[i][j] = smp.sample_id
+            parsed = plate_reader.parse(
+                upload['body'], file_format=file_format, rows=pc.num_rows,
+                cols=pc.num_columns)
+            logging.debug('Parsed %s as %s in %.2f ms', upload['filename'],
+                          parsed.file_format, parsed.elapsed * 1000)
+            concentrations = parsed.concentrations
+
+            snapshot = plate.snapshot()
+            # wells with no compositions at all are left as None and False
+            present = snapshot.composition_ids != 0
+            if not set(snapshot.composition_types[present]).issubset(
+                    QUANTIFIABLE_COMPOSITION_TYPES):
+                raise ValueError('This composition type is not supported')
+            names = snapshot.sample_ids
+            blanks = snapshot.sample_composition_types == 'blank'
 
             plates.append({'plate_name': plate.external_id,
                            'plate_id': plate_id,
@@ -109,35 +106,15 @@ class QuantificationViewHandler(BaseHandler):
         quant_values = []
 
         for quant in quant_processes:
-            concentrations = np.zeros_like(plate.layout, dtype=float)
-            names = np.empty_like(plate.layout, dtype='object')
-            blanks = np.zeros_like(plate.layout, dtype=bool)
-
-            # Get sample_composition (`smp`) from each well.
-            # Currently this requires ugly logic because you have to go
-            # through a named subclass that depends on plate type.
-            # TODO: replace this with a direct SQL query in a dedicated
-            # method of the composition class.
-            for comp, raw_conc, _ in quant.concentrations:
-                container = comp.container
-                row, col = container.row - 1, container.column - 1
-
-                if isinstance(comp, GDNAComposition):
-                    smp = comp.sample_composition
-                elif isinstance(comp, (CompressedGDNAComposition,
-                                       LibraryPrep16SComposition)):
-                    smp = comp.gdna_composition.sample_composition
-                elif isinstance(comp, LibraryPrepShotgunComposition):
-                    smp = comp.normalized_gdna_composition\
-                        .compressed_gdna_composition.gdna_composition\
-                        .sample_composition
-                else:
-                    raise ValueError('This composition type is not '
-                                     'supported')
-
-                blanks[row, col] = smp.sample_composition_type == 'blank'
-                names[row, col] = smp.sample_id
-                concentrations[row, col] = raw_conc
+            snapshot = plate.snapshot(quant)
+            quantified = snapshot.quantified
+            if not set(snapshot.composition_types[quantified]).issubset(
+                    QUANTIFIABLE_COMPOSITION_TYPES):
+                raise ValueError('This composition type is not supported')
+            concentrations = snapshot.raw_concentrations
+            names = np.where(quantified, snapshot.sample_ids, None)
+            blanks = quantified & (
+                snapshot.sample_composition_types == 'blank')
 
             quant_values.append({'quant_id': quant.id,
                                  'person': quant.personnel.name,
@@ -7,8 +7,10 @@
 # ----------------------------------------------------------------------------
 
 from tornado.web import authenticated, HTTPError
+from tornado.escape import json_decode
 
 from labcontrol.gui.handlers.base import BaseHandler
+from labcontrol.db import sql_connection
 from labcontrol.db.study import Study
 from labcontrol.db.process import SamplePlatingProcess
 from labcontrol.db.plate import PlateConfiguration, Plate
@@ -29,12 +31,86 @@ class SamplePlatingProcessListHandler(BaseHandler):
         plate_config_id = self.get_argument('plate_configuration')
         plate_ext_id = self.get_argument('plate_name')
 
+        # The wells are stored as the user fills them
         spp = SamplePlatingProcess.create(
-            user, PlateConfiguration(plate_config_id), plate_ext_id)
+            user, PlateConfiguration(plate_config_id), plate_ext_id,
+            implicit_blanks=True)
 
         self.write({'plate_id': spp.plate.id, 'process_id': spp.id})
 
 
+def _parse_well_patch_path(req_op, req_path):
+    """Parses the JSON PATCH operation on a well of the plate
+
+    Parameters
+    ----------
+    req_op: string
+        JSON PATCH op parameter
+    req_path: string
+        JSON PATCH path parameter, with the format
+        /well/<row>/<col>/<study_id>/<sample|notes>
+
+    Returns
+    -------
+    (str, str, int, str)
+        The row, column, study id and well attribute of the path
+
+    Raises
+    ------
+    HTTPError
+        400: If req_op is not a supported operation
+        400: If req_path is incorrect
+        404: If the attribute or the well attribute are not found
+    """
+    if req_op != 'replace':
+        raise HTTPError(400, 'Operation %s not supported. Current supported '
+                             'operations: replace' % req_op)
+
+    req_path = [v for v in req_path.split('/') if v]
+    if len(req_path) != 5:
+        raise HTTPError(400, 'Incorrect path parameter')
+    attribute = req_path[0]
+    if attribute != 'well':
+        raise HTTPError(404, 'Attribute %s not found' % attribute)
+
+    row, col, study_id, well_attribute = req_path[1:]
+    if well_attribute not in ('sample', 'notes'):
+        raise HTTPError(404, 'Well attribute %s not found' % well_attribute)
+    return row, col, int(study_id), well_attribute
+
+
+def _clean_well_value(well_attribute, req_value):
+    """Validates the new value of a well attribute
+
+    Parameters
+    ----------
+    well_attribute: {'sample', 'notes'}
+        The well attribute being updated
+    req_value: string
+        JSON PATCH value parameter
+
+    Returns
+    -------
+    str or None
+        The value to store
+
+    Raises
+    ------
+    HTTPError
+        400: If no sample is provided
+    """
+    if well_attribute == 'sample':
+        if req_value is None or not req_value.strip():
+            raise HTTPError(
+                400, 'A new value for the well should be provided')
+        return req_value
+    if req_value is not None:
+        # If the user provides an empty string, just store None
+        # in the database
+        req_value = req_value.strip() if req_value.strip() else None
+    return req_value
+
+
 def sample_plating_process_handler_patch_request(
         user, process_id, req_op, req_path, req_value, req_from):
     """Performs the patch operation on the sample plating process
@@ -65,88 +141,138 @@ def sample_plating_process_handler_patch_request(
         400: If req_op is not a supported operation
         400: If req_path is incorrect
     """
-    if req_op == 'replace':
-        req_path = [v for v in req_path.split('/') if v]
-        if len(req_path) != 5:
-            raise HTTPError(400, 'Incorrect path parameter')
-        attribute = req_path[0]
-
-        if attribute == 'well':
-            row = req_path[1]
-            col = req_path[2]
-            study_id = int(req_path[3])
-            well_attribute = req_path[4]
-
-            # The default values of the variables sample_id and
-            # blank_or_unknown are set before the try, and these are the values
-            # that are used if either (a) study_id is not 0 OR (b) the try
-            # fails with a ValueError (see comment in try below). If the try
-            # fails with anything other than a ValueError then the entire
-            # function bails, so it doesn't matter what these variables are set
-            # to. If and only if the try succeeds are these variables set to
-            # the values within the try.
-            sample_id = req_value
-            blank_or_unknown = True
-
-            # It actually IS possible to plate a plate without specifying
-            # separate study id(s); can plate just all blanks, or can provide
-            # the fully qualified sample id(s)--i.e., <studyid>.<sampleid>.
-            if study_id != 0:
-                try:
-                    # Note that the try fails iff the
-                    # Study(study_id).specimen_id_to_sample_id() call fails,
-                    # as the blank_or_unknown = False can't really fail ...
-                    # this assures that we can't realistically end up in an
-                    # inconsistent situation where sample_id has been set
-                    # during the try but blank_or_unknown has not.
-                    #
-                    # Thus, the ordering of these two statements within the try
-                    # is really important: do not change it unless you
-                    # understand all of the above!
-                    the_study = Study(study_id)
-                    sample_id = the_study.specimen_id_to_sample_id(
-                        req_value)
-                    blank_or_unknown = False
-                except ValueError:
-                    pass
-                # end try/except
-            # end if
-
-            if well_attribute == 'sample':
-                if req_value is None or not req_value.strip():
-                    raise HTTPError(
-                        400, 'A new value for the well should be provided')
-
-                plates = Plate.search(samples=[sample_id])
-                process = SamplePlatingProcess(process_id)
-                plates = set(plates) - {process.plate}
-                prev_plates = [{'plate_id': p.id, 'plate_name': p.external_id}
-                               for p in plates]
-                content, sample_ok = process.update_well(row, col, sample_id)
-
-                if blank_or_unknown:
-                    req_value = content
-
-                return {'sample_id': req_value, 'previous_plates': prev_plates,
-                        'sample_ok': sample_ok}
-            elif well_attribute == 'notes':
-                if req_value is not None:
-                    # If the user provides an empty string, just store None
-                    # in the database
-                    req_value = (req_value.strip()
-                                 if req_value.strip() else None)
-                SamplePlatingProcess(process_id).comment_well(
-                    row, col, req_value)
-                return {'comment': req_value}
-            else:
-                raise HTTPError(
-                    404, 'Well attribute %s not found' % well_attribute)
-        else:
-            raise HTTPError(404, 'Attribute %s not found' % attribute)
-
-    else:
-        raise HTTPError(400, 'Operation %s not supported. Current supported '
-                             'operations: replace' % req_op)
+    row, col, study_id, well_attribute = _parse_well_patch_path(
+        req_op, req_path)
+    req_value = _clean_well_value(well_attribute, req_value)
+
+    if well_attribute == 'notes':
+        SamplePlatingProcess(process_id).comment_well(row, col, req_value)
+        return {'comment': req_value}
+
+    # The default values of the variables sample_id and blank_or_unknown are
+    # set before the try, and these are the values that are used if either
+    # (a) study_id is not 0 OR (b) the try fails with a ValueError (see
+    # comment in try below). If the try fails with anything other than a
+    # ValueError then the entire function bails, so it doesn't matter what
+    # these variables are set to. If and only if the try succeeds are these
+    # variables set to the values within the try.
+    sample_id = req_value
+    blank_or_unknown = True
+
+    # It actually IS possible to plate a plate without specifying separate
+    # study id(s); can plate just all blanks, or can provide the fully
+    # qualified sample id(s)--i.e., <studyid>.<sampleid>.
+    if study_id != 0:
+        try:
+            # Note that the try fails iff the
+            # Study(study_id).specimen_id_to_sample_id() call fails, as the
+            # blank_or_unknown = False can't really fail ... this assures
+            # that we can't realistically end up in an inconsistent
+            # situation where sample_id has been set during the try but
+            # blank_or_unknown has not.
+            #
+            # Thus, the ordering of these two statements within the try is
+            # really important: do not change it unless you understand all
+            # of the above!
+            the_study = Study(study_id)
+            sample_id = the_study.specimen_id_to_sample_id(req_value)
+            blank_or_unknown = False
+        except ValueError:
+            pass
+        # end try/except
+    # end if
+
+    plates = Plate.search(samples=[sample_id])
+    process = SamplePlatingProcess(process_id)
+    plates = set(plates) - {process.plate}
+    prev_plates = [{'plate_id': p.id, 'plate_name': p.external_id}
+                   for p in plates]
+    content, sample_ok = process.update_well(row, col, sample_id)
+
+    if blank_or_unknown:
+        req_value = content
+
+    return {'sample_id': req_value, 'previous_plates': prev_plates,
+            'sample_ok': sample_ok}
+
+
+def sample_plating_process_handler_bulk_patch_request(
+        user, process_id, operations):
+    """Performs several patch operations on the sample plating process
+
+    The samples of all the operations are resolved, and the wells updated,
+    with a few queries in a single transaction, so pasting a whole column
+    of samples in the plate viewer costs the same as editing a single well.
+
+    Parameters
+    ----------
+    user: labcontrol.db.user.User
+        User performing the request
+    process_id: int
+        The SamplePlatingProcess to apply the patch operations
+    operations: list of dict
+        The JSON PATCH operations, with the keys 'op', 'path' and 'value',
+        as accepted by `sample_plating_process_handler_patch_request`
+
+    Returns
+    -------
+    list of dict
+        The results of each patch operation, in the same order as
+        `operations`
+
+    Raises
+    ------
+    HTTPError
+        400: If any of the operations is not supported or its path is
+        incorrect. No operation is applied in that case
+    """
+    parsed = []
+    for operation in operations:
+        row, col, study_id, well_attribute = _parse_well_patch_path(
+            operation.get('op'), operation.get('path', ''))
+        value = _clean_well_value(well_attribute, operation.get('value'))
+        parsed.append((row, col, study_id, well_attribute, value))
+
+    # Resolve the specimens of each study at once. The values that are not
+    # specimens of the study are plated as they are, as blanks or unknowns
+    specimens = {}
+    for _, _, study_id, well_attribute, value in parsed:
+        if well_attribute == 'sample' and study_id != 0:
+            specimens.setdefault(study_id, set()).add(value)
+    sample_ids = {}
+    for study_id, study_specimens in specimens.items():
+        for specimen, sample_id in Study(
+                study_id).specimen_ids_to_sample_ids(study_specimens).items():
+            sample_ids[(study_id, specimen)] = sample_id
+
+    process = SamplePlatingProcess(process_id)
+    with sql_connection.TRN:
+        samples = [(row, col, sample_ids.get((study_id, value), value))
+                   for row, col, study_id, well_attribute, value in parsed
+                   if well_attribute == 'sample']
+        prev_plates = {}
+        if samples:
+            prev_plates = process.plate.get_other_plates_by_sample(
+                {sample_id for _, _, sample_id in samples})
+        contents = iter(process.update_wells(samples))
+        for row, col, _, well_attribute, value in parsed:
+            if well_attribute == 'notes':
+                process.comment_well(row, col, value)
+
+    res = []
+    for row, col, study_id, well_attribute, value in parsed:
+        if well_attribute == 'notes':
+            res.append({'comment': value})
+            continue
+        content, sample_ok = next(contents)
+        sample_id = sample_ids.get((study_id, value))
+        res.append({
+            'sample_id': value if sample_id is not None else content,
+            'previous_plates': [
+                {'plate_id': p['plate_id'], 'plate_name': p['external_id']}
+                for p in prev_plates.get(sample_id or value, [])],
+            'sample_ok': sample_ok})
+    return res
 
 
 class SamplePlatingProcessHandler(BaseHandler):
@@ -162,3 +288,14 @@ class SamplePlatingProcessHandler(BaseHandler):
             req_value, req_from)
         self.write(res)
         self.finish()
+
+
+class SamplePlatingProcessWellsHandler(BaseHandler):
+    @authenticated
+    def patch(self, process_id):
+        operations = json_decode(self.get_argument('operations'))
+
+        res = sample_plating_process_handler_bulk_patch_request(
+            self.current_user, process_id, operations)
+        self.write({'results': res})
+        self.finish()
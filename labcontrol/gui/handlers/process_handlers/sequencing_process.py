@@ -10,6 +10,7 @@ import zipfile
 
 from io import BytesIO
 
+from tornado import gen
 from tornado.web import authenticated
 from tornado.escape import json_decode
 
@@ -60,25 +61,53 @@ class SequencingProcessHandler(BaseHandler):
 
 
 class DownloadSampleSheetHandler(BaseDownloadHandler):
-    @authenticated
-    def get(self, process_id):
-        pid = int(process_id)
-        process = SequencingProcess(pid)
+    def _build_sample_sheet(self, process_id):
+        """Builds the sample sheet of a sequencing process
+
+        Parameters
+        ----------
+        process_id : int
+            The sequencing process id
+
+        Returns
+        -------
+        (str, str)
+            The name and the contents of the sample sheet
+        """
+        process = SequencingProcess(process_id)
         text = process.generate_sample_sheet()
         name_pieces = ["samplesheet", process.run_name]
         # TODO: Verify that the isAmplicon conditional is still needed.
-        assay = PoolComposition.get_assay_type_for_sequencing_process(pid)
+        assay = PoolComposition.get_assay_type_for_sequencing_process(
+            process_id)
         if assay != 'Amplicon':
             name_pieces.append(process.experiment)
-        self.deliver_text(name_pieces, process, text, extension="csv")
-
+        return self.generate_file_name(name_pieces, process, "csv"), text
 
-class DownloadPreparationSheetsHandler(BaseDownloadHandler):
     @authenticated
+    @gen.coroutine
     def get(self, process_id):
-        process = SequencingProcess(int(process_id))
-        name_pieces = ["preps", process.run_name]
+        name, text = yield self.run_in_db_executor(
+            self._build_sample_sheet, int(process_id))
+        self._deliver_file(text, name, 'text/csv')
+
 
+class DownloadPreparationSheetsHandler(BaseDownloadHandler):
+    def _build_prep_archive(self, process_id):
+        """Builds the zip archive with the prep information files
+
+        Parameters
+        ----------
+        process_id : int
+            The id of the sequencing process to generate the prep
+            information for
+
+        Returns
+        -------
+        (str, bytes)
+            The name and the contents of the zip archive
+        """
+        process = SequencingProcess(process_id)
         with BytesIO() as content:
             with zipfile.ZipFile(content, mode='w',
                                  compression=zipfile.ZIP_DEFLATED) as zf:
@@ -96,5 +125,14 @@ class DownloadPreparationSheetsHandler(BaseDownloadHandler):
                     name = self.generate_file_name(curr_name_pieces, process)
                     zf.writestr(name, prep)
 
-            self.deliver_zip(name_pieces, process, content.getvalue(),
-                             extension="zip")
+            name_pieces = ["preps", process.run_name]
+            return (self.generate_file_name(name_pieces, process, "zip"),
+                    content.getvalue())
+
+    @authenticated
+    @gen.coroutine
+    def get(self, process_id):
+        # Generating the prep information of a large run can take a while
+        name, archive = yield self.run_in_db_executor(
+            self._build_prep_archive, int(process_id))
+        self._deliver_file(archive, name, 'application/zip')
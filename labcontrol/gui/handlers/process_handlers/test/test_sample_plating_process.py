@@ -9,14 +9,15 @@
 from unittest import main
 
 from tornado.web import HTTPError
-from tornado.escape import json_decode
+from tornado.escape import json_decode, json_encode
 
 from labcontrol.db import sql_connection
 from labcontrol.db.user import User
 from labcontrol.db.composition import SampleComposition
 from labcontrol.gui.testing import TestHandlerBase
 from labcontrol.gui.handlers.process_handlers.sample_plating_process import (
-    sample_plating_process_handler_patch_request)
+    sample_plating_process_handler_patch_request,
+    sample_plating_process_handler_bulk_patch_request)
 
 
 class TestUtils(TestHandlerBase):
@@ -177,6 +178,52 @@ class TestUtils(TestHandlerBase):
 
             TRN.add(sql, [None])
 
+    def test_bulk_patch(self):
+        h1 = SampleComposition(8)
+        a2 = SampleComposition(9)
+        obs = sample_plating_process_handler_bulk_patch_request(
+            self.user, 11, [
+                {'op': 'replace', 'path': '/well/8/1/1/sample',
+                 'value': '1.SKM8.640201'},
+                {'op': 'replace', 'path': '/well/1/2/0/sample',
+                 'value': '1.SKM8.640201'},
+                {'op': 'replace', 'path': '/well/1/2/1/notes',
+                 'value': 'New Notes'},
+                {'op': 'replace', 'path': '/well/8/2/1/sample',
+                 'value': 'Unknown'}])
+        self.assertEqual(obs, [
+            {'sample_id': '1.SKM8.640201', 'previous_plates': [],
+             'sample_ok': True},
+            {'sample_id': '1.SKM8.640201.Test.plate.1.A2',
+             'previous_plates': [], 'sample_ok': True},
+            {'comment': 'New Notes'},
+            {'sample_id': 'Unknown', 'previous_plates': [],
+             'sample_ok': False}])
+        self.assertEqual(h1.sample_id, '1.SKM8.640201')
+        self.assertEqual(h1.content, '1.SKM8.640201.Test.plate.1.H1')
+        self.assertEqual(a2.content, '1.SKM8.640201.Test.plate.1.A2')
+        self.assertEqual(a2.notes, 'New Notes')
+
+        self.assertEqual(sample_plating_process_handler_bulk_patch_request(
+            self.user, 11, []), [])
+
+        # No operation is applied if any of them is wrong
+        regex = 'A new value for the well should be provided'
+        with self.assertRaisesRegex(HTTPError, regex):
+            sample_plating_process_handler_bulk_patch_request(
+                self.user, 11, [
+                    {'op': 'replace', 'path': '/well/8/1/1/sample',
+                     'value': 'blank'},
+                    {'op': 'replace', 'path': '/well/1/2/1/sample',
+                     'value': '  '}])
+        self.assertEqual(h1.sample_id, '1.SKM8.640201')
+
+        regex = 'Operation add not supported'
+        with self.assertRaisesRegex(HTTPError, regex):
+            sample_plating_process_handler_bulk_patch_request(
+                self.user, 11, [{'op': 'add', 'path': '/well/8/1/1/sample',
+                                 'value': 'blank'}])
+
 
 class TestSamplePlatingProcessHandlers(TestHandlerBase):
     def test_post_sample_plating_process_notes(self):
@@ -240,6 +287,25 @@ class TestSamplePlatingProcessHandlers(TestHandlerBase):
 
             TRN.add(sql, [None])
 
+    def test_patch_sample_plating_process_wells_handler(self):
+        obs = SampleComposition(8)
+        data = {'operations': json_encode([
+            {'op': 'replace', 'path': '/well/8/1/1/sample',
+             'value': '1.SKM8.640201'}])}
+        response = self.patch('/process/sample_plating/11/wells', data)
+        self.assertEqual(response.code, 200)
+        self.assertEqual(obs.sample_id, '1.SKM8.640201')
+        self.assertEqual(json_decode(response.body),
+                         {'results': [{'sample_id': '1.SKM8.640201',
+                                       'previous_plates': [],
+                                       'sample_ok': True}]})
+
+        data = {'operations': json_encode([
+            {'op': 'replace', 'path': '/well/8/1/1/WRONG',
+             'value': '1.SKM8.640201'}])}
+        response = self.patch('/process/sample_plating/11/wells', data)
+        self.assertEqual(response.code, 404)
+
 
 if __name__ == '__main__':
     main()
@@ -310,14 +310,17 @@ PlateViewer.prototype.initialize = function(rows, cols) {
     this.grid.registerPlugin(this.cellExternalCopyManager);
   }
 
-  // When a cell changes, update the server with the new cell information
+  // When a cell changes, update the server with the new cell information.
+  // A paste changes many cells at once, so the changes are queued and sent
+  // to the server in a single request
+  this._pendingWells = [];
   this.grid.onCellChange.subscribe(function(e, args) {
     var row = args.row;
     var col = args.cell;
     var content = args.item[col];
 
     // The plate already exists, simply plate the sample
-    that.modifyWell(row, col, content);
+    that.queueWellModification(row, col, content);
   });
 
   // When the user right-clicks on a cell
@@ -444,32 +447,57 @@ PlateViewer.prototype.getActiveStudy = function() {
  *
  */
 PlateViewer.prototype.patchWell = function(row, col, content, studyID) {
+  this.patchWells([{ row: row, col: col, content: content }], studyID);
+};
+
+/**
+ *
+ * Update the contents of several wells in the backend with a single request
+ *
+ * @param {Array} wells The wells being modified, as objects with the keys
+ * row, col and content
+ * @param {string} studyID The output of getActiveStudy()
+ *
+ */
+PlateViewer.prototype.patchWells = function(wells, studyID) {
   var that = this;
 
+  var operations = wells.map(function(well) {
+    return {
+      op: "replace",
+      path:
+        "/well/" +
+        (well.row + 1) +
+        "/" +
+        (well.col + 1) +
+        "/" +
+        studyID +
+        "/sample",
+      value: well.content
+    };
+  });
+
   $.ajax({
-    url: "/process/sample_plating/" + this.processId,
+    url: "/process/sample_plating/" + this.processId + "/wells",
     type: "PATCH",
-    data: {
-      op: "replace",
-      path: "/well/" + (row + 1) + "/" + (col + 1) + "/" + studyID + "/sample",
-      value: content
-    },
+    data: { operations: JSON.stringify(operations) },
     success: function(data) {
-      that.data[row][that.grid.getColumns()[col].field] = data["sample_id"];
-      that.updateUnknownsAndDuplicates();
-      var classIdx = that.wellClasses[row][col].indexOf("well-prev-plated");
-      if (data["previous_plates"].length > 0) {
-        that.wellPreviousPlates[row][col] = data["previous_plates"];
-        addIfNotPresent(that.wellClasses[row][col], "well-prev-plated");
-      } else {
-        safeArrayDelete(that.wellClasses[row][col], "well-prev-plated");
-        that.wellPreviousPlates[row][col] = null;
+      var results = data["results"];
+      for (var i = 0; i < wells.length; i++) {
+        that.setWellPatchResult(wells[i].row, wells[i].col, results[i]);
       }
+      that.updateUnknownsAndDuplicates();
 
       // here and in the rest of the source we use updateRow instead of
       // invalidateRow(s) and render so that we don't lose any active
       // editors in the current grid
-      that.grid.updateRow(row);
+      var rows = {};
+      for (var j = 0; j < wells.length; j++) {
+        if (!rows[wells[j].row]) {
+          rows[wells[j].row] = true;
+          that.grid.updateRow(wells[j].row);
+        }
+      }
       that.updateWellCommentsArea();
     },
     error: function(jqXHR, textStatus, errorThrown) {
@@ -478,6 +506,52 @@ PlateViewer.prototype.patchWell = function(row, col, content, studyID) {
   });
 };
 
+/**
+ *
+ * Store the result of the update of a well's content
+ *
+ * @param {int} row The row of the well modified
+ * @param {int} col The column of the well modified
+ * @param {Object} data The result of the update, with the keys sample_id,
+ * previous_plates and sample_ok
+ *
+ */
+PlateViewer.prototype.setWellPatchResult = function(row, col, data) {
+  this.data[row][this.grid.getColumns()[col].field] = data["sample_id"];
+  if (data["previous_plates"].length > 0) {
+    this.wellPreviousPlates[row][col] = data["previous_plates"];
+    addIfNotPresent(this.wellClasses[row][col], "well-prev-plated");
+  } else {
+    safeArrayDelete(this.wellClasses[row][col], "well-prev-plated");
+    this.wellPreviousPlates[row][col] = null;
+  }
+};
+
+/**
+ *
+ * Queue the modification of a well, so all the wells modified at once (e.g.
+ * by pasting several cells) are sent to the server in a single request
+ *
+ * @param {int} row The row of the well being modified
+ * @param {int} col The column of the well being modified
+ * @param {string} content The new content of the well
+ *
+ **/
+PlateViewer.prototype.queueWellModification = function(row, col, content) {
+  var that = this;
+
+  this._pendingWells.push({ row: row, col: col, content: content });
+  if (this._pendingWells.length === 1) {
+    // The cells of a paste are all changed before the browser gets back to
+    // the event loop
+    setTimeout(function() {
+      var wells = that._pendingWells;
+      that._pendingWells = [];
+      that.modifyWells(wells);
+    }, 0);
+  }
+};
+
 /**
  *
  * Modify the contents of a well
@@ -488,11 +562,23 @@ PlateViewer.prototype.patchWell = function(row, col, content, studyID) {
  *
  **/
 PlateViewer.prototype.modifyWell = function(row, col, content) {
+  this.modifyWells([{ row: row, col: col, content: content }]);
+};
+
+/**
+ *
+ * Modify the contents of several wells
+ *
+ * @param {Array} wells The wells being modified, as objects with the keys
+ * row, col and content
+ *
+ **/
+PlateViewer.prototype.modifyWells = function(wells) {
   var that = this,
     studyID = this.getActiveStudy();
 
   // Perform automatic matching. Note that this is currently done every time
-  // modifyWell() is called, even if the user types in something like "blank"
+  // modifyWells() is called, even if the user types in something like "blank"
   // or even if the user selects something from a dropdown list. (That later
   // case could probably be detected in order to avoid doing matching here.)
   //
@@ -500,31 +586,35 @@ PlateViewer.prototype.modifyWell = function(row, col, content) {
   // (e.g. the American Gut Project) yet; this is a major TODO, as part of
   // issue #173 on GitHub.
   //
-  // A major bottleneck here, I think, will be how requests are made on a well-
-  // by-well basis to the server in patchWell() instead of in batch operations.
-  var possiblyMatchedContent = content;
   // TODO: cache list of active samples so that we don't have to make this
-  // particular request every time modifyWell() is called. See #592 in GH repo.
+  // particular request every time modifyWells() is called. See #592 in GH
+  // repo.
   get_active_samples().then(
     function(sampleIDs) {
-      // If there is *exactly one* match with an active sample ID, use
-      // that instead. In any other case (0 matches or > 1 matches),
-      // manual resolution is required -- so we don't bother changing the
-      // cell content.
-      var matchingSamples = getSubstringMatches(content, sampleIDs);
-      if (matchingSamples.length === 1) {
-        possiblyMatchedContent = matchingSamples[0];
-        safeArrayDelete(that.wellClasses[row][col], "well-indeterminate");
-      } else if (matchingSamples.length > 1) {
-        addIfNotPresent(that.wellClasses[row][col], "well-indeterminate");
-      } else {
-        safeArrayDelete(that.wellClasses[row][col], "well-indeterminate");
-      }
-      that.patchWell(row, col, possiblyMatchedContent, studyID);
+      var matchedWells = wells.map(function(well) {
+        var row = well.row,
+          col = well.col;
+        // If there is *exactly one* match with an active sample ID, use
+        // that instead. In any other case (0 matches or > 1 matches),
+        // manual resolution is required -- so we don't bother changing the
+        // cell content.
+        var possiblyMatchedContent = well.content;
+        var matchingSamples = getSubstringMatches(well.content, sampleIDs);
+        if (matchingSamples.length === 1) {
+          possiblyMatchedContent = matchingSamples[0];
+          safeArrayDelete(that.wellClasses[row][col], "well-indeterminate");
+        } else if (matchingSamples.length > 1) {
+          addIfNotPresent(that.wellClasses[row][col], "well-indeterminate");
+        } else {
+          safeArrayDelete(that.wellClasses[row][col], "well-indeterminate");
+        }
+        return { row: row, col: col, content: possiblyMatchedContent };
+      });
+      that.patchWells(matchedWells, studyID);
     },
     function(rejectionReason) {
       bootstrapAlert(
-        "Attempting to get a list of sample IDs in PlateViewer.modifyWell() " +
+        "Attempting to get a list of sample IDs in PlateViewer.modifyWells() " +
           "failed: " +
           rejectionReason,
         "danger"
@@ -6,11 +6,21 @@
 # The full license is in the file LICENSE, distributed with this software.
 # ----------------------------------------------------------------------------
 
-from unittest import main
+from unittest import main, TestCase
 
+from labcontrol.db.sql_connection import get_pool
+from labcontrol.gui.handlers.base import get_db_executor
 from labcontrol.gui.testing import TestHandlerBase
 
 
+class TestGetDBExecutor(TestCase):
+    def test_get_db_executor(self):
+        obs = get_db_executor()
+        self.assertIs(get_db_executor(), obs)
+        # One connection is kept for the IOLoop thread
+        self.assertEqual(obs._max_workers, max(1, get_pool().maxconn - 1))
+
+
 class TestIndexHandler(TestHandlerBase):
     def test_get(self):
         response = self.get('/')
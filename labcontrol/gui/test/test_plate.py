@@ -14,9 +14,9 @@ from tornado.escape import json_decode
 from tornado.web import HTTPError
 
 from labcontrol.gui.testing import TestHandlerBase
-from labcontrol.db.plate import Plate
+from labcontrol.db.plate import Plate, PlateConfiguration
 from labcontrol.db.user import User
-from labcontrol.db.process import Process
+from labcontrol.db.process import Process, SamplePlatingProcess
 from labcontrol.gui.handlers.plate import (
     _get_plate, plate_handler_patch_request, plate_layout_handler_get_request,
     plate_map_handler_get_request)
@@ -199,6 +199,31 @@ class TestPlateHandlers(TestHandlerBase):
                          ['Identification of the Microbiomes for Cannabis '
                           'Soils'])
 
+    def test_get_plate_list_handler_server_side(self):
+        response = self.get(
+            '/plate_list?plate_type=%5B%22sample%22%5D&draw=3&start=1'
+            '&length=2&order%5B0%5D%5Bcolumn%5D=2'
+            '&order%5B0%5D%5Bdir%5D=desc&columns%5B2%5D%5Bname%5D='
+            'external_id&search%5Bvalue%5D=Test')
+        self.assertEqual(response.code, 200)
+        obs = json_decode(response.body)
+        self.assertCountEqual(
+            obs.keys(), ['draw', 'recordsTotal', 'recordsFiltered', 'data'])
+        self.assertEqual(obs['draw'], 3)
+        self.assertEqual(obs['recordsTotal'], 4)
+        self.assertEqual(obs['recordsFiltered'], 4)
+        self.assertEqual([row[:2] for row in obs['data']],
+                         [[30, 'Test plate 3'], [27, 'Test plate 2']])
+        self.assertEqual(obs['data'][0][3],
+                         ['Identification of the Microbiomes for Cannabis '
+                          'Soils'])
+
+        # Unknown sort column
+        response = self.get(
+            '/plate_list?draw=1&order%5B0%5D%5Bcolumn%5D=4'
+            '&columns%5B4%5D%5Bname%5D=studies')
+        self.assertEqual(response.code, 400)
+
     def test_get_plate_map_handler(self):
         response = self.get('/plate')
         self.assertEqual(response.code, 200)
@@ -566,6 +591,21 @@ class TestPlateHandlers(TestHandlerBase):
         self.assertEqual(obs, exp)
         self.assertCountEqual(obs_duplicates, exp_duplicates)
 
+    def test_get_plate_handler_implicit_blanks(self):
+        # A new sample plate doesn't have any well yet
+        process = SamplePlatingProcess.create(
+            User('test@foo.bar'), PlateConfiguration(1), 'Implicit plate',
+            10, implicit_blanks=True)
+        plate_id = process.plate.id
+        response = self.get('/plate/%s/' % plate_id)
+        self.assertEqual(response.code, 200)
+        obs = json_decode(response.body)
+        self.assertEqual(obs['plate_name'], 'Implicit plate')
+        self.assertIsNone(obs['process_notes'])
+        self.assertEqual(obs['studies'], [])
+        self.assertEqual(obs['duplicates'], [])
+        self.assertEqual(obs['unknowns'], [])
+
     def test_patch_plate_handler(self):
         tester = Plate(21)
         data = {'op': 'replace', 'path': '/name/', 'value': 'NewName'}
@@ -736,6 +776,20 @@ class TestPlateHandlers(TestHandlerBase):
             response.effective_url.endswith(
                 '/process/library_prep_shotgun?process_id=1'))
 
+        # A new sample plate doesn't have any well yet
+        process = SamplePlatingProcess.create(
+            User('test@foo.bar'), PlateConfiguration(1), 'Implicit plate',
+            10, implicit_blanks=True)
+        response = self.get('/plate/%s/process' % process.plate.id)
+        self.assertEqual(response.code, 200)
+        self.assertTrue(
+            response.effective_url.endswith(
+                '/plate?process_id=%s' % process.id))
+
+        plate = Plate.create('Plate without wells', PlateConfiguration(1))
+        response = self.get('/plate/%s/process' % plate.id)
+        self.assertEqual(response.code, 404)
+
 
 if __name__ == '__main__':
     main()